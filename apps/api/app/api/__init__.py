@@ -10,7 +10,7 @@ from shared.models.product import Price
 from shared.models.receipt import Receipt
 from sqlalchemy import Date, cast, func
 
-from app.api import admin, l10n, mileage, product, purchase, redeem
+from app.api import admin, l10n, mileage, product, purchase, redeem, webhook
 from app.config import config
 from app.dependencies import session
 
@@ -26,6 +26,7 @@ __all__ = [
     mileage,
     admin,
     redeem,
+    webhook,
 ]
 
 for view in __all__:
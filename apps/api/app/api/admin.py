@@ -18,6 +18,7 @@ from sqlalchemy.orm import joinedload
 
 from app.config import config
 from app.dependencies import session
+from app.price_index import price_index
 from app.utils import verify_token
 from app.utils.apple import get_tx_ids
 from app.utils.import_utils import (
@@ -426,6 +427,7 @@ def import_prices_endpoint(request: ImportPricesRequest, sess=Depends(session)):
         try:
             # 비대화형 모드로 임포트 실행
             processed_count, updated_count = import_prices_from_csv(sess, temp_path)
+            price_index.refresh(sess)
 
             return {
                 "message": "가격 데이터가 성공적으로 임포트되었습니다.",
@@ -5,13 +5,14 @@ from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi_cache.decorator import cache
 from shared.enums import PackageName, PlanetID
 from shared.models.product import Category, Product
-from shared.schemas.product import CategorySchema, ProductSchema, SimpleProductSchema
+from shared.schemas.product import CategorySchema, PriceSchema, ProductSchema, SimpleProductSchema
 from shared.utils.address import format_addr
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import defaultload, joinedload
 
 from app.config import config
 from app.dependencies import session
+from app.price_index import price_index
 from app.utils import get_purchase_history
 
 router = APIRouter(
@@ -45,6 +46,8 @@ def product_list(
                 joinedload(Category.product_list).joinedload(
                     Product.fungible_item_list
                 ),
+                # Prices come from price index
+                defaultload(Category.product_list).noload(Product.price_list),
             )
             .where(Category.active.is_(True))
         )
@@ -59,6 +62,9 @@ def product_list(
         schema_dict = {}
         for product in category.product_list:
             schema = ProductSchema.model_validate(product)
+            schema.price_list = [
+                PriceSchema.model_validate(x) for x in price_index.product_prices(sess, product.id)
+            ]
 
             # Change Apple SKU for K
             if x_iap_packagename == PackageName.NINE_CHRONICLES_K:
@@ -4,7 +4,7 @@ import os
 import urllib.parse
 from datetime import datetime, timedelta, timezone
 from math import floor
-from typing import Annotated, Dict, List, Optional
+from typing import Annotated, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
 import requests
@@ -12,6 +12,7 @@ import structlog
 from fastapi import APIRouter, Depends, Header, Query
 from shared._graphql import GQL
 from shared.enums import (
+    DeliveryLane,
     PackageName,
     PlanetID,
     ProductType,
@@ -22,7 +23,6 @@ from shared.enums import (
 from shared.models.product import Price, Product
 from shared.models.receipt import Receipt
 from shared.models.user import AvatarLevel
-from shared.schemas.message import SendProductMessage
 from shared.schemas.receipt import (
     FreeReceiptSchema,
     PurchaseHistorySchema,
@@ -34,15 +34,17 @@ from shared.utils.apple import get_jwt
 from shared.validator.apple import validate_apple
 from shared.validator.common import get_order_data
 from shared.validator.google import ack_google, validate_google
+from shared.validator.guard import CircuitOpenError, StoreGuard, get_store_guard
 from shared.validator.web import validate_web, validate_web_test
 from sqlalchemy import desc, func, or_, select
 from sqlalchemy.orm import joinedload, with_loader_criteria
 from starlette.responses import JSONResponse
 
-from app.celery import send_to_worker
+from app.celery import send_product_to_worker
 from app.config import config
 from app.dependencies import session
 from app.exceptions import InsufficientUserDataException, ReceiptNotFoundException
+from app.price_index import price_index
 from app.utils import (
     create_season_pass_jwt,
     get_mileage,
@@ -65,6 +67,64 @@ def raise_error(sess, receipt: Receipt, e: Exception):
     raise e
 
 
+def get_guard(store_name: str) -> StoreGuard:
+    return get_store_guard(
+        store_name,
+        max_concurrency=config.store_max_concurrency,
+        acquire_timeout=config.store_acquire_timeout,
+        failure_threshold=config.store_failure_threshold,
+        reset_timeout=config.store_reset_timeout,
+    )
+
+
+def get_revalidate_at(attempts: int) -> datetime:
+    delay = min(config.revalidate_interval * 2 ** attempts, config.revalidate_backoff_max)
+    return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+def defer_validation(sess, receipt: Receipt, e: CircuitOpenError) -> Receipt:
+    """Save receipt as `VALIDATION_REQUEST` to be validated later by `revalidate_receipts`"""
+    receipt.status = ReceiptStatus.VALIDATION_REQUEST
+    receipt.revalidate_at = get_revalidate_at(receipt.revalidate_attempts or 0)
+    receipt.msg = "\n".join([receipt.msg or "", str(e)])
+    sess.add(receipt)
+    sess.commit()
+    sess.refresh(receipt)
+    logger.warning(f"[{receipt.uuid}] :: Validation deferred :: {e}")
+    return receipt
+
+
+def ack_purchase(receipt: Receipt, package_name: PackageName, product_id: str, token: str):
+    """
+    Acknowledge Google purchase. Google refunds a purchase not acknowledged in 3 days,
+    so ACK rejected while the store is unavailable is deferred to `retry_pending_acks`.
+    """
+    try:
+        get_guard("google").call(ack_google, config.google_credential, package_name, product_id, token)
+    except CircuitOpenError as e:
+        receipt.ack_at = datetime.now(timezone.utc)
+        logger.warning(f"[{receipt.uuid}] :: ACK deferred :: {e}")
+        return
+    receipt.ack_at = None
+
+
+def get_store_product(sess, store: Store, product_id: Union[str, int]) -> Optional[Product]:
+    """Find product from receipt data. Apple receipt has no product ID before validation."""
+    stmt = (
+        select(Product)
+        .options(joinedload(Product.fav_list))
+        .options(joinedload(Product.fungible_item_list))
+        .where(Product.active.is_(True))
+    )
+    if store in (Store.GOOGLE, Store.GOOGLE_TEST):
+        return sess.scalar(stmt.where(Product.google_sku == product_id))
+    elif store in (Store.WEB, Store.WEB_TEST, Store.TEST):
+        return sess.scalar(stmt.where(Product.id == product_id))
+    # NOTE: We can get productId after validation in apple.
+    #  So validate this later in apple.
+    return None
+
+
 @router.get("/log")
 def log_request_product(
     planet_id: str,
@@ -295,25 +355,7 @@ def request_product(
     if not receipt_data.agentAddress:
         raise ReceiptNotFoundException("", order_id)
 
-    product = None
-    # If prev. receipt exists, check current status and returns result
-    if receipt_data.store in (Store.GOOGLE, Store.GOOGLE_TEST):
-        product = sess.scalar(
-            select(Product)
-            .options(joinedload(Product.fav_list))
-            .options(joinedload(Product.fungible_item_list))
-            .where(Product.active.is_(True), Product.google_sku == product_id)
-        )
-    elif receipt_data.store in (Store.APPLE, Store.APPLE_TEST):
-        # NOTE: We can get productId after validation in apple.
-        #  So validate this later in apple.
-        # product = sess.scalar(
-        #     select(Product)
-        #     .options(joinedload(Product.fav_list)).options(joinedload(Product.fungible_item_list))
-        #     .where(Product.active.is_(True), Product.apple_sku == product_id)
-        # )
-        pass
-    elif receipt_data.store in (Store.WEB, Store.WEB_TEST):
+    if receipt_data.store in (Store.WEB, Store.WEB_TEST):
         # Validate package name for web payment - only NINE_CHRONICLES_WEB is allowed
         if x_iap_packagename != PackageName.NINE_CHRONICLES_WEB:
             raise_error(
@@ -322,19 +364,7 @@ def request_product(
                 ValueError(f"Invalid package name for web payment: {x_iap_packagename}. Only NINE_CHRONICLES_WEB is allowed."),
             )
 
-        product = sess.scalar(
-            select(Product)
-            .options(joinedload(Product.fav_list))
-            .options(joinedload(Product.fungible_item_list))
-            .where(Product.active.is_(True), Product.id == product_id)
-        )
-    elif receipt_data.store == Store.TEST:
-        product = sess.scalar(
-            select(Product)
-            .options(joinedload(Product.fav_list))
-            .options(joinedload(Product.fungible_item_list))
-            .where(Product.active.is_(True), Product.id == product_id)
-        )
+    product = get_store_product(sess, receipt_data.store, product_id)
 
     # Save incoming data first
     receipt = Receipt(
@@ -362,7 +392,29 @@ def request_product(
             ),
         )
 
+    return process_receipt(
+        sess, receipt, receipt_data, product, product_id, order_id, x_iap_packagename
+    )
+
+
+def process_receipt(
+    sess,
+    receipt: Receipt,
+    receipt_data: ReceiptSchema,
+    product: Optional[Product],
+    product_id: Union[str, int],
+    order_id: str,
+    x_iap_packagename: PackageName,
+) -> Receipt:
+    """
+    Validate saved receipt to the store and send product to buyer.
+
+    If the store is unavailable (circuit open or bulkhead full), the receipt is saved with
+    `VALIDATION_REQUEST` status and returned immediately. `revalidate_receipts` finishes it later.
+    """
     receipt.status = ReceiptStatus.VALIDATION_REQUEST
+    # Set again only by `defer_validation`
+    receipt.revalidate_at = None
 
     # validate
     ## Google
@@ -378,9 +430,17 @@ def request_product(
                 ),
             )
 
-        success, msg, purchase = validate_google(
-            config.google_credential, receipt.package_name, order_id, product_id, token
-        )
+        try:
+            success, msg, purchase = get_guard("google").call(
+                validate_google,
+                config.google_credential,
+                receipt.package_name,
+                order_id,
+                product_id,
+                token,
+            )
+        except CircuitOpenError as e:
+            return defer_validation(sess, receipt, e)
         # FIXME: google API result may not include productId.
         #  Can we get productId always?
         # if purchase.productId != product.google_sku:
@@ -388,22 +448,26 @@ def request_product(
         #     raise_error(sess, receipt, ValueError(
         #         f"Invalid Product ID: Given {product.google_sku} is not identical to found from receipt: {purchase.productId}"))
         if success:
-            ack_google(config.google_credential, x_iap_packagename, product_id, token)
+            ack_purchase(receipt, x_iap_packagename, product_id, token)
     ## Apple
     elif receipt_data.store in (Store.APPLE, Store.APPLE_TEST):
         encoded_tx_id = urllib.parse.quote_plus(order_id)
-        success, msg, purchase = validate_apple(
-            get_jwt(
-                base64.b64decode(config.apple_credential)
-                .decode("utf-8")
-                .replace("\\n", "\n"),
-                receipt.package_name,
-                config.apple_key_id,
-                config.apple_issuer_id,
-            ),
-            config.apple_validation_url.format(transactionId=encoded_tx_id),
-            order_id,
-        )
+        try:
+            success, msg, purchase = get_guard("apple").call(
+                validate_apple,
+                get_jwt(
+                    base64.b64decode(config.apple_credential)
+                    .decode("utf-8")
+                    .replace("\\n", "\n"),
+                    receipt.package_name,
+                    config.apple_key_id,
+                    config.apple_issuer_id,
+                ),
+                config.apple_validation_url.format(transactionId=encoded_tx_id),
+                order_id,
+            )
+        except CircuitOpenError as e:
+            return defer_validation(sess, receipt, e)
         if success:
             data = receipt_data.data.copy()
             data.update(**purchase.json_data)
@@ -422,6 +486,7 @@ def request_product(
             elif x_iap_packagename == PackageName.NINE_CHRONICLES_K:
                 stmt = stmt.where(Product.apple_sku_k == purchase.productId)
             else:
+                receipt.status = ReceiptStatus.INVALID
                 raise_error(
                     sess,
                     receipt,
@@ -459,12 +524,8 @@ def request_product(
             else config.stripe_secret_key
         )
 
-        # 상품 가격 조회 (스토어 타입 무시하고 첫 번째 가격 사용)
-        price = sess.scalar(
-            select(Price)
-            .where(Price.product_id == product.id)
-            .limit(1)
-        )
+        # 상품 가격 조회 (해당 스토어의 활성 USD 가격, 없으면 다른 스토어의 활성 USD 가격)
+        price = price_index.get(sess, product.id, receipt_data.store, "USD")
         if not price:
             receipt.status = ReceiptStatus.INVALID
             raise_error(
@@ -473,8 +534,7 @@ def request_product(
                 ValueError(f"Price not found for product {product.id}"),
             )
 
-        # Decimal을 직접 센트 단위로 변환 (정밀도 문제 방지)
-        expected_amount_cents = int(price.price * 100)
+        expected_amount_cents = price.cents
 
         # 가격이 0원 이하인 경우 차단
         if expected_amount_cents <= 0:
@@ -486,14 +546,22 @@ def request_product(
             )
 
         # Stripe 검증
-        success, msg, purchase = validate_web(
-            stripe_secret_key=stripe_key,
-            stripe_api_version=config.stripe_api_version,
-            payment_intent_id=payment_intent_id,
-            expected_product_id=int(product_id),  # int로 변환
-            expected_amount_cents=expected_amount_cents,
-            db_product=product
-        )
+        try:
+            success, msg, purchase = get_guard("web").call(
+                validate_web,
+                stripe_secret_key=stripe_key,
+                stripe_api_version=config.stripe_api_version,
+                payment_intent_id=payment_intent_id,
+                expected_product_id=int(product_id),  # int로 변환
+                expected_amount_cents=expected_amount_cents,
+                db_product=product,
+                sess=sess,
+                expected_currency=price.currency,
+                # Payment of test mode never validates live purchase, and vice versa
+                expected_livemode=receipt_data.store == Store.WEB,
+            )
+        except CircuitOpenError as e:
+            return defer_validation(sess, receipt, e)
 
         if success:
             # 영수증 데이터 업데이트
@@ -646,8 +714,7 @@ def request_product(
             "package_name": receipt.package_name,
         }
 
-        send_product_message = SendProductMessage(uuid=str(receipt.uuid))
-        task_id = send_to_worker("iap.send_product", send_product_message.model_dump())
+        task_id = send_product_to_worker(str(receipt.uuid), DeliveryLane.PAID, PlanetID(receipt.planet_id))
         logging.debug(
             f"Task for product {receipt.uuid} sent to Celery worker with task_id: {task_id}"
         )
@@ -660,6 +727,121 @@ def request_product(
     return receipt
 
 
+def revalidate_receipts(sess, limit: int = 50) -> int:
+    """
+    Finish receipts deferred by `defer_validation` once the store is available again.
+
+    Rows are locked with `SKIP LOCKED` so multiple API workers can run this at the same time.
+    Returns number of receipts processed.
+    """
+    store_guard_map = {
+        Store.GOOGLE: "google",
+        Store.GOOGLE_TEST: "google",
+        Store.APPLE: "apple",
+        Store.APPLE_TEST: "apple",
+        Store.WEB: "web",
+        Store.WEB_TEST: "web",
+    }
+    available_stores = [
+        store for store, name in store_guard_map.items() if get_guard(name).available
+    ]
+    if not available_stores:
+        return 0
+
+    handled_ids = []
+    for _ in range(limit):
+        # Only receipts deferred by `defer_validation` have `revalidate_at`
+        receipt = sess.scalar(
+            select(Receipt)
+            .where(
+                Receipt.status == ReceiptStatus.VALIDATION_REQUEST,
+                Receipt.revalidate_at <= func.now(),
+                Receipt.store.in_(available_stores),
+            )
+            .order_by(Receipt.revalidate_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if receipt is None:
+            break
+
+        # Schedule the next try before validation: if validation crashes, the receipt waits for backoff
+        # instead of blocking other deferred receipts. Commit releases the lock, but the receipt is not due anymore.
+        receipt.revalidate_attempts = (receipt.revalidate_attempts or 0) + 1
+        receipt.revalidate_at = get_revalidate_at(receipt.revalidate_attempts)
+        sess.commit()
+        handled_ids.append(receipt.id)
+
+        receipt_data = ReceiptSchema(
+            data=receipt.data,
+            store=receipt.store,
+            agentAddress=receipt.agent_addr,
+            avatarAddress=receipt.avatar_addr,
+            planetId=PlanetID(receipt.planet_id),
+        )
+        order_id, product_id, _ = get_order_data(receipt_data)
+        product = get_store_product(sess, receipt.store, product_id)
+        try:
+            receipt = process_receipt(
+                sess,
+                receipt,
+                receipt_data,
+                product,
+                product_id,
+                order_id,
+                PackageName(receipt.package_name),
+            )
+        except Exception as e:
+            # `raise_error` already saved failed receipt.
+            logger.warning(f"[{receipt.uuid}] :: Revalidation failed :: {e}")
+            sess.rollback()
+            sess.refresh(receipt)
+            if receipt.status == ReceiptStatus.VALIDATION_REQUEST and receipt.revalidate_at is None:
+                # Saved by `raise_error` without final status: validation error is permanent.
+                receipt.status = ReceiptStatus.INVALID
+                receipt.msg = "\n".join([receipt.msg or "", str(e)])
+                sess.commit()
+            continue
+
+        if receipt.status == ReceiptStatus.VALIDATION_REQUEST:
+            # Store became unavailable again. Try again at next run.
+            break
+
+    return len(handled_ids)
+
+
+def retry_pending_acks(sess, limit: int = 50) -> int:
+    """
+    Acknowledge Google purchases deferred by `ack_purchase` once the store is available again.
+    Returns number of receipts acknowledged.
+    """
+    if not get_guard("google").available:
+        return 0
+
+    count = 0
+    for _ in range(limit):
+        receipt = sess.scalar(
+            select(Receipt)
+            .where(Receipt.ack_at <= func.now())
+            .order_by(Receipt.ack_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if receipt is None:
+            break
+
+        receipt_data = ReceiptSchema(data=receipt.data, store=receipt.store)
+        _, product_id, _ = get_order_data(receipt_data)
+        ack_purchase(receipt, PackageName(receipt.package_name), product_id, receipt_data.order.get("purchaseToken"))
+        sess.commit()
+        if receipt.ack_at is not None:
+            # Store became unavailable again. Try again at next run.
+            break
+        count += 1
+
+    return count
+
+
 @router.post("/free", response_model=ReceiptDetailSchema)
 def free_product(
     receipt_data: FreeReceiptSchema,
@@ -773,8 +955,7 @@ def free_product(
         "package_name": receipt.package_name,
     }
 
-    send_product_message = SendProductMessage(uuid=str(receipt.uuid))
-    task_id = send_to_worker("iap.send_product", send_product_message.model_dump())
+    task_id = send_product_to_worker(str(receipt.uuid), DeliveryLane.FREE, PlanetID(receipt.planet_id))
     logging.debug(
         f"Task for product {receipt.uuid} sent to Celery worker with task_id: {task_id}"
     )
@@ -905,8 +1086,7 @@ def mileage_product(
         "package_name": receipt.package_name,
     }
 
-    send_product_message = SendProductMessage(uuid=str(receipt.uuid))
-    task_id = send_to_worker("iap.send_product", send_product_message.model_dump())
+    task_id = send_product_to_worker(str(receipt.uuid), DeliveryLane.FREE, PlanetID(receipt.planet_id))
     logging.debug(
         f"Task for product {receipt.uuid} sent to Celery worker with task_id: {task_id}"
     )
@@ -4,10 +4,9 @@ from uuid import uuid4
 
 import requests
 from fastapi import APIRouter, Depends, HTTPException
-from shared.enums import PackageName, PlanetID, ReceiptStatus, Store
+from shared.enums import DeliveryLane, PackageName, PlanetID, ReceiptStatus, Store
 from shared.models.product import Product
 from shared.models.receipt import Receipt
-from shared.schemas.message import SendProductMessage
 from shared.schemas.redeem import (
     RedeemErrorResponseSchema,
     RedeemRequestSchema,
@@ -16,7 +15,7 @@ from shared.schemas.redeem import (
 from sqlalchemy import or_, select
 from sqlalchemy.orm import joinedload
 
-from app.celery import send_to_worker
+from app.celery import send_product_to_worker
 from app.config import config
 from app.dependencies import session
 from app.utils import generate_redeem_jwt
@@ -141,8 +140,7 @@ def redeem_code(
             sess.refresh(receipt)
 
             # Celery worker로 전송하여 grant_items transaction 생성
-            send_product_message = SendProductMessage(uuid=str(receipt.uuid))
-            task_id = send_to_worker("iap.send_product", send_product_message.model_dump())
+            task_id = send_product_to_worker(str(receipt.uuid), DeliveryLane.REDEEM, planet_id)
             logger.debug(
                 f"Task for redeem code {receipt.uuid} sent to Celery worker with task_id: {task_id}"
             )
@@ -3,12 +3,13 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from shared.enums import Store
 from shared.models.receipt import Receipt
-from shared.models.product import Product, Price
+from shared.models.product import Product
 from shared.schemas.receipt import ReceiptDetailSchema, ReceiptSchema
 from shared.validator.web import validate_web, validate_web_test
 
 from app.config import config
 from app.dependencies import session
+from app.price_index import price_index
 
 router = APIRouter(
     prefix="/validate",
@@ -49,12 +50,8 @@ def validate_web_payment(receipt: Receipt, sess) -> ReceiptDetailSchema:
             msg=f"Product not found: {receipt.data.get('productId')}"
         )
 
-    # 상품 가격 조회 (스토어 타입 무시하고 첫 번째 가격 사용)
-    price = sess.scalar(
-        select(Price)
-        .where(Price.product_id == product.id)
-        .limit(1)
-    )
+    # 상품 가격 조회 (해당 스토어의 활성 USD 가격, 없으면 다른 스토어의 활성 USD 가격)
+    price = price_index.get(sess, product.id, receipt.store, "USD")
     if not price:
         return ReceiptDetailSchema(
             store=receipt.store,
@@ -69,8 +66,7 @@ def validate_web_payment(receipt: Receipt, sess) -> ReceiptDetailSchema:
         else config.stripe_secret_key
     )
 
-    # Decimal을 직접 센트 단위로 변환 (정밀도 문제 방지)
-    expected_amount_cents = int(price.price * 100)
+    expected_amount_cents = price.cents
 
     success, msg, purchase = validate_web(
         stripe_secret_key=stripe_key,
@@ -78,7 +74,11 @@ def validate_web_payment(receipt: Receipt, sess) -> ReceiptDetailSchema:
         payment_intent_id=receipt.order_id,
         expected_product_id=int(receipt.data.get("productId")),  # int로 변환
         expected_amount_cents=expected_amount_cents,
-        db_product=product
+        db_product=product,
+        sess=sess,
+        expected_currency=price.currency,
+        # Payment of test mode never validates live purchase, and vice versa
+        expected_livemode=receipt.store == Store.WEB,
     )
 
     return ReceiptDetailSchema(
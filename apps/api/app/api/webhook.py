@@ -0,0 +1,204 @@
+import hmac
+from datetime import datetime, timezone
+
+import stripe
+import structlog
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pydantic import BaseModel as BaseSchema
+from shared.enums import AppleNotificationType, GoogleOneTimeNotificationType, Store
+from shared.models.payment import StripePaymentEvent
+from shared.schemas.notification import (
+    AppleNotificationSchema,
+    AppleTransactionSchema,
+    GoogleNotificationSchema,
+    PubSubPushSchema,
+    RefundSchema,
+)
+from shared.utils.apple import AppleSignatureError, verify_signed_payload
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.celery import send_to_worker
+from app.config import config
+from app.dependencies import session
+
+router = APIRouter(
+    prefix="/webhook",
+    tags=["Webhook"],
+)
+
+logger = structlog.get_logger(__name__)
+
+
+async def raw_body(request: Request) -> bytes:
+    # Signature must be verified against untouched request body
+    return await request.body()
+
+
+def construct_stripe_event(payload: bytes, sig_header: str) -> stripe.Event:
+    """
+    Verifies event with live and test webhook secrets.
+    Event must have the same mode with the verifying secret, so test event is never recorded as live one.
+    """
+    secrets = [
+        (secret, livemode)
+        for secret, livemode in ((config.stripe_webhook_secret, True), (config.stripe_test_webhook_secret, False))
+        if secret
+    ]
+    if not secrets:
+        raise HTTPException(status_code=503, detail="Stripe webhook is not configured")
+
+    for secret, livemode in secrets:
+        try:
+            event = stripe.Webhook.construct_event(payload, sig_header, secret)
+        except stripe.SignatureVerificationError:
+            continue
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid payload")
+        if bool(event.get("livemode")) != livemode:
+            raise HTTPException(status_code=400, detail="Livemode mismatch")
+        return event
+    raise HTTPException(status_code=400, detail="Invalid signature")
+
+
+@router.post("/stripe")
+def stripe_webhook(
+        payload: bytes = Depends(raw_body),
+        stripe_signature: str = Header(""),
+        sess: Session = Depends(session),
+):
+    """
+    # Stripe webhook
+    ---
+
+    Records `payment_intent.succeeded` events so that web purchases can be validated without calling Stripe API.
+    Other event types are acknowledged and ignored.
+    """
+    event = construct_stripe_event(payload, stripe_signature)
+    if event.type != "payment_intent.succeeded":
+        return {"received": True}
+
+    intent = event.data.object
+    metadata = dict(intent.get("metadata") or {})
+    product_id = metadata.get("productId")
+    sess.execute(
+        insert(StripePaymentEvent)
+        .values(
+            event_id=event.id,
+            payment_intent_id=intent.id,
+            status=intent.status,
+            amount=intent.amount,
+            currency=intent.currency,
+            product_id=int(product_id) if product_id and product_id.isdigit() else None,
+            payment_method=intent.get("payment_method"),
+            meta=metadata,
+            livemode=bool(event.get("livemode")),
+            purchased_at=datetime.fromtimestamp(intent.created, tz=timezone.utc),
+        )
+        .on_conflict_do_nothing(index_elements=[StripePaymentEvent.payment_intent_id])
+    )
+    sess.commit()
+    logger.info(f"Stripe payment {intent.id} is recorded from event {event.id}")
+    return {"received": True}
+
+
+@router.post("/google")
+def google_webhook(push: PubSubPushSchema, token: str = ""):
+    """
+    # Google Play real-time developer notification
+    ---
+
+    Pub/Sub push endpoint for RTDN. Push subscription must have `?token=` query param to authenticate.
+
+    - `voidedPurchaseNotification`: Refund is sent to worker to mark the receipt as `REFUNDED_BY_BUYER`.
+    - `oneTimeProductNotification`: Logged only. Receipt of the purchase is sent from the client.
+    """
+    if not config.google_rtdn_token:
+        raise HTTPException(status_code=503, detail="Google RTDN webhook is not configured")
+    if not hmac.compare_digest(token, config.google_rtdn_token):
+        raise HTTPException(status_code=403, detail="Invalid token")
+
+    try:
+        notification = GoogleNotificationSchema.from_pubsub(push)
+    except ValueError as e:
+        logger.warning(f"Invalid RTDN message {push.message.messageId}: {e}")
+        raise HTTPException(status_code=400, detail="Invalid notification")
+
+    if notification.voidedPurchaseNotification:
+        voided = notification.voidedPurchaseNotification
+        refund = RefundSchema(
+            store=Store.GOOGLE,
+            packageName=notification.packageName,
+            orderId=voided.orderId,
+            refundedAt=notification.eventTime,
+            source="RTDN",
+            reason=voided.refundType.name,
+        )
+        send_to_worker(
+            "iap.apply_refunds",
+            {"refunds": [refund.model_dump(mode="json")]},
+            queue="background_job_queue",
+        )
+    elif notification.oneTimeProductNotification:
+        one_time = notification.oneTimeProductNotification
+        log = logger.warning if one_time.notificationType == GoogleOneTimeNotificationType.ONE_TIME_PRODUCT_CANCELED else logger.info
+        log(f"[RTDN] {notification.packageName} :: {one_time.sku} :: {one_time.notificationType.name}")
+    elif notification.testNotification is not None:
+        logger.info(f"[RTDN] Test notification from {notification.packageName}")
+
+    return {"received": True}
+
+
+class AppleSignedPayloadSchema(BaseSchema):
+    signedPayload: str
+
+
+@router.post("/apple")
+def apple_webhook(body: AppleSignedPayloadSchema):
+    """
+    # App Store Server Notifications V2
+    ---
+
+    Verifies signed payload with pinned Apple root CA.
+
+    - `REFUND`, `REVOKE`: Refund is sent to worker to mark the receipt as `REFUNDED_BY_BUYER`.
+    - `CONSUMPTION_REQUEST`: Logged to be handled by administrator.
+    - Other notification types are acknowledged and ignored.
+    """
+    try:
+        notification = AppleNotificationSchema(
+            **verify_signed_payload(body.signedPayload, config.apple_root_ca_fingerprints)
+        )
+        if notification.notificationType not in {x.value for x in AppleNotificationType}:
+            return {"received": True}
+        if not (notification.data and notification.data.signedTransactionInfo):
+            raise ValueError("signedTransactionInfo is missing")
+        tx = AppleTransactionSchema(
+            **verify_signed_payload(notification.data.signedTransactionInfo, config.apple_root_ca_fingerprints)
+        )
+    except (AppleSignatureError, ValueError) as e:
+        logger.warning(f"Invalid App Store notification: {e}")
+        raise HTTPException(status_code=400, detail="Invalid notification")
+
+    notification_type = AppleNotificationType(notification.notificationType)
+    if notification_type == AppleNotificationType.CONSUMPTION_REQUEST:
+        logger.warning(
+            f"[ASSN] Consumption request for {tx.transactionId} :: {tx.bundleId} :: {tx.productId}"
+        )
+        return {"received": True}
+
+    refund = RefundSchema(
+        store=Store.APPLE,
+        packageName=tx.bundleId,
+        orderId=tx.transactionId,
+        purchasedAt=tx.purchasedAt,
+        refundedAt=tx.revokedAt or datetime.fromtimestamp(notification.signedDate / 1000, tz=timezone.utc),
+        source=notification_type.value,
+        reason=tx.revocationReason.name if tx.revocationReason is not None else None,
+    )
+    send_to_worker(
+        "iap.apply_refunds",
+        {"refunds": [refund.model_dump(mode="json")]},
+        queue="background_job_queue",
+    )
+    return {"received": True}
@@ -1,8 +1,11 @@
 import json
+import time
 from typing import Any, Dict
 
 import structlog
 from celery import Celery
+from shared.enums import DeliveryLane, PlanetID
+from shared.schemas.message import SendProductMessage
 
 from app.config import config
 
@@ -23,21 +26,20 @@ celery_app.conf.update(
 )
 
 
-def send_to_worker(task_name: str, message: Dict[str, Any]) -> str:
+def send_to_worker(task_name: str, message: Dict[str, Any], queue: str = "product_queue") -> str:
     """
     Send a task to the Celery worker
 
     Args:
         task_name: The name of the task to execute
         message: The message data to send with the task
+        queue: The queue to send the task
 
     Returns:
         str: Task ID
     """
     try:
         logger.info(f"Sending task to Celery worker: {task_name}", message=message)
-        queue = "product_queue"
-
         task = celery_app.send_task(task_name, args=[message], queue=queue)
         logger.info(
             f"Task sent to Celery worker: {task_name}", task_id=task.id, queue=queue
@@ -50,3 +52,15 @@ def send_to_worker(task_name: str, message: Dict[str, Any]) -> str:
             exc_info=exc,
         )
         raise
+
+
+def send_product_to_worker(uuid: str, lane: DeliveryLane, planet_id: PlanetID) -> str:
+    """
+    Send `iap.send_product` task of the receipt to the queue of its delivery lane.
+    The queue is sharded by planet when `shard_by_planet` is set.
+    """
+    message = SendProductMessage(
+        uuid=uuid, lane=lane, planet_id=planet_id.value.decode(), enqueued_at=time.time()
+    )
+    queue = lane.queue(planet_id) if config.shard_by_planet else lane.value
+    return send_to_worker("iap.send_product", message.model_dump(mode="json"), queue=queue)
@@ -3,6 +3,7 @@ from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from shared.enums import PackageName, PlanetID
+from shared.utils.apple import APPLE_ROOT_CA_G3_FINGERPRINT
 
 
 class Settings(BaseSettings):
@@ -35,11 +36,34 @@ class Settings(BaseSettings):
     apple_key_id: str
     apple_issuer_id: str
     apple_validation_url: str
+    # SHA-256 fingerprints of trusted root CA for App Store Server Notifications
+    apple_root_ca_fingerprints: list[str] = [APPLE_ROOT_CA_G3_FINGERPRINT]
+    # Token in Pub/Sub push subscription URL for Google RTDN webhook (`?token=`)
+    google_rtdn_token: Optional[str] = None
 
     # Stripe configuration (기존 web_payment_* 설정 대체)
     stripe_secret_key: str
     stripe_test_secret_key: str
     stripe_api_version: str = "2025-09-30.clover"
+    # Stripe webhook signing secrets (whsec_xxx). Webhook is disabled when none is set.
+    stripe_webhook_secret: Optional[str] = None
+    stripe_test_webhook_secret: Optional[str] = None
+
+    # Store validation guard: bulkhead and circuit breaker for each store
+    store_max_concurrency: int = 8
+    store_acquire_timeout: float = 0.5
+    store_failure_threshold: int = 5
+    store_reset_timeout: float = 30
+    revalidate_interval: int = 30
+    revalidate_batch_size: int = 50
+    # Deferred receipt is validated again after interval * 2^attempts seconds, up to max
+    revalidate_backoff_max: int = 3600
+
+    # Seconds to keep in-memory active price index before reloading
+    price_index_ttl: int = 300
+
+    # Send product delivery into per-planet queue shards. Enable after workers consume the shards.
+    shard_by_planet: bool = False
 
     stage: str = "development"
     debug: bool = False
@@ -0,0 +1,93 @@
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from shared.enums import Store
+from shared.models.product import Price
+from sqlalchemy import select
+
+from app.config import config
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexedPrice:
+    product_id: int
+    store: Store
+    currency: str
+    price: Decimal
+
+    @property
+    def cents(self) -> int:
+        # Decimal을 직접 센트 단위로 변환 (정밀도 문제 방지)
+        return int(self.price * 100)
+
+
+class PriceIndex:
+    """
+    In-memory index of active prices keyed by (product_id, store, currency).
+
+    Index is rebuilt on price import and after `ttl` seconds,
+    so other API processes pick up imported prices within `ttl`.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._price_dict: Dict[Tuple[int, Store, str], IndexedPrice] = {}
+        self._product_dict: Dict[int, List[IndexedPrice]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self, sess):
+        price_dict = {}
+        product_dict = {}
+        # Ordered by id: when a key has several active prices, the latest one wins.
+        for price in sess.scalars(select(Price).where(Price.active.is_(True)).order_by(Price.id)):
+            price_dict[(price.product_id, price.store, price.currency)] = IndexedPrice(
+                product_id=price.product_id,
+                store=price.store,
+                currency=price.currency,
+                price=Decimal(price.price),
+            )
+        for indexed in sorted(price_dict.values(), key=lambda x: (x.store, x.currency)):
+            product_dict.setdefault(indexed.product_id, []).append(indexed)
+
+        with self._lock:
+            self._price_dict = price_dict
+            self._product_dict = product_dict
+            self._loaded_at = time.monotonic()
+        logger.info(f"Price index is refreshed with {len(price_dict)} active prices")
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_fresh(self, sess):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+            self.refresh(sess)
+
+    def get(self, sess, product_id: int, store: Store, currency: str = "USD") -> Optional[IndexedPrice]:
+        """
+        Returns active price of the product for the store and currency.
+        If the store has no own price, active price of another store with the same currency is used (lower store value first).
+        """
+        self._ensure_fresh(sess)
+        price = self._price_dict.get((product_id, store, currency))
+        if price:
+            return price
+        return next(
+            (x for x in self._product_dict.get(product_id, []) if x.currency == currency),
+            None,
+        )
+
+    def product_prices(self, sess, product_id: int) -> List[IndexedPrice]:
+        self._ensure_fresh(sess)
+        return self._product_dict.get(product_id, [])
+
+
+price_index = PriceIndex(ttl=config.price_index_ttl)
@@ -0,0 +1,45 @@
+import asyncio
+
+import structlog
+from sqlalchemy.orm import scoped_session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.api.purchase import retry_pending_acks, revalidate_receipts
+from app.config import config
+from app.dependencies import engine
+
+logger = structlog.get_logger(__name__)
+
+
+def revalidate_once() -> int:
+    sess = scoped_session(sessionmaker(engine))
+    try:
+        return revalidate_receipts(sess, limit=config.revalidate_batch_size)
+    finally:
+        sess.close()
+
+
+def ack_once() -> int:
+    sess = scoped_session(sessionmaker(engine))
+    try:
+        return retry_pending_acks(sess, limit=config.revalidate_batch_size)
+    finally:
+        sess.close()
+
+
+async def run_revalidator():
+    """Background loop finishing receipts and Google ACKs deferred while the store circuit was open."""
+    while True:
+        await asyncio.sleep(config.revalidate_interval)
+        try:
+            count = await run_in_threadpool(revalidate_once)
+            if count:
+                logger.info(f"{count} deferred receipts are revalidated")
+        except Exception as e:
+            logger.error(f"Failed to revalidate deferred receipts: {e}")
+        try:
+            count = await run_in_threadpool(ack_once)
+            if count:
+                logger.info(f"{count} deferred Google purchases are acknowledged")
+        except Exception as e:
+            logger.error(f"Failed to acknowledge deferred Google purchases: {e}")
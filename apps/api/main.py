@@ -1,3 +1,5 @@
+import asyncio
+
 import structlog
 import uvicorn
 from fastapi import FastAPI
@@ -12,6 +14,7 @@ from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERRO
 from app import api
 from app.config import config
 from app.exceptions import ReceiptNotFoundException
+from app.revalidator import run_revalidator
 
 logger = structlog.get_logger(__name__)
 
@@ -29,6 +32,7 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup():
     FastAPICache.init(InMemoryBackend())
+    asyncio.create_task(run_revalidator())
 
 
 @app.middleware("http")
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from shared.enums import Store
+
+from app.api.admin import ImportPricesRequest, import_prices_endpoint
+from app.price_index import PriceIndex, price_index
+
+
+def make_price(price_id, product_id, store, currency, price):
+    return SimpleNamespace(id=price_id, product_id=product_id, store=store, currency=currency, price=price)
+
+
+def make_session(price_list):
+    sess = MagicMock()
+    sess.scalars.side_effect = lambda *_: iter(list(price_list))
+    return sess
+
+
+def test_get_own_store_price():
+    sess = make_session([
+        make_price(1, 10, Store.GOOGLE, "USD", Decimal("1.99")),
+        make_price(2, 10, Store.APPLE, "USD", Decimal("2.99")),
+        # Latest active price of the same key wins
+        make_price(3, 10, Store.APPLE, "USD", Decimal("3.99")),
+    ])
+    index = PriceIndex()
+
+    price = index.get(sess, 10, Store.APPLE, "USD")
+    assert price.price == Decimal("3.99")
+    assert price.cents == 399
+    assert index.get(sess, 10, Store.GOOGLE, "USD").cents == 199
+
+
+def test_get_falls_back_to_other_store_with_same_currency():
+    sess = make_session([
+        make_price(1, 10, Store.APPLE, "KRW", Decimal("1500")),
+        make_price(2, 10, Store.GOOGLE, "USD", Decimal("1.99")),
+        make_price(3, 10, Store.APPLE, "USD", Decimal("2.99")),
+    ])
+    index = PriceIndex()
+
+    # Lower store value first
+    price = index.get(sess, 10, Store.WEB, "USD")
+    assert price.store == min(Store.GOOGLE, Store.APPLE)
+    assert price.price == {Store.GOOGLE: Decimal("1.99"), Store.APPLE: Decimal("2.99")}[price.store]
+    assert index.get(sess, 10, Store.WEB, "KRW").price == Decimal("1500")
+
+
+def test_get_missing_price():
+    sess = make_session([make_price(1, 10, Store.GOOGLE, "USD", Decimal("1.99"))])
+    index = PriceIndex()
+
+    assert index.get(sess, 10, Store.GOOGLE, "EUR") is None
+    assert index.get(sess, 11, Store.GOOGLE, "USD") is None
+    assert index.product_prices(sess, 11) == []
+
+
+@patch("app.price_index.time")
+def test_reload_after_ttl(time_):
+    price_list = [make_price(1, 10, Store.GOOGLE, "USD", Decimal("1.99"))]
+    sess = make_session(price_list)
+    index = PriceIndex(ttl=300)
+
+    time_.monotonic.return_value = 1000
+    assert index.get(sess, 10, Store.GOOGLE).cents == 199
+    price_list[0] = make_price(2, 10, Store.GOOGLE, "USD", Decimal("2.99"))
+
+    # Cached until ttl passes
+    time_.monotonic.return_value = 1299
+    assert index.get(sess, 10, Store.GOOGLE).cents == 199
+    assert sess.scalars.call_count == 1
+
+    time_.monotonic.return_value = 1300
+    assert index.get(sess, 10, Store.GOOGLE).cents == 299
+    assert sess.scalars.call_count == 2
+
+    # Invalidated index is reloaded on next use
+    index.invalidate()
+    index.get(sess, 10, Store.GOOGLE)
+    assert sess.scalars.call_count == 3
+
+
+@patch("app.api.admin.import_prices_from_csv", return_value=(1, 1))
+def test_import_prices_refreshes_index(_):
+    price_list = [make_price(1, 10, Store.GOOGLE, "USD", Decimal("1.99"))]
+    sess = make_session(price_list)
+    price_index.refresh(sess)
+    assert price_index.get(sess, 10, Store.GOOGLE).cents == 199
+
+    price_list[0] = make_price(2, 10, Store.GOOGLE, "USD", Decimal("4.99"))
+    result = import_prices_endpoint(ImportPricesRequest(csv_content="product_id,price\n"), sess)
+
+    assert result["updated_count"] == 1
+    # Imported price is used at once without waiting for ttl
+    assert price_index.get(sess, 10, Store.GOOGLE).cents == 499
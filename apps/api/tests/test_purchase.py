@@ -0,0 +1,170 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from shared.enums import PackageName, PlanetID, ReceiptStatus, Store
+from shared.models.receipt import Receipt
+from shared.schemas.receipt import ReceiptSchema
+from shared.validator.guard import CircuitOpenError
+
+from app.api.purchase import ack_purchase, process_receipt, retry_pending_acks, revalidate_receipts
+from app.config import config
+
+GOOGLE_DATA = {
+    "Store": "GooglePlay",
+    "Payload": json.dumps(
+        {
+            "json": json.dumps(
+                {"orderId": "GPA.1", "productId": "sku", "purchaseToken": "token", "purchaseTime": 1700000000000}
+            )
+        }
+    ),
+}
+
+
+def make_receipt(**kwargs) -> Receipt:
+    kwargs.setdefault("revalidate_attempts", 0)
+    return Receipt(
+        id=1,
+        store=Store.GOOGLE,
+        data=GOOGLE_DATA,
+        package_name=PackageName.NINE_CHRONICLES_M.value,
+        agent_addr="0x" + "a" * 40,
+        avatar_addr="0x" + "b" * 40,
+        planet_id=PlanetID.ODIN.value,
+        status=ReceiptStatus.VALIDATION_REQUEST,
+        **kwargs,
+    )
+
+
+def make_guard(available=True, side_effect=None):
+    guard = MagicMock()
+    guard.available = available
+    guard.call.side_effect = side_effect
+    return guard
+
+
+@patch("app.api.purchase.get_guard")
+def test_process_receipt_defers_validation(get_guard):
+    get_guard.return_value = make_guard(side_effect=CircuitOpenError("google", "circuit is open"))
+    receipt = make_receipt(revalidate_attempts=2)
+    receipt_data = ReceiptSchema(data=GOOGLE_DATA, store=Store.GOOGLE)
+    before = datetime.now(timezone.utc)
+
+    result = process_receipt(
+        MagicMock(), receipt, receipt_data, None, "sku", "GPA.1", PackageName.NINE_CHRONICLES_M
+    )
+
+    assert result.status == ReceiptStatus.VALIDATION_REQUEST
+    # Backs off by attempts
+    delay = min(config.revalidate_interval * 4, config.revalidate_backoff_max)
+    assert before + timedelta(seconds=delay) <= result.revalidate_at
+    assert "circuit is open" in result.msg
+
+
+@patch("app.api.purchase.get_guard")
+def test_ack_purchase_deferred_while_store_unavailable(get_guard):
+    receipt = make_receipt()
+    get_guard.return_value = make_guard(side_effect=CircuitOpenError("google", "circuit is open"))
+    ack_purchase(receipt, PackageName.NINE_CHRONICLES_M, "sku", "token")
+    assert receipt.ack_at is not None
+
+    get_guard.return_value = make_guard()
+    ack_purchase(receipt, PackageName.NINE_CHRONICLES_M, "sku", "token")
+    assert receipt.ack_at is None
+
+
+@patch("app.api.purchase.ack_google")
+@patch("app.api.purchase.get_guard")
+def test_retry_pending_acks(get_guard, ack_google):
+    get_guard.return_value = make_guard(available=False)
+    sess = MagicMock()
+    assert retry_pending_acks(sess) == 0
+    sess.scalar.assert_not_called()
+
+    guard = make_guard()
+    guard.call.side_effect = lambda fn, *args: fn(*args)
+    get_guard.return_value = guard
+    receipt = make_receipt(ack_at=datetime.now(timezone.utc))
+    sess.scalar.side_effect = [receipt, None]
+    assert retry_pending_acks(sess) == 1
+    ack_google.assert_called_once_with(config.google_credential, PackageName.NINE_CHRONICLES_M, "sku", "token")
+    assert receipt.ack_at is None
+    sess.commit.assert_called_once()
+
+    # Store is unavailable again: stop and keep the ACK pending
+    guard.call.side_effect = CircuitOpenError("google", "circuit is open")
+    receipt = make_receipt(ack_at=datetime.now(timezone.utc))
+    sess.scalar.side_effect = [receipt, make_receipt()]
+    assert retry_pending_acks(sess) == 0
+    assert receipt.ack_at is not None
+
+
+@patch("app.api.purchase.get_guard")
+def test_revalidate_receipts_without_available_store(get_guard):
+    get_guard.return_value = make_guard(available=False)
+    sess = MagicMock()
+    assert revalidate_receipts(sess) == 0
+    sess.scalar.assert_not_called()
+
+
+@patch("app.api.purchase.get_store_product")
+@patch("app.api.purchase.process_receipt")
+@patch("app.api.purchase.get_guard")
+def test_revalidate_receipts_schedules_backoff_before_validation(get_guard, process_receipt, _):
+    get_guard.return_value = make_guard()
+    receipt = make_receipt(revalidate_at=datetime.now(timezone.utc))
+    sess = MagicMock()
+    sess.scalar.side_effect = [receipt, None]
+
+    def validate(sess_, receipt_, *args):
+        # Next try is already scheduled and committed when validation starts
+        assert receipt_.revalidate_attempts == 1
+        assert receipt_.revalidate_at > datetime.now(timezone.utc)
+        sess_.commit.assert_called_once()
+        receipt_.status = ReceiptStatus.VALID
+        return receipt_
+
+    process_receipt.side_effect = validate
+    assert revalidate_receipts(sess) == 1
+    assert receipt.status == ReceiptStatus.VALID
+
+
+@patch("app.api.purchase.get_store_product")
+@patch("app.api.purchase.process_receipt")
+@patch("app.api.purchase.get_guard")
+def test_revalidate_receipts_stops_when_deferred_again(get_guard, process_receipt, _):
+    get_guard.return_value = make_guard()
+    receipt_list = [make_receipt(), make_receipt()]
+    sess = MagicMock()
+    sess.scalar.side_effect = receipt_list
+    process_receipt.side_effect = lambda sess_, receipt_, *args: receipt_
+
+    assert revalidate_receipts(sess) == 1
+    assert receipt_list[0].revalidate_attempts == 1
+    assert receipt_list[1].revalidate_attempts == 0
+
+
+@patch("app.api.purchase.get_store_product")
+@patch("app.api.purchase.process_receipt")
+@patch("app.api.purchase.get_guard")
+def test_revalidate_receipts_invalid_on_permanent_error(get_guard, process_receipt, _):
+    get_guard.return_value = make_guard()
+    permanent, crashed = make_receipt(), make_receipt()
+    sess = MagicMock()
+    sess.scalar.side_effect = [permanent, crashed, None]
+
+    def validate(sess_, receipt_, *args):
+        if receipt_ is permanent:
+            # Saved by `raise_error` without final status
+            receipt_.revalidate_at = None
+            raise ValueError("Invalid Receipt")
+        raise ConnectionError("DB is down")
+
+    process_receipt.side_effect = validate
+    assert revalidate_receipts(sess) == 2
+    assert permanent.status == ReceiptStatus.INVALID
+    assert "Invalid Receipt" in permanent.msg
+    # Crashed one waits for backoff as deferred
+    assert crashed.status == ReceiptStatus.VALIDATION_REQUEST
+    assert crashed.revalidate_at is not None
@@ -0,0 +1,24 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from shared.enums import Store
+from shared.models.receipt import Receipt
+
+from app.api.validate import validate_web_payment
+
+
+@pytest.mark.parametrize("store,livemode", [(Store.WEB, True), (Store.WEB_TEST, False)])
+@patch("app.api.validate.ReceiptDetailSchema")
+@patch("app.api.validate.validate_web", return_value=(True, "", None))
+@patch("app.api.validate.price_index")
+def test_validate_web_payment_checks_mode_and_currency(price_index, validate_web, _, store, livemode):
+    price_index.get.return_value = MagicMock(cents=1099, currency="USD")
+    sess = MagicMock()
+    sess.scalar.return_value = MagicMock(id=12)
+    receipt = Receipt(store=store, order_id="pi_1", data={"productId": "12"})
+
+    validate_web_payment(receipt, sess)
+    kwargs = validate_web.call_args.kwargs
+    assert kwargs["expected_amount_cents"] == 1099
+    assert kwargs["expected_currency"] == "USD"
+    assert kwargs["expected_livemode"] is livemode
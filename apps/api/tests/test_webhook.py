@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.api import webhook
+from app.dependencies import session
+
+LIVE_SECRET = "whsec_live"
+TEST_SECRET = "whsec_test"
+
+
+def make_event(livemode: bool, event_type: str = "payment_intent.succeeded") -> bytes:
+    return json.dumps(
+        {
+            "id": "evt_1",
+            "object": "event",
+            "type": event_type,
+            "livemode": livemode,
+            "data": {
+                "object": {
+                    "id": "pi_1",
+                    "object": "payment_intent",
+                    "status": "succeeded",
+                    "amount": 1099,
+                    "currency": "usd",
+                    "metadata": {"productId": "12"},
+                    "payment_method": "pm_1",
+                    "created": 1700000000,
+                }
+            },
+        }
+    ).encode()
+
+
+def sign(payload: bytes, secret: str) -> str:
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload.decode()}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+@pytest.fixture
+def sess():
+    return MagicMock()
+
+
+@pytest.fixture
+def client(sess):
+    app = FastAPI()
+    app.include_router(webhook.router)
+    app.dependency_overrides[session] = lambda: sess
+    with patch.object(webhook.config, "stripe_webhook_secret", LIVE_SECRET), patch.object(
+        webhook.config, "stripe_test_webhook_secret", TEST_SECRET
+    ):
+        yield TestClient(app)
+
+
+def post(client, payload: bytes, signature: str):
+    return client.post("/webhook/stripe", content=payload, headers={"Stripe-Signature": signature})
+
+
+@pytest.mark.parametrize("livemode,secret", [(True, LIVE_SECRET), (False, TEST_SECRET)])
+def test_stripe_webhook_records_payment(client, sess, livemode, secret):
+    payload = make_event(livemode)
+    resp = post(client, payload, sign(payload, secret))
+
+    assert resp.status_code == 200
+    sess.execute.assert_called_once()
+    sess.commit.assert_called_once()
+    stmt = sess.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    # Redelivered event is inserted only once
+    assert "ON CONFLICT (payment_intent_id) DO NOTHING" in str(stmt)
+    assert stmt.params["payment_intent_id"] == "pi_1"
+    assert stmt.params["product_id"] == 12
+    assert stmt.params["livemode"] is livemode
+
+
+def test_stripe_webhook_invalid_signature(client, sess):
+    payload = make_event(True)
+    assert post(client, payload, sign(payload, "whsec_other")).status_code == 400
+    assert post(client, payload, "").status_code == 400
+    sess.execute.assert_not_called()
+
+
+@pytest.mark.parametrize("livemode,secret", [(False, LIVE_SECRET), (True, TEST_SECRET)])
+def test_stripe_webhook_livemode_mismatch(client, sess, livemode, secret):
+    payload = make_event(livemode)
+    resp = post(client, payload, sign(payload, secret))
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Livemode mismatch"
+    sess.execute.assert_not_called()
+
+
+def test_stripe_webhook_ignores_other_event(client, sess):
+    payload = make_event(True, "payment_intent.created")
+    assert post(client, payload, sign(payload, LIVE_SECRET)).status_code == 200
+    sess.execute.assert_not_called()
+
+
+def test_stripe_webhook_not_configured(client, sess):
+    payload = make_event(True)
+    with patch.object(webhook.config, "stripe_webhook_secret", None), patch.object(
+        webhook.config, "stripe_test_webhook_secret", None
+    ):
+        assert post(client, payload, sign(payload, LIVE_SECRET)).status_code == 503
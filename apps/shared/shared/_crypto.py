@@ -1,22 +1,30 @@
 import hashlib
 import hmac
+import json
 import logging
 import os
+import threading
+from abc import ABC, abstractmethod
 from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha1
-from typing import Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import boto3
 import eth_utils
 from Crypto.Hash import keccak
 from botocore.exceptions import ClientError
 from eth_account import Account as EthAccount
+from eth_keys import keys
+from eth_keys.constants import SECPK1_N
 from eth_utils import to_checksum_address
 from pyasn1.codec.der.decoder import decode as der_decode
 from pyasn1.codec.der.encoder import encode as der_encode
 from pyasn1.type import namedtype, univ
 from pyasn1.type.univ import SequenceOf, Integer
 
+from shared.utils.metrics import get_latency_metric
+
 
 class ECDSASignatureRecord(univ.Sequence):
     componentType = namedtype.NamedTypes(
@@ -39,10 +47,41 @@ class SPKIRecord(univ.Sequence):
     )
 
 
-class Account:
-    def __init__(self, kms_key: str, region_name: str = "us-east-2"):
+class Signer(ABC):
+    """Key to sign 9c transactions"""
+
+    address: str
+    pubkey: bytes
+
+    @abstractmethod
+    def sign_tx(self, unsigned_tx: bytes) -> bytes:
+        """
+        Sign unsigned Tx.
+
+        :return: DER encoded (r, s) signature with low-s.
+        """
+        raise NotImplementedError
+
+    def get_item_garage_addr(self, item_id: str):
+        return derive_address(derive_address(self.address, "garage"), item_id)
+
+
+class Account(Signer):
+    """Signer of AWS KMS key"""
+
+    def __init__(self, kms_key: str, region_name: str = "us-east-2", cache_dir: Optional[str] = None):
+        """
+        :param cache_dir: Directory to cache public key of the KMS key. KMS is not called for public key when cached.
+        """
         self.client = boto3.client("kms", region_name=region_name)  # specify region
         self._kms_key: str = kms_key
+        self.sign_latency = get_latency_metric("sign_tx")
+
+        cached = self.__load_cache(cache_dir)
+        if cached:
+            self.pubkey_der, self.address, self.pubkey = cached
+            return
+
         try:
             self.pubkey_der: bytes = self.client.get_public_key(KeyId=self._kms_key)["PublicKey"]
             self.address: str = self.__der_encoded_public_key_to_eth_address(self.pubkey_der)
@@ -53,9 +92,43 @@ class Account:
 
         record, _ = der_decode(self.pubkey_der, asn1Spec=SPKIRecord())
         self.pubkey: bytes = record["subjectPublicKey"].asOctets()
+        self.__save_cache(cache_dir)
 
-    def get_item_garage_addr(self, item_id: str):
-        return derive_address(derive_address(self.address, "garage"), item_id)
+    def __cache_path(self, cache_dir: str) -> str:
+        # Key ID can be an ARN: use hash as file name
+        return os.path.join(cache_dir, f"{hashlib.sha256(self._kms_key.encode()).hexdigest()}.json")
+
+    def __load_cache(self, cache_dir: Optional[str]) -> Optional[Tuple[bytes, str, bytes]]:
+        if not cache_dir:
+            return None
+        try:
+            with open(self.__cache_path(cache_dir)) as f:
+                data = json.load(f)
+            if data["kms_key"] != self._kms_key:
+                return None
+            return bytes.fromhex(data["pubkey_der"]), data["address"], bytes.fromhex(data["pubkey"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def __save_cache(self, cache_dir: Optional[str]):
+        if not cache_dir:
+            return
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = self.__cache_path(cache_dir)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(
+                    {
+                        "kms_key": self._kms_key,
+                        "pubkey_der": self.pubkey_der.hex(),
+                        "address": self.address,
+                        "pubkey": self.pubkey.hex(),
+                    },
+                    f,
+                )
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logging.warning(f"Failed to cache public key of KMS key: {e}")
 
     def __public_key_int_to_eth_address(self, pubkey: int) -> str:
         """
@@ -122,19 +195,24 @@ class Account:
         v = self.__get_sig_v(msg_hash, r, s, address)
         return r, s, v
 
-    def __sign_msg_hash(self, msg_hash: bytes) -> Tuple[int, int, int]:
+    def __kms_sign(self, msg_hash: bytes) -> bytes:
         signature = self.client.sign(
             KeyId=self._kms_key,
             Message=msg_hash,
             MessageType="DIGEST",
             SigningAlgorithm="ECDSA_SHA_256",
         )
-        act_signature = signature["Signature"]
-        return self.__get_sig_r_s_v(msg_hash, act_signature, self.address)
+        return signature["Signature"]
+
+    def __sign_msg_hash(self, msg_hash: bytes) -> Tuple[int, int, int]:
+        return self.__get_sig_r_s_v(msg_hash, self.__kms_sign(msg_hash), self.address)
 
     def sign_tx(self, unsigned_tx: bytes) -> bytes:
         msg_hash = hashlib.sha256(unsigned_tx).digest()
-        r, s, _ = self.__sign_msg_hash(msg_hash)
+        with self.sign_latency.time():
+            act_signature = self.__kms_sign(msg_hash)
+        # Tx signature has no recovery id: skip recovering `v`
+        r, s = self.__get_sig_r_s(act_signature)
 
         n = int.from_bytes(
             b64decode("/////////////////////rqu3OavSKA7v9JejNA2QUE="), "big"
@@ -144,6 +222,80 @@ class Account:
         return der_encode(seq)
 
 
+class LocalAccount(Signer):
+    """
+    In-process secp256k1 signer with private key file. (hex encoded)
+    For local stack, benchmarks and load tests without AWS. Do not use with real assets.
+    """
+
+    def __init__(self, key_file: str):
+        with open(key_file) as f:
+            self._private_key = keys.PrivateKey(bytes.fromhex(f.read().strip().removeprefix("0x")))
+        self.sign_latency = get_latency_metric("sign_tx")
+        public_key = self._private_key.public_key
+        self.address: str = public_key.to_checksum_address()
+        # Uncompressed SEC1 format, same as public key of KMS
+        self.pubkey: bytes = b"\x04" + public_key.to_bytes()
+
+    @classmethod
+    def generate(cls, key_file: str) -> "LocalAccount":
+        """Create new key file and returns its signer"""
+        with open(key_file, "x") as f:
+            f.write(os.urandom(32).hex())
+        return cls(key_file)
+
+    def sign_tx(self, unsigned_tx: bytes) -> bytes:
+        msg_hash = hashlib.sha256(unsigned_tx).digest()
+        with self.sign_latency.time():
+            signature = self._private_key.sign_msg_hash(msg_hash)
+
+        # Libplanet accepts low-s signature only
+        n = SECPK1_N
+        seq = SequenceOf(componentType=Integer())
+        seq.extend([signature.r, min(signature.s, n - signature.s)])
+        return der_encode(seq)
+
+
+_account_dict: Dict[str, Signer] = {}
+_account_lock = threading.Lock()
+
+
+def get_account(kms_key: str, region_name: str = "us-east-2", cache_dir: Optional[str] = None) -> Account:
+    """
+    Process wide `Account` of the KMS key.
+    Public key and address are loaded once per process instead of every `Account()`.
+    """
+    with _account_lock:
+        if kms_key not in _account_dict:
+            _account_dict[kms_key] = Account(kms_key, region_name=region_name, cache_dir=cache_dir)
+        return _account_dict[kms_key]
+
+
+def sign_tx_list(signer: Signer, unsigned_tx_list: List[bytes], max_workers: int = 8) -> List[Union[bytes, Exception]]:
+    """
+    Sign Tx concurrently on a bounded thread pool.
+    Signatures are returned in the same order with `unsigned_tx_list`. Failed one is returned as its exception.
+    """
+
+    def sign(unsigned_tx: bytes) -> Union[bytes, Exception]:
+        try:
+            return signer.sign_tx(unsigned_tx)
+        except Exception as e:
+            return e
+
+    if len(unsigned_tx_list) <= 1 or max_workers <= 1:
+        return [sign(x) for x in unsigned_tx_list]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unsigned_tx_list))) as executor:
+        return list(executor.map(sign, unsigned_tx_list))
+
+
+def get_local_account(key_file: str) -> LocalAccount:
+    """Process wide `LocalAccount` of the key file"""
+    with _account_lock:
+        if key_file not in _account_dict:
+            _account_dict[key_file] = LocalAccount(key_file)
+        return _account_dict[key_file]
+
 
 # Deprecated
 def derive_address(address: Union[str, bytes], key: Union[str, bytes], get_byte: bool = False) -> Union[bytes, str]:
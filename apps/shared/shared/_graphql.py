@@ -1,30 +1,41 @@
 import datetime
-from typing import Union, Dict, Any, Tuple, Optional
+from typing import Union, Dict, Any, List, Tuple, Optional
 
 import jwt
-from gql import Client
+from gql import Client, gql
 from gql.dsl import DSLSchema, dsl_gql, DSLQuery, DSLMutation
 from gql.transport.requests import RequestsHTTPTransport
-from graphql import DocumentNode, ExecutionResult
+from graphql import DocumentNode, ExecutionResult, GraphQLSchema
 
 from shared.consts import CURRENCY_LIST
 
 
 class GQL:
-    def __init__(self, url: str, jwt_secret: str = None):
+    def __init__(self, url: str, jwt_secret: str = None, schema: Optional[GraphQLSchema] = None):
         assert url is not None
         self._url = url
         self.__jwt_secret = jwt_secret
         self.client = None
         self.ds = None
+        self._session = None
         transport = RequestsHTTPTransport(
             url=self._url, verify=True, retries=2, headers=self.__create_header()
         )
+        if schema is not None:
+            # Reuse schema already introspected from the same node
+            self.client = Client(transport=transport, schema=schema)
+            self.ds = DSLSchema(self.client.schema)
+            return
+
         self.client = Client(transport=transport, fetch_schema_from_transport=True)
         with self.client as _:
             assert self.client.schema is not None
             self.ds = DSLSchema(self.client.schema)
 
+    @property
+    def url(self) -> str:
+        return self._url
+
     def create_token(self) -> str:
         iat = datetime.datetime.utcnow()
         return jwt.encode(
@@ -39,7 +50,21 @@ class GQL:
     def __create_header(self):
         return {"Authorization": f"Bearer {self.create_token()}"}
 
+    def connect(self):
+        """Keeps HTTP session open to reuse connection for following queries. Call `close` to release it."""
+        if self._session is None:
+            self._session = self.client.connect_sync()
+
+    def close(self):
+        if self._session is not None:
+            self.client.close_sync()
+            self._session = None
+
     def execute(self, query: DocumentNode) -> Union[Dict[str, Any], ExecutionResult]:
+        # Token expires in a minute: issue new one for every query not to expire in long-lived client
+        self.client.transport.headers = self.__create_header()
+        if self._session is not None:
+            return self._session.execute(query)
         with self.client as sess:
             return sess.execute(query)
 
@@ -67,6 +92,42 @@ class GQL:
 
         return resp["transaction"]["nextTxNonce"]
 
+    def get_tip_index(self) -> int:
+        """
+        Get block index of the chain tip.
+
+        :return: Tip index. In case of any error, `-1` will be returned.
+        """
+        resp = self.execute(gql("query { nodeStatus { tip { index } } }"))
+
+        if "errors" in resp:
+            return -1
+
+        return resp["nodeStatus"]["tip"]["index"]
+
+    def get_block_tx_ids(self, offset: int, limit: int) -> List[Tuple[int, List[str]]]:
+        """
+        Get Tx IDs included in blocks from `offset` index.
+
+        :param int offset: Block index to start from.
+        :param int limit: Number of blocks to get.
+        :return: List of (block index, Tx IDs) in ascending order of block index.
+        """
+        resp = self.execute(
+            gql(
+                "query { chainQuery { blockQuery { blocks(offset: %d, limit: %d, desc: false) "
+                "{ index transactions { id } } } } }" % (offset, limit)
+            )
+        )
+
+        if "errors" in resp:
+            raise ValueError(f"Failed to get blocks from {offset}: {resp['errors']}")
+
+        return [
+            (block["index"], [tx["id"] for tx in block["transactions"]])
+            for block in resp["chainQuery"]["blockQuery"]["blocks"]
+        ]
+
     def _unload_from_garage(self, pubkey: bytes, nonce: int, **kwargs) -> bytes:
         ts = kwargs.get(
             "timestamp",
@@ -1,4 +1,5 @@
 from enum import Enum, IntEnum
+from typing import Optional
 
 # WARNING: Please match all maps with iap/frontend/src/const.js
 #  Mismatch can lead frontend error
@@ -108,6 +109,28 @@ class ProductType(Enum):
     MILEAGE = "MILEAGE"
 
 
+class DeliveryLane(Enum):
+    """
+    # DeliveryLane
+    ---
+    Worker queue to deliver products of a receipt. Value is the name of the queue.
+    Lanes are consumed with weights, so burst of free claims does not delay paid purchases.
+
+    - **`PAID`** : Paid IAP purchases
+    - **`FREE`** : FREE and MILEAGE products
+    - **`REDEEM`** : Redeem codes
+    - **`RETRY`** : Receipts sent again by retryer or failed delivery
+    """
+    PAID = "product_queue"
+    FREE = "product_free_queue"
+    REDEEM = "product_redeem_queue"
+    RETRY = "product_retry_queue"
+
+    def queue(self, planet_id: Optional["PlanetID"] = None) -> str:
+        """Queue name of the lane. Queue is sharded by planet when `planet_id` is given."""
+        return self.value if planet_id is None else f"{self.value}.{planet_id.name.lower()}"
+
+
 class ReceiptStatus(IntEnum):
     """
     Receipt Status
@@ -278,6 +301,32 @@ class GoogleAckState(IntEnum):
     ACKNOWLEDGED = 1
 
 
+class GoogleOneTimeNotificationType(IntEnum):
+    # https://developer.android.com/google/play/billing/rtdn-reference#one-time
+    ONE_TIME_PRODUCT_PURCHASED = 1
+    ONE_TIME_PRODUCT_CANCELED = 2
+
+
+class GoogleRefundType(IntEnum):
+    # https://developer.android.com/google/play/billing/rtdn-reference#voided-purchase
+    REFUND_TYPE_FULL_REFUND = 1
+    REFUND_TYPE_QUANTITY_BASED_PARTIAL_REFUND = 2
+
+
+class AppleNotificationType(Enum):
+    # https://developer.apple.com/documentation/appstoreservernotifications/notificationtype
+    # Only notification types handled by IAP service. Others are ignored.
+    REFUND = "REFUND"
+    REVOKE = "REVOKE"
+    CONSUMPTION_REQUEST = "CONSUMPTION_REQUEST"
+
+
+class AppleRevocationReason(IntEnum):
+    # https://developer.apple.com/documentation/appstoreserverapi/revocationreason
+    OTHER = 0
+    APP_ISSUE = 1
+
+
 class ProductAssetUISize(Enum):
     """
     # ProductAssetUISize
@@ -4,4 +4,8 @@ __all__ = [
     "product",
     "voucher",
     "user",
+    "payment",
+    "nonce",
+    "cursor",
+    "ledger",
 ]
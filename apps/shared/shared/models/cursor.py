@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, LargeBinary, Text, UniqueConstraint
+
+from shared.models.base import AutoIdMixin, Base, TimeStampMixin
+
+
+class WorkerCursor(AutoIdMixin, TimeStampMixin, Base):
+    """
+    Position of a background worker in a stream, e.g. the last block index tracked for each planet.
+    Worker resumes from here after restart.
+    """
+
+    __tablename__ = "worker_cursor"
+    name = Column(Text, nullable=False, doc="Name of the worker stream")
+    planet_id = Column(LargeBinary(length=12), nullable=False, doc="An identifier of planets")
+    position = Column(BigInteger, nullable=False, doc="Last processed position")
+
+    __table_args__ = (
+        UniqueConstraint("name", "planet_id", name="unique_worker_cursor_name_planet"),
+    )
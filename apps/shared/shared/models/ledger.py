@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text
+
+from shared.models.base import AutoIdMixin, Base, TimeStampMixin
+
+
+class EnqueueLedger(AutoIdMixin, TimeStampMixin, Base):
+    """
+    Last re-enqueue of a receipt by retryer.
+    Receipt is not sent again while its lease is valid, so a queued or running task is not duplicated.
+    """
+
+    __tablename__ = "enqueue_ledger"
+    receipt_id = Column(Integer, ForeignKey("receipt.id"), nullable=False, unique=True)
+    task_id = Column(Text, nullable=False, doc="Task ID of the last sent message")
+    attempts = Column(Integer, nullable=False, default=0, doc="Number of times sent by retryer")
+    lease_until = Column(DateTime(timezone=True), nullable=False, doc="Receipt is not sent again until this time")
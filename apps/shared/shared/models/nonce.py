@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, Text, UniqueConstraint
+
+from shared.models.base import AutoIdMixin, Base, TimeStampMixin
+
+
+class PlanetNonce(AutoIdMixin, TimeStampMixin, Base):
+    """
+    Next transaction nonce of signer address for each planet.
+    Row is locked while allocating nonce so concurrent workers never get the same nonce.
+    """
+
+    __tablename__ = "planet_nonce"
+    planet_id = Column(LargeBinary(length=12), nullable=False, doc="An identifier of planets")
+    address = Column(Text, nullable=False, doc="Signer address of transactions")
+    next_nonce = Column(Integer, nullable=False, doc="Nonce to be allocated next")
+    reconciled_at = Column(DateTime(timezone=True), nullable=True, doc="Last time compared with chain nonce")
+
+    __table_args__ = (
+        UniqueConstraint("planet_id", "address", name="unique_planet_nonce_address"),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from shared.models.base import AutoIdMixin, Base, TimeStampMixin
+
+
+class StripePaymentEvent(AutoIdMixin, TimeStampMixin, Base):
+    """
+    Succeeded PaymentIntent reported by Stripe webhook.
+    Used to validate web purchases without calling Stripe API.
+    """
+
+    __tablename__ = "stripe_payment_event"
+    event_id = Column(Text, nullable=False, unique=True, doc="Stripe event ID (evt_xxx)")
+    payment_intent_id = Column(Text, nullable=False, doc="Stripe PaymentIntent ID (pi_xxx)")
+    status = Column(Text, nullable=False, doc="PaymentIntent status")
+    amount = Column(Integer, nullable=False, doc="Paid amount in cents")
+    currency = Column(Text, nullable=False)
+    product_id = Column(Integer, nullable=True, doc="productId in PaymentIntent metadata")
+    payment_method = Column(Text, nullable=True)
+    meta = Column(JSONB, nullable=False, default={}, doc="Full PaymentIntent metadata")
+    livemode = Column(Boolean, nullable=False, default=False)
+    purchased_at = Column(DateTime(timezone=True), nullable=False, doc="PaymentIntent created time")
+
+    __table_args__ = (
+        Index("ix_stripe_payment_event_payment_intent_id", payment_intent_id, unique=True),
+    )
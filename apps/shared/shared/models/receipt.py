@@ -3,13 +3,14 @@ import re
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import UUID, Column, DateTime, ForeignKey, Integer, LargeBinary, Text, and_, extract, func
-from sqlalchemy.dialects.postgresql import ENUM, JSONB
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Index, Integer, LargeBinary, Text, and_, extract, func
+from sqlalchemy.dialects.postgresql import ARRAY, ENUM, JSONB
 from sqlalchemy.orm import backref, relationship, joinedload
 
 from shared.enums import PlanetID, ReceiptStatus, Store, TxStatus
 from shared.models.base import AutoIdMixin, Base, TimeStampMixin
 from shared.models.product import Product
+from shared.utils.transaction import get_tx_id
 
 
 class Receipt(AutoIdMixin, TimeStampMixin, Base):
@@ -53,6 +54,13 @@ class Receipt(AutoIdMixin, TimeStampMixin, Base):
     tx_status = Column(
         ENUM(TxStatus, create_type=False), nullable=True, doc="Transaction status"
     )
+    superseded_tx_ids = Column(
+        ARRAY(Text),
+        nullable=False,
+        default=list,
+        server_default="{}",
+        doc="IDs of Tx signed before for this receipt and replaced. Any of them can still be included.",
+    )
     bridged_tx_id = Column(
         Text, nullable=True, index=True, doc="Bridged Tx on another planet"
     )
@@ -86,6 +94,69 @@ class Receipt(AutoIdMixin, TimeStampMixin, Base):
         nullable=True,
         doc="Any error message while doing action. Please append, Do not replace.",
     )
+    track_attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Number of Tx status checks without final result",
+    )
+    next_check_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        doc="When to check Tx status next. Backs off exponentially by `track_attempts`.",
+    )
+    revalidate_attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Number of store validations retried after the store was unavailable",
+    )
+    revalidate_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        doc="When to validate deferred receipt again. NULL if validation is not deferred.",
+    )
+    ack_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        doc="When to acknowledge Google purchase again. NULL if ACK is not deferred.",
+    )
+
+    __table_args__ = (
+        # Due receipts to track are selected only from this partial index
+        Index(
+            "ix_receipt_next_check_at",
+            next_check_at,
+            postgresql_where=tx_status.in_([TxStatus.STAGED, TxStatus.INVALID]),
+        ),
+        # Deferred receipts to validate again are selected only from this partial index
+        Index("ix_receipt_revalidate_at", revalidate_at, postgresql_where=revalidate_at.is_not(None)),
+        # Deferred Google ACKs are selected only from this partial index
+        Index("ix_receipt_ack_at", ack_at, postgresql_where=ack_at.is_not(None)),
+    )
+
+    def replace_tx(self, tx: str):
+        """
+        Sets newly signed Tx and clears its ID until staged.
+        ID of the replaced Tx is kept in `superseded_tx_ids`, so it can be checked before signing again.
+        """
+        if self.tx:
+            tx_id = get_tx_id(bytes.fromhex(self.tx))
+            superseded = list(self.superseded_tx_ids or [])
+            if tx_id not in superseded:
+                self.superseded_tx_ids = [*superseded, tx_id]
+        self.tx = tx
+        self.tx_id = None
+
+    def get_signed_tx_ids(self) -> List[str]:
+        """IDs of every Tx signed for this receipt, the current one last"""
+        tx_ids = list(self.superseded_tx_ids or [])
+        if self.tx:
+            tx_ids.append(get_tx_id(bytes.fromhex(self.tx)))
+        return tx_ids
 
     @classmethod
     def get_user_receipts_by_month(
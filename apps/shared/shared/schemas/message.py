@@ -1,5 +1,14 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
+from shared.enums import DeliveryLane
+
 
 class SendProductMessage(BaseModel):
     uuid: str
+    lane: Optional[DeliveryLane] = None
+    # Planet ID string like `0x000000000000`, to send retry into the queue shard of the planet
+    planet_id: Optional[str] = None
+    # Unix timestamp when the message is sent, to measure queue lag
+    enqueued_at: Optional[float] = None
@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pydantic import BaseModel as BaseSchema
+
+from shared.enums import AppleRevocationReason, GoogleOneTimeNotificationType, GoogleRefundType, Store
+
+
+class PubSubMessageSchema(BaseSchema):
+    data: str
+    messageId: Optional[str] = None
+    attributes: Dict[str, str] = {}
+
+
+class PubSubPushSchema(BaseSchema):
+    # https://cloud.google.com/pubsub/docs/push#receive_push
+    message: PubSubMessageSchema
+    subscription: Optional[str] = None
+
+
+class GoogleOneTimeProductNotificationSchema(BaseSchema):
+    version: str
+    notificationType: GoogleOneTimeNotificationType
+    purchaseToken: str
+    sku: str
+
+
+class GoogleVoidedPurchaseNotificationSchema(BaseSchema):
+    purchaseToken: str
+    orderId: str
+    productType: int
+    refundType: GoogleRefundType = GoogleRefundType.REFUND_TYPE_FULL_REFUND
+
+
+class GoogleNotificationSchema(BaseSchema):
+    # https://developer.android.com/google/play/billing/rtdn-reference
+    version: str
+    packageName: str
+    eventTimeMillis: str
+    oneTimeProductNotification: Optional[GoogleOneTimeProductNotificationSchema] = None
+    voidedPurchaseNotification: Optional[GoogleVoidedPurchaseNotificationSchema] = None
+    subscriptionNotification: Optional[Dict] = None
+    testNotification: Optional[Dict] = None
+
+    @classmethod
+    def from_pubsub(cls, push: PubSubPushSchema) -> "GoogleNotificationSchema":
+        """Decode base64 encoded RTDN payload of Pub/Sub push message."""
+        return cls(**json.loads(base64.b64decode(push.message.data)))
+
+    @property
+    def eventTime(self) -> datetime:
+        return datetime.fromtimestamp(int(self.eventTimeMillis) / 1000, tz=timezone.utc)
+
+
+class AppleNotificationDataSchema(BaseSchema):
+    bundleId: Optional[str] = None
+    environment: Optional[str] = None
+    signedTransactionInfo: Optional[str] = None
+
+
+class AppleNotificationSchema(BaseSchema):
+    # https://developer.apple.com/documentation/appstoreservernotifications/responsebodyv2decodedpayload
+    notificationType: str
+    subtype: Optional[str] = None
+    notificationUUID: str
+    signedDate: int
+    data: Optional[AppleNotificationDataSchema] = None
+
+
+class AppleTransactionSchema(BaseSchema):
+    # https://developer.apple.com/documentation/appstoreserverapi/jwstransactiondecodedpayload
+    transactionId: str
+    originalTransactionId: Optional[str] = None
+    bundleId: str
+    productId: str
+    purchaseDate: int
+    environment: Optional[str] = None
+    revocationDate: Optional[int] = None
+    revocationReason: Optional[AppleRevocationReason] = None
+
+    @property
+    def purchasedAt(self) -> datetime:
+        return datetime.fromtimestamp(self.purchaseDate / 1000, tz=timezone.utc)
+
+    @property
+    def revokedAt(self) -> Optional[datetime]:
+        if self.revocationDate is None:
+            return None
+        return datetime.fromtimestamp(self.revocationDate / 1000, tz=timezone.utc)
+
+
+class RefundSchema(BaseSchema):
+    """Refund of one store order, sent to worker to update receipt and alert."""
+    store: Store
+    packageName: str
+    orderId: str
+    refundedAt: datetime
+    purchasedAt: Optional[datetime] = None
+    source: Optional[str] = None
+    reason: Optional[str] = None
@@ -1,10 +1,25 @@
+import base64
+from datetime import datetime, timezone
 from time import time
-from typing import List
+from typing import Iterable, List, Optional
 
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
 from fastapi import HTTPException
 import jwt
 import requests
 
+# SHA-256 fingerprint of Apple Root CA - G3 (https://www.apple.com/certificateauthority/)
+APPLE_ROOT_CA_G3_FINGERPRINT = "63343ABFB89A6A03EBB57E9B3F5FA7BE7C4F5C756F3017B3A8C488C3653E9179"
+# Marker extensions of App Store signing certificates
+APPLE_LEAF_OID = x509.ObjectIdentifier("1.2.840.113635.100.6.11.1")
+APPLE_INTERMEDIATE_OID = x509.ObjectIdentifier("1.2.840.113635.100.6.2.1")
+
+
+class AppleSignatureError(Exception):
+    pass
+
 
 def get_jwt(credential: str, bundle_id: str, key_id: str, issuer_id: str) -> str:
     header = {"alg": "ES256", "kid": key_id, "typ": "JWT"}
@@ -37,3 +52,54 @@ def get_tx_ids(order_id: str, credential: str, bundle_id: str, key_id: str, issu
         transaction_id = decoded["transactionId"]
         tx_ids.append(transaction_id)
     return tx_ids
+
+
+def verify_signed_payload(
+    signed: str,
+    root_fingerprints: Iterable[str] = (APPLE_ROOT_CA_G3_FINGERPRINT,),
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Verify JWS signed by App Store and returns decoded payload.
+
+    The `x5c` certificate chain in the header must end with pinned Apple root CA
+    and each certificate must be issued by the next one.
+
+    :param signed: JWS string. e.g. `signedPayload`, `signedTransactionInfo`
+    :param root_fingerprints: Allowed SHA-256 fingerprints of root certificate
+    :param now: Time to check certificate validity. Current time is used if not provided.
+    """
+    try:
+        header = jwt.get_unverified_header(signed)
+        if header.get("alg") != "ES256":
+            raise AppleSignatureError(f"Unsupported algorithm: {header.get('alg')}")
+        chain = header.get("x5c") or []
+        if len(chain) != 3:
+            raise AppleSignatureError(f"Certificate chain must have 3 certificates, got {len(chain)}")
+        leaf, intermediate, root = [x509.load_der_x509_certificate(base64.b64decode(x)) for x in chain]
+    except AppleSignatureError:
+        raise
+    except (jwt.PyJWTError, ValueError, TypeError) as e:
+        raise AppleSignatureError(f"Malformed signed payload: {e}")
+
+    allowed = {x.replace(":", "").upper() for x in root_fingerprints}
+    if root.fingerprint(hashes.SHA256()).hex().upper() not in allowed:
+        raise AppleSignatureError("Root certificate is not trusted")
+
+    now = now or datetime.now(timezone.utc)
+    for cert in (leaf, intermediate, root):
+        if not cert.not_valid_before_utc <= now <= cert.not_valid_after_utc:
+            raise AppleSignatureError(f"Certificate {cert.subject.rfc4514_string()} is expired or not yet valid")
+
+    try:
+        leaf.verify_directly_issued_by(intermediate)
+        intermediate.verify_directly_issued_by(root)
+        leaf.extensions.get_extension_for_oid(APPLE_LEAF_OID)
+        intermediate.extensions.get_extension_for_oid(APPLE_INTERMEDIATE_OID)
+    except (InvalidSignature, ValueError, TypeError, x509.ExtensionNotFound) as e:
+        raise AppleSignatureError(f"Invalid certificate chain: {e}")
+
+    try:
+        return jwt.decode(signed, leaf.public_key(), algorithms=["ES256"])
+    except jwt.PyJWTError as e:
+        raise AppleSignatureError(f"Invalid signature: {e}")
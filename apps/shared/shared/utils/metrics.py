@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+
+class LatencyMetric:
+    """
+    In-process latency stats of an operation.
+    Percentiles are calculated from the latest `window` samples.
+    """
+
+    def __init__(self, name: str, window: int = 1000):
+        self.name = name
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Latency in milliseconds"""
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else None,
+            "p50_ms": p50 * 1000 if p50 is not None else None,
+            "p95_ms": p95 * 1000 if p95 is not None else None,
+            "max_ms": self.max * 1000,
+        }
+
+
+_metric_dict: Dict[str, LatencyMetric] = {}
+_metric_lock = threading.Lock()
+
+
+def get_latency_metric(name: str) -> LatencyMetric:
+    with _metric_lock:
+        if name not in _metric_dict:
+            _metric_dict[name] = LatencyMetric(name)
+        return _metric_dict[name]
+
+
+def snapshot() -> Dict[str, Dict[str, Optional[float]]]:
+    with _metric_lock:
+        metric_list = list(_metric_dict.values())
+    return {x.name: x.snapshot() for x in metric_list}
+
+
+_gauge_dict: Dict[str, float] = {}
+
+
+def set_gauge(name: str, value: float):
+    """Latest value of a quantity, e.g. size of nonce gap"""
+    with _metric_lock:
+        _gauge_dict[name] = value
+
+
+def gauges() -> Dict[str, float]:
+    with _metric_lock:
+        return dict(_gauge_dict)
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from typing import Callable, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from shared.enums import PlanetID
+from shared.models.nonce import PlanetNonce
+from shared.models.receipt import Receipt
+
+
+def get_initial_nonce(sess, planet_id: Union[PlanetID, bytes], chain_nonce: int) -> int:
+    """
+    Nonce to start allocation for a planet which has no allocator row yet.
+    This is the only place to scan receipt table and runs once per (planet, address).
+    """
+    db_nonce = sess.scalar(select(func.max(Receipt.nonce)).where(Receipt.planet_id == planet_id))
+    return max(chain_nonce, (db_nonce if db_nonce is not None else -1) + 1)
+
+
+def allocate_nonce(
+    sess,
+    planet_id: Union[PlanetID, bytes],
+    address: str,
+    initial_nonce: Callable[[], int],
+    count: int = 1,
+) -> int:
+    """
+    Allocates next nonce of the address on the planet.
+    With `count`, consecutive nonce from the returned one are reserved at once.
+
+    Allocator row is locked with `SELECT ... FOR UPDATE` until the caller commits,
+    so nonce must be saved to the receipt in the same transaction to avoid gaps.
+
+    :param initial_nonce: Called only when allocator row does not exist for this (planet, address).
+    """
+    planet_id = bytes(planet_id)
+    stmt = (
+        select(PlanetNonce)
+        .where(PlanetNonce.planet_id == planet_id, PlanetNonce.address == address)
+        .with_for_update()
+    )
+    row = sess.scalar(stmt)
+    if row is None:
+        try:
+            with sess.begin_nested():
+                sess.add(PlanetNonce(planet_id=planet_id, address=address, next_nonce=initial_nonce()))
+        except IntegrityError:
+            # Another worker created the row first. Use it.
+            pass
+        row = sess.scalar(stmt)
+
+    nonce = row.next_nonce
+    row.next_nonce = nonce + count
+    sess.flush()
+    return nonce
+
+
+def reconcile_nonce(sess, planet_id: Union[PlanetID, bytes], address: str, chain_nonce: int) -> int:
+    """
+    Moves allocator forward when chain has already used nonce not allocated here. (e.g. manual Tx with the same key)
+    Allocator is never moved backward: staged Tx not included in block yet makes chain nonce lower than allocator.
+
+    :return: Number of allocated nonce not yet used in chain.
+    """
+    row = sess.scalar(
+        select(PlanetNonce)
+        .where(PlanetNonce.planet_id == bytes(planet_id), PlanetNonce.address == address)
+        .with_for_update()
+    )
+    if row is None:
+        return 0
+
+    if chain_nonce > row.next_nonce:
+        row.next_nonce = chain_nonce
+    row.reconciled_at = datetime.now(tz=timezone.utc)
+    sess.flush()
+    return row.next_nonce - chain_nonce
@@ -1,5 +1,6 @@
 import datetime
-from typing import Any, Dict
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
 
 import bencodex
 
@@ -44,9 +45,91 @@ def create_unsigned_tx(
 
 
 def append_signature_to_unsigned_tx(unsigned_tx: bytes, signature: bytes) -> bytes:
-    decoded = bencodex.loads(unsigned_tx)
-    decoded[b"S"] = signature
-    return bencodex.dumps(decoded)
+    # `S` is the first key of signed Tx: binary keys sort before text keys and b"S" < b"a".
+    # Splice it right after the dictionary prefix instead of decoding and encoding the whole Tx.
+    if unsigned_tx[:1] != b"d" or unsigned_tx[1:4] == b"1:S":
+        decoded = bencodex.loads(unsigned_tx)
+        decoded[b"S"] = signature
+        return bencodex.dumps(decoded)
+    return b"d1:S" + _encode_binary(signature) + unsigned_tx[1:]
+
+
+def get_tx_id(tx: bytes) -> str:
+    """Tx ID of signed Tx: SHA-256 of its bencoded bytes"""
+    return hashlib.sha256(tx).hexdigest()
+
+
+def get_tx_timestamp(tx: bytes) -> datetime.datetime:
+    return datetime.datetime.strptime(bencodex.loads(tx)[b"t"], "%Y-%m-%dT%H:%M:%S.%fZ").replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def _encode_binary(value: bytes) -> bytes:
+    return b"%d:%s" % (len(value), value)
+
+
+def _encode_text(value: str) -> bytes:
+    return b"u" + _encode_binary(value.encode("utf-8"))
+
+
+class GrantItemsTxTemplate:
+    """
+    Assembles unsigned `GrantItems` Tx from pre-encoded parts.
+
+    Encoded Tx is the same with `create_unsigned_tx(..., GrantItems(...).plain_value, ...)`,
+    but parts fixed per planet and signer are encoded once, and encoded rewards can be cached by caller
+    (see `encode_rewards`). Only nonce, avatar addresses, memo, action id and timestamp are encoded per Tx.
+    """
+
+    def __init__(self, planet_id: PlanetID, public_key: bytes, address: str):
+        if address.startswith("0x"):
+            address = address[2:]
+        # Keys in bencodex order: a, g, l, m, n, p, s, t, u
+        self._after_action = (
+            b"1:g"
+            + _encode_binary(get_genesis_block_hash(planet_id))
+            + b"1:li4e1:m"
+            + bencodex.dumps([{"decimalPlaces": b"\x12", "minters": None, "ticker": "Mead"}, 10_000_000_000_000])
+        )
+        self._after_nonce = b"1:p" + _encode_binary(public_key) + b"1:s" + _encode_binary(bytes.fromhex(address))
+
+    @staticmethod
+    def encode_rewards(fav_plain_value_list: List[Any]) -> bytes:
+        """Encoded `fungibleAssetValues` of a claim. Same for every avatar receiving the same product."""
+        return bencodex.dumps(fav_plain_value_list)
+
+    def build(
+        self,
+        claim_list: List[Tuple[bytes, bytes]],
+        memo: Optional[str],
+        nonce: int,
+        timestamp: datetime.datetime,
+        action_id: bytes,
+    ) -> bytes:
+        """
+        :param claim_list: List of (raw avatar address, encoded rewards from `encode_rewards`)
+        """
+        action = (
+            b"du7:type_idu11:grant_itemsu6:valuesdu2:cdl"
+            + b"".join(b"l" + _encode_binary(avatar) + rewards + b"e" for avatar, rewards in claim_list)
+            + b"eu2:id"
+            + _encode_binary(action_id)
+            + b"u1:m"
+            + (_encode_text(memo) if memo is not None else b"n")
+            + b"ee"
+        )
+        return (
+            b"d1:al"
+            + action
+            + b"e"
+            + self._after_action
+            + b"1:ni%de" % nonce
+            + self._after_nonce
+            + b"1:t"
+            + _encode_text(timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ"))
+            + b"1:ulee"
+        )
 
 
 def get_genesis_block_hash(planet_id: PlanetID) -> bytes:
@@ -6,6 +6,7 @@ import jwt
 import requests
 
 from shared.schemas.receipt import ApplePurchaseSchema
+from shared.validator.guard import STORE_UNAVAILABLE, is_unavailable_status
 
 
 def validate_apple(
@@ -21,6 +22,12 @@ def validate_apple(
         resp = requests.get(
             apple_validation_url.format(transactionId=encoded_tx_id), headers=headers
         )
+        if is_unavailable_status(resp.status_code):
+            return (
+                False,
+                f"{STORE_UNAVAILABLE}: Apple responded {resp.status_code}: {resp.text}",
+                None,
+            )
         if resp.status_code != 200:
             return (
                 False,
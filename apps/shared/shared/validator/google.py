@@ -1,8 +1,12 @@
 from typing import Tuple, Optional
 
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+
 from shared.enums import GooglePurchaseState, PackageName
 from shared.utils.google import get_google_client
 from shared.schemas.receipt import GooglePurchaseSchema
+from shared.validator.guard import STORE_UNAVAILABLE, is_unavailable_status
 
 
 def ack_google(credential: str, package_name: PackageName, sku: str, token: str):
@@ -45,5 +49,12 @@ def validate_google(
             )
         return True, "", resp
 
+    except HttpError as e:
+        if is_unavailable_status(e.resp.status):
+            return False, f"{STORE_UNAVAILABLE}: Google responded {e.resp.status}: {e}", None
+        return False, f"Error occurred validating google receipt: {e}", None
+    except (OSError, HttpLib2Error) as e:
+        # Connection errors and timeouts
+        return False, f"{STORE_UNAVAILABLE}: Google: {e}", None
     except Exception as e:
         return False, f"Error occurred validating google receipt: {e}", None
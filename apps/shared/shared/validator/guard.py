@@ -0,0 +1,194 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Validators start message with this when the store is down: transport error, timeout, 5xx or 429.
+# Errors caused by the receipt itself (unknown transaction, invalid token, ...) never use it.
+STORE_UNAVAILABLE = "Store is unavailable"
+
+
+def is_unavailable_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a store call is rejected without being executed.
+    This happens when the circuit of the store is open or the bulkhead of the store is full.
+    """
+
+    def __init__(self, store_name: str, reason: str):
+        super().__init__()
+        self.store_name = store_name
+        self.reason = reason
+
+    def __str__(self):
+        return f"{self.store_name} store is unavailable: {self.reason}"
+
+
+class CircuitBreaker:
+    """
+    Simple circuit breaker.
+
+    - `CLOSED`: Every call is allowed. Consecutive failures open the circuit.
+    - `OPEN`: Every call is rejected until `reset_timeout` seconds passed.
+    - `HALF_OPEN`: Only one trial call is allowed. Success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failure_count = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._reset_timeout_passed():
+                return self.HALF_OPEN
+            return self._state
+
+    def _reset_timeout_passed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._reset_timeout_passed():
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failure_count = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failure_count += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failure_count >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+class Bulkhead:
+    """Bounds concurrent calls to a store so one slow store cannot take all threads."""
+
+    def __init__(self, max_concurrency: int = 8, acquire_timeout: float = 0.5):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def acquire(self) -> bool:
+        return self._semaphore.acquire(timeout=self.acquire_timeout)
+
+    def release(self):
+        self._semaphore.release()
+
+
+class StoreGuard:
+    """
+    Bulkhead and circuit breaker for one store.
+
+    `is_failure` decides whether returned result means store outage.
+    Exceptions raised from the guarded function are always treated as failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 8,
+        acquire_timeout: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        is_failure: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.name = name
+        self.bulkhead = Bulkhead(max_concurrency, acquire_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._is_failure = is_failure or (lambda _: False)
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def call(self, fn: Callable, *args, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, "circuit is open")
+        if not self.bulkhead.acquire():
+            # Do not count as failure: store is slow, not necessarily down.
+            self.breaker.cancel_trial()
+            raise CircuitOpenError(self.name, "too many concurrent requests")
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.bulkhead.release()
+
+        if self._is_failure(result):
+            self.breaker.record_failure()
+            if self.breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"{self.name} store circuit is opened")
+        else:
+            self.breaker.record_success()
+        return result
+
+
+def store_unavailable(result) -> bool:
+    """
+    Validators return `(success, msg, purchase)` and catch store errors inside.
+    Only store outages are treated as failure, not invalid receipts.
+    """
+    if not isinstance(result, tuple):
+        return False
+    success, msg, _ = result
+    return not success and msg.startswith(STORE_UNAVAILABLE)
+
+
+_guard_options: Dict[str, Dict[str, Any]] = {
+    "google": {"is_failure": store_unavailable},
+    "apple": {"is_failure": store_unavailable},
+    "web": {"is_failure": store_unavailable},
+}
+_guards: Dict[str, StoreGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_store_guard(name: str, **kwargs) -> StoreGuard:
+    """
+    Returns process-wide guard of the store.
+    `kwargs` are used only when the guard is created for the first time.
+    """
+    with _guards_lock:
+        if name not in _guards:
+            options = {**_guard_options.get(name, {}), **kwargs}
+            _guards[name] = StoreGuard(name, **options)
+        return _guards[name]
@@ -1,8 +1,66 @@
 import stripe
 from datetime import datetime, timezone
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union
 
+from sqlalchemy import select
+
+from shared.models.payment import StripePaymentEvent
 from shared.schemas.receipt import WebPurchaseSchema
+from shared.validator.guard import STORE_UNAVAILABLE, is_unavailable_status
+
+
+def _verify_payment(
+    payment_intent_id: str,
+    status: str,
+    amount: int,
+    currency: str,
+    created: Union[int, datetime],
+    payment_method: Optional[str],
+    metadata: dict,
+    livemode: bool,
+    expected_product_id: int,
+    expected_amount_cents: int,
+    expected_currency: Optional[str] = None,
+    expected_livemode: Optional[bool] = None,
+) -> Tuple[bool, str, Optional[WebPurchaseSchema]]:
+    # 0. live / test 모드 확인: test 결제로 live 구매를 검증하지 않도록
+    if expected_livemode is not None and bool(livemode) != expected_livemode:
+        return False, f"Livemode mismatch: expected {expected_livemode}, got {livemode}", None
+
+    # 1. 결제 상태 확인
+    if status != "succeeded":
+        return False, f"Payment not succeeded: {status}", None
+
+    # 2. metadata에서 productId 확인
+    metadata_product_id = int(metadata.get("productId"))
+
+    if metadata_product_id != expected_product_id:
+        return False, f"Product ID mismatch: expected {expected_product_id}, got {metadata_product_id}", None
+
+    # 3. 금액 검증 (센트 단위로 비교)
+    if amount != expected_amount_cents:
+        return False, f"Amount mismatch: expected {expected_amount_cents}, got {amount}", None
+
+    # Stripe는 통화를 소문자로 반환
+    if expected_currency is not None and (currency or "").lower() != expected_currency.lower():
+        return False, f"Currency mismatch: expected {expected_currency}, got {currency}", None
+
+    # 4. WebPurchaseSchema 생성
+    if not isinstance(created, datetime):
+        created = datetime.fromtimestamp(created, tz=timezone.utc)
+    purchase = WebPurchaseSchema(
+        orderId=payment_intent_id,
+        productId=metadata_product_id,
+        purchaseDate=created,
+        amount=amount,
+        currency=currency,
+        status=status,
+        paymentMethod=payment_method,
+        metadata=dict(metadata),
+        livemode=livemode
+    )
+
+    return True, "", purchase
 
 
 def validate_web(
@@ -11,7 +69,10 @@ def validate_web(
     payment_intent_id: str,
     expected_product_id: str,
     expected_amount_cents: int,
-    db_product
+    db_product,
+    sess=None,
+    expected_currency: Optional[str] = None,
+    expected_livemode: Optional[bool] = None,
 ) -> Tuple[bool, str, Optional[WebPurchaseSchema]]:
     """
     Stripe Python SDK로 결제 검증
@@ -23,11 +84,35 @@ def validate_web(
         expected_product_id: 예상 상품 ID
         expected_amount_cents: 예상 금액 (센트 단위)
         db_product: Product 모델 인스턴스
+        sess: DB 세션. 주어지면 webhook으로 저장된 결제 이벤트를 먼저 조회하고, 없을 때만 Stripe API 호출
+        expected_currency: 예상 통화 (상품 가격의 통화). 주어지면 결제 통화와 비교
+        expected_livemode: 예상 모드 (`Store.WEB`이면 True, `Store.WEB_TEST`이면 False). 주어지면 결제 모드와 비교
 
     Returns:
         (success, error_message, WebPurchaseSchema)
     """
     try:
+        if sess is not None:
+            event = sess.scalar(
+                select(StripePaymentEvent)
+                .where(StripePaymentEvent.payment_intent_id == payment_intent_id)
+            )
+            if event:
+                return _verify_payment(
+                    payment_intent_id=event.payment_intent_id,
+                    status=event.status,
+                    amount=event.amount,
+                    currency=event.currency,
+                    created=event.purchased_at,
+                    payment_method=event.payment_method,
+                    metadata=event.meta or {},
+                    livemode=event.livemode,
+                    expected_product_id=expected_product_id,
+                    expected_amount_cents=expected_amount_cents,
+                    expected_currency=expected_currency,
+                    expected_livemode=expected_livemode,
+                )
+
         # Stripe SDK 설정
         stripe.api_key = stripe_secret_key
         stripe.api_version = stripe_api_version
@@ -35,43 +120,30 @@ def validate_web(
         # PaymentIntent 조회
         payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
 
-        # 1. 결제 상태 확인
-        if payment_intent.status != "succeeded":
-            return False, f"Payment not succeeded: {payment_intent.status}", None
-
-        # 2. metadata에서 productId 확인
-        metadata = payment_intent.metadata or {}
-        metadata_product_id = int(metadata.get("productId"))
-
-        if metadata_product_id != expected_product_id:
-            return False, f"Product ID mismatch: expected {expected_product_id}, got {metadata_product_id}", None
-
-        # 3. 금액 검증 (센트 단위로 비교)
-        stripe_amount = payment_intent.amount
-
-        if stripe_amount != expected_amount_cents:
-            return False, f"Amount mismatch: expected {expected_amount_cents}, got {stripe_amount}", None
-
-        # 4. WebPurchaseSchema 생성
-        purchase = WebPurchaseSchema(
-            orderId=payment_intent.id,
-            productId=metadata_product_id,
-            purchaseDate=datetime.fromtimestamp(payment_intent.created, tz=timezone.utc),
-            amount=stripe_amount,
-            currency=payment_intent.currency,
+        return _verify_payment(
+            payment_intent_id=payment_intent.id,
             status=payment_intent.status,
-            paymentMethod=payment_intent.payment_method,
-            metadata=dict(metadata),
-            livemode=payment_intent.livemode
+            amount=payment_intent.amount,
+            currency=payment_intent.currency,
+            created=payment_intent.created,
+            payment_method=payment_intent.payment_method,
+            metadata=payment_intent.metadata or {},
+            livemode=payment_intent.livemode,
+            expected_product_id=expected_product_id,
+            expected_amount_cents=expected_amount_cents,
+            expected_currency=expected_currency,
+            expected_livemode=expected_livemode,
         )
 
-        return True, "", purchase
-
     except stripe.InvalidRequestError as e:
         return False, f"Invalid Stripe request: {str(e)}", None
     except stripe.AuthenticationError as e:
         return False, f"Stripe authentication failed: {str(e)}", None
+    except stripe.APIConnectionError as e:
+        return False, f"{STORE_UNAVAILABLE}: Stripe: {str(e)}", None
     except stripe.StripeError as e:
+        if e.http_status and is_unavailable_status(e.http_status):
+            return False, f"{STORE_UNAVAILABLE}: Stripe responded {e.http_status}: {str(e)}", None
         return False, f"Stripe API error: {str(e)}", None
     except Exception as e:
         return False, f"Error validating Stripe payment: {str(e)}", None
@@ -83,7 +155,9 @@ def validate_web_test(
     payment_intent_id: str,
     expected_product_id: str,
     expected_amount_cents: int,
-    db_product
+    db_product,
+    sess=None,
+    expected_currency: Optional[str] = None,
 ) -> Tuple[bool, str, Optional[WebPurchaseSchema]]:
     """
     Stripe test mode로 검증 (validate_web와 동일, test key 사용)
@@ -94,5 +168,8 @@ def validate_web_test(
         payment_intent_id,
         expected_product_id,
         expected_amount_cents,
-        db_product
+        db_product,
+        sess=sess,
+        expected_currency=expected_currency,
+        expected_livemode=False,
     )
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.enums import AppleRevocationReason, GoogleOneTimeNotificationType, GoogleRefundType, Store
+from shared.schemas.notification import (
+    AppleTransactionSchema,
+    GoogleNotificationSchema,
+    PubSubPushSchema,
+    RefundSchema,
+)
+
+
+def pubsub_push(payload: dict) -> PubSubPushSchema:
+    """Local stand-in of Pub/Sub push request body"""
+    return PubSubPushSchema(
+        message={
+            "data": base64.b64encode(json.dumps(payload).encode()).decode(),
+            "messageId": "136969346945",
+            "attributes": {},
+        },
+        subscription="projects/test/subscriptions/rtdn",
+    )
+
+
+class TestGoogleNotificationSchema:
+    def test_voided_purchase_notification(self):
+        notification = GoogleNotificationSchema.from_pubsub(pubsub_push({
+            "version": "1.0",
+            "packageName": "com.planetariumlabs.ninechroniclesmobile",
+            "eventTimeMillis": "1704110400000",
+            "voidedPurchaseNotification": {
+                "purchaseToken": "token_123",
+                "orderId": "GPA.1234-5678-9012-34567",
+                "productType": 2,
+                "refundType": 1,
+            },
+        }))
+
+        assert notification.oneTimeProductNotification is None
+        assert notification.voidedPurchaseNotification.orderId == "GPA.1234-5678-9012-34567"
+        assert notification.voidedPurchaseNotification.refundType == GoogleRefundType.REFUND_TYPE_FULL_REFUND
+        assert notification.eventTime == datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+    def test_one_time_product_notification(self):
+        notification = GoogleNotificationSchema.from_pubsub(pubsub_push({
+            "version": "1.0",
+            "packageName": "com.planetariumlabs.ninechroniclesmobile",
+            "eventTimeMillis": "1704110400000",
+            "oneTimeProductNotification": {
+                "version": "1.0",
+                "notificationType": 2,
+                "purchaseToken": "token_123",
+                "sku": "g_pkg_launching1",
+            },
+        }))
+
+        assert notification.voidedPurchaseNotification is None
+        assert notification.oneTimeProductNotification.notificationType == GoogleOneTimeNotificationType.ONE_TIME_PRODUCT_CANCELED
+        assert notification.oneTimeProductNotification.sku == "g_pkg_launching1"
+
+    def test_test_notification(self):
+        notification = GoogleNotificationSchema.from_pubsub(pubsub_push({
+            "version": "1.0",
+            "packageName": "com.planetariumlabs.ninechroniclesmobile",
+            "eventTimeMillis": "1704110400000",
+            "testNotification": {"version": "1.0"},
+        }))
+
+        assert notification.testNotification == {"version": "1.0"}
+
+    def test_invalid_data(self):
+        push = PubSubPushSchema(message={"data": "not-base64-json"})
+        with pytest.raises(ValueError):
+            GoogleNotificationSchema.from_pubsub(push)
+
+
+class TestAppleTransactionSchema:
+    def test_revoked_transaction(self):
+        tx = AppleTransactionSchema(
+            transactionId="2000000123456789",
+            originalTransactionId="2000000123456789",
+            bundleId="com.planetariumlabs.ninechroniclesmobile",
+            productId="g_pkg_launching1",
+            purchaseDate=1704110400000,
+            revocationDate=1704114000000,
+            revocationReason=1,
+        )
+
+        assert tx.purchasedAt == datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        assert tx.revokedAt == datetime(2024, 1, 1, 13, 0, 0, tzinfo=timezone.utc)
+        assert tx.revocationReason == AppleRevocationReason.APP_ISSUE
+
+    def test_not_revoked_transaction(self):
+        tx = AppleTransactionSchema(
+            transactionId="2000000123456789",
+            bundleId="com.planetariumlabs.ninechroniclesmobile",
+            productId="g_pkg_launching1",
+            purchaseDate=1704110400000,
+        )
+
+        assert tx.revokedAt is None
+
+
+class TestRefundSchema:
+    def test_json_round_trip(self):
+        refund = RefundSchema(
+            store=Store.GOOGLE,
+            packageName="com.planetariumlabs.ninechroniclesmobile",
+            orderId="GPA.1234-5678-9012-34567",
+            refundedAt=datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+            reason="Remorse",
+        )
+
+        assert RefundSchema(**json.loads(json.dumps(refund.model_dump(mode="json")))) == refund
@@ -0,0 +1,153 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import stripe
+from googleapiclient.errors import HttpError
+
+from shared.validator.apple import validate_apple
+from shared.validator.google import validate_google
+from shared.validator.guard import (
+    STORE_UNAVAILABLE,
+    CircuitBreaker,
+    CircuitOpenError,
+    StoreGuard,
+    get_store_guard,
+    store_unavailable,
+)
+from shared.validator.web import validate_web
+
+
+def _store_error():
+    return False, f"{STORE_UNAVAILABLE}: Google: timeout", None
+
+
+def _invalid_receipt():
+    return False, "Order ID mismatch from request and token: a :: b", None
+
+
+class TestCircuitBreaker:
+    def test_open_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+
+    def test_half_open_allows_single_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_failure_opens_again(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0)
+        for _ in range(3):
+            breaker.record_failure()
+        assert breaker.allow() is True
+        breaker.record_failure()
+        # Failed trial opens circuit regardless of failure count
+        assert breaker._state == CircuitBreaker.OPEN
+
+
+class TestStoreGuard:
+    def _guard(self, **kwargs):
+        return StoreGuard(
+            "google",
+            is_failure=store_unavailable,
+            **kwargs,
+        )
+
+    def test_store_error_opens_circuit(self):
+        guard = self._guard(failure_threshold=2, reset_timeout=30)
+        guard.call(_store_error)
+        guard.call(_store_error)
+        assert guard.available is False
+        with pytest.raises(CircuitOpenError):
+            guard.call(_store_error)
+
+    def test_invalid_receipt_does_not_open_circuit(self):
+        guard = self._guard(failure_threshold=1, reset_timeout=30)
+        for _ in range(3):
+            assert guard.call(_invalid_receipt)[0] is False
+        assert guard.available is True
+
+    def test_exception_counts_as_failure(self):
+        guard = self._guard(failure_threshold=1, reset_timeout=30)
+
+        def boom():
+            raise RuntimeError("connection reset")
+
+        with pytest.raises(RuntimeError):
+            guard.call(boom)
+        assert guard.available is False
+
+    def test_bulkhead_rejects_when_full(self):
+        guard = self._guard(max_concurrency=1, acquire_timeout=0.01)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            entered.set()
+            release.wait(1)
+            return True, "", None
+
+        t = threading.Thread(target=guard.call, args=(slow,))
+        t.start()
+        entered.wait(1)
+        try:
+            with pytest.raises(CircuitOpenError):
+                guard.call(slow)
+        finally:
+            release.set()
+            t.join()
+        # Bulkhead rejection is not store failure
+        assert guard.available is True
+
+
+def test_get_store_guard_is_shared_per_store():
+    assert get_store_guard("apple") is get_store_guard("apple")
+    assert get_store_guard("apple") is not get_store_guard("web")
+
+
+@pytest.mark.parametrize("status_code, unavailable", [(404, False), (401, False), (429, True), (503, True)])
+def test_apple_store_unavailable(status_code, unavailable):
+    with patch("shared.validator.apple.requests.get") as get, patch("shared.validator.apple.time.sleep"):
+        get.return_value = MagicMock(status_code=status_code, text="error")
+        assert store_unavailable(validate_apple("jwt", "https://apple/{transactionId}", "tx")) is unavailable
+
+
+@pytest.mark.parametrize(
+    "error, unavailable",
+    [
+        (HttpError(MagicMock(status=400), b"invalid purchase token"), False),
+        (HttpError(MagicMock(status=410), b"gone"), False),
+        (HttpError(MagicMock(status=500), b"backend error"), True),
+        (HttpError(MagicMock(status=429), b"quota"), True),
+        (TimeoutError("timed out"), True),
+        (ConnectionResetError("reset"), True),
+    ],
+)
+def test_google_store_unavailable(error, unavailable):
+    with patch("shared.validator.google.get_google_client") as get_google_client:
+        get_google_client.return_value.purchases().products().get().execute.side_effect = error
+        assert store_unavailable(validate_google("credential", "package", "order", "sku", "token")) is unavailable
+
+
+@pytest.mark.parametrize(
+    "error, unavailable",
+    [
+        (stripe.InvalidRequestError("No such payment_intent", "id", http_status=404), False),
+        (stripe.AuthenticationError("Invalid API key", http_status=401), False),
+        (stripe.CardError("declined", "card", "card_declined", http_status=402), False),
+        (stripe.RateLimitError("Too many requests", http_status=429), True),
+        (stripe.APIError("Internal error", http_status=500), True),
+        (stripe.APIConnectionError("Connection refused"), True),
+    ],
+)
+def test_web_store_unavailable(error, unavailable):
+    with patch("shared.validator.web.stripe.PaymentIntent.retrieve", side_effect=error):
+        assert store_unavailable(validate_web("sk_test", "2024-06-20", "pi_1", 1, 100, None)) is unavailable
@@ -3,6 +3,7 @@ from unittest.mock import Mock, patch
 from datetime import datetime, timezone
 from decimal import Decimal
 
+from shared.models.payment import StripePaymentEvent
 from shared.validator.web import validate_web, validate_web_test
 from shared.schemas.receipt import WebPurchaseSchema
 
@@ -189,6 +190,124 @@ class TestStripeValidateWebTest:
         assert success is True
         assert purchase.amount == 1299
 
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_validate_web_uses_webhook_event(self, mock_retrieve):
+        """Webhook으로 저장된 결제 이벤트가 있으면 Stripe API를 호출하지 않음"""
+        event = StripePaymentEvent(
+            event_id="evt_test123",
+            payment_intent_id="pi_test123",
+            status="succeeded",
+            amount=1299,
+            currency="usd",
+            product_id=1,
+            payment_method="pm_123",
+            meta={"productId": "1"},
+            livemode=False,
+            purchased_at=datetime.fromtimestamp(1761552381, tz=timezone.utc),
+        )
+        sess = Mock()
+        sess.scalar.return_value = event
+
+        success, msg, purchase = validate_web(
+            stripe_secret_key="sk_test_123",
+            stripe_api_version="2025-09-30.clover",
+            payment_intent_id="pi_test123",
+            expected_product_id=1,
+            expected_amount_cents=1299,
+            db_product=Mock(),
+            sess=sess,
+        )
+
+        assert success is True
+        assert purchase.orderId == "pi_test123"
+        assert purchase.purchaseDate == event.purchased_at
+        mock_retrieve.assert_not_called()
+
+        # 금액 검증은 동일하게 적용
+        success, msg, purchase = validate_web(
+            stripe_secret_key="sk_test_123",
+            stripe_api_version="2025-09-30.clover",
+            payment_intent_id="pi_test123",
+            expected_product_id=1,
+            expected_amount_cents=999,
+            db_product=Mock(),
+            sess=sess,
+        )
+
+        assert success is False
+        assert "Amount mismatch" in msg
+        mock_retrieve.assert_not_called()
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_validate_web_event_livemode_and_currency(self, mock_retrieve):
+        """Webhook 이벤트도 live / test 모드와 통화를 검증"""
+        event = StripePaymentEvent(
+            event_id="evt_test123",
+            payment_intent_id="pi_test123",
+            status="succeeded",
+            amount=1299,
+            currency="usd",
+            product_id=1,
+            payment_method="pm_123",
+            meta={"productId": "1"},
+            livemode=False,
+            purchased_at=datetime.fromtimestamp(1761552381, tz=timezone.utc),
+        )
+        sess = Mock()
+        sess.scalar.return_value = event
+        kwargs = dict(
+            stripe_secret_key="sk_live_123",
+            stripe_api_version="2025-09-30.clover",
+            payment_intent_id="pi_test123",
+            expected_product_id=1,
+            expected_amount_cents=1299,
+            db_product=Mock(),
+            sess=sess,
+        )
+
+        # test 모드 결제로 live 구매 검증 불가
+        success, msg, _ = validate_web(**kwargs, expected_currency="USD", expected_livemode=True)
+        assert success is False
+        assert "Livemode mismatch" in msg
+
+        success, msg, _ = validate_web(**kwargs, expected_currency="KRW", expected_livemode=False)
+        assert success is False
+        assert "Currency mismatch" in msg
+
+        success, msg, _ = validate_web(**kwargs, expected_currency="USD", expected_livemode=False)
+        assert success is True
+        mock_retrieve.assert_not_called()
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_validate_web_falls_back_to_stripe(self, mock_retrieve):
+        """Webhook 이벤트가 없으면 Stripe API로 조회"""
+        mock_payment_intent = Mock()
+        mock_payment_intent.id = "pi_test123"
+        mock_payment_intent.status = "succeeded"
+        mock_payment_intent.amount = 1299
+        mock_payment_intent.currency = "usd"
+        mock_payment_intent.created = 1761552381
+        mock_payment_intent.payment_method = "pm_123"
+        mock_payment_intent.livemode = False
+        mock_payment_intent.metadata = {"productId": "1"}
+        mock_retrieve.return_value = mock_payment_intent
+        sess = Mock()
+        sess.scalar.return_value = None
+
+        success, msg, purchase = validate_web(
+            stripe_secret_key="sk_test_123",
+            stripe_api_version="2025-09-30.clover",
+            payment_intent_id="pi_test123",
+            expected_product_id=1,
+            expected_amount_cents=1299,
+            db_product=Mock(),
+            sess=sess,
+        )
+
+        assert success is True
+        sess.scalar.assert_called_once()
+        mock_retrieve.assert_called_once_with("pi_test123")
+
     def test_decimal_to_cents_conversion_edge_cases(self):
         """Decimal을 센트 단위로 변환하는 엣지 케이스 테스트"""
         # 일반적인 가격
@@ -0,0 +1,315 @@
+"""
+Asyncio runtime of product worker.
+
+Run instead of celery worker of product queues. All delivery lanes are consumed with weighted prefetch:
+
+    python -m app.async_worker
+
+Many receipts are processed concurrently in one process. Blocking steps (DB, KMS, GraphQL) run on a bounded
+thread pool while the event loop keeps the ordering constraints of each planet:
+nonce is allocated one at a time per planet and Tx are staged in nonce order.
+Messages are acked only after processing like `acks_late`, and failed ones are republished as Celery retries.
+"""
+import asyncio
+import heapq
+import queue
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import structlog
+from kombu.message import Message
+from shared.enums import PlanetID, TxStatus
+from shared.models.product import Product
+from shared.models.receipt import Receipt
+from shared.utils.nonce import allocate_nonce, get_initial_nonce
+from shared.utils.transaction import append_signature_to_unsigned_tx
+from sqlalchemy import select
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+
+from app.batch_consumer import parse_message, retry_message
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+from app.lanes import create_lane_consumers, observe_queue_lag, queue_lag_snapshot
+from app.signer import get_signer
+from app.tasks.send_product_task import create_unsigned_grant_tx, engine, is_batch_target, stage_tx
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class Reservation:
+    """Receipt with its nonce, ready to sign or to stage"""
+
+    receipt_id: int
+    uuid: str
+    planet_id: PlanetID
+    nonce: int
+    unsigned_tx: Optional[bytes] = None
+    # Hex encoded signed Tx, same with `Receipt.tx`
+    tx: Optional[str] = None
+
+
+class ProductOps:
+    """Blocking steps of sending a product. Each step runs in a worker thread with its own session."""
+
+    def get_planet_id(self, uuid: str) -> Optional[PlanetID]:
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            planet_id = sess.scalar(select(Receipt.planet_id).where(Receipt.uuid == uuid))
+            return PlanetID(planet_id) if planet_id else None
+        finally:
+            sess.remove()
+
+    def reserve(self, uuid: str) -> Optional[Reservation]:
+        """
+        Allocates nonce to the receipt and builds unsigned Tx.
+        Returns `None` when there is nothing to do for the receipt.
+        """
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            receipt = sess.scalar(select(Receipt).where(Receipt.uuid == uuid).with_for_update())
+            if not receipt:
+                logger.error(f"Receipt with UUID {uuid} not found in database")
+                return None
+            if receipt.tx_status == TxStatus.SUCCESS:
+                logger.info(f"{uuid} is already sent with Tx : {receipt.tx_id}")
+                return None
+            if is_batch_target(receipt):
+                logger.info(f"{uuid} is left to batch grant")
+                return None
+            if receipt.tx_id:
+                logger.warning(f"{uuid} is already treated with Tx : {receipt.tx_id}")
+                return None
+
+            planet_id = PlanetID(receipt.planet_id)
+            if receipt.tx:
+                return Reservation(receipt.id, uuid, planet_id, receipt.nonce, tx=receipt.tx)
+
+            account = get_signer()
+            if receipt.nonce is None:
+                gql = gql_pool.get(planet_id)
+                if gql is None:
+                    logger.warning(f"Planet {planet_id} node is down, skipping receipt {uuid}")
+                    return None
+
+                def get_nonce_from_node():
+                    try:
+                        nonce = gql.get_next_nonce(account.address)
+                    except Exception as e:
+                        gql_pool.report_failure(gql, e)
+                        raise
+                    if nonce == -1:
+                        raise ValueError(f"Failed to get nonce from node for planet {planet_id}")
+                    return get_initial_nonce(sess, planet_id, nonce)
+
+                try:
+                    receipt.nonce = allocate_nonce(sess, planet_id, account.address, get_nonce_from_node)
+                    sess.commit()
+                except Exception as e:
+                    sess.rollback()
+                    logger.error(f"Failed to get nonce from node for planet {planet_id}, skipping receipt {uuid}: {e}")
+                    return None
+
+            product = sess.scalar(
+                select(Product)
+                .options(selectinload(Product.fav_list))
+                .options(selectinload(Product.fungible_item_list))
+                .where(Product.id == receipt.product_id)
+            )
+            if product is None:
+                raise ValueError(f"Product not found for product_id: {receipt.product_id} in receipt: {uuid}")
+            unsigned_tx = create_unsigned_grant_tx(account, [receipt], product, receipt.nonce)
+            return Reservation(receipt.id, uuid, planet_id, receipt.nonce, unsigned_tx=unsigned_tx)
+        finally:
+            sess.remove()
+
+    def sign(self, reservation: Reservation) -> str:
+        signature = get_signer().sign_tx(reservation.unsigned_tx)
+        return append_signature_to_unsigned_tx(reservation.unsigned_tx, signature).hex()
+
+    def save_tx(self, reservation: Reservation) -> bool:
+        """
+        Saves signed Tx if the receipt still has no Tx with the reserved nonce.
+        The receipt is not locked while signing, so the same receipt delivered twice can be signed by another worker.
+        Returns `False` if Tx of the other worker is kept.
+        """
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            receipt = sess.scalar(select(Receipt).where(Receipt.id == reservation.receipt_id).with_for_update())
+            if receipt.tx or receipt.tx_id or receipt.nonce != reservation.nonce:
+                logger.warning(f"{reservation.uuid} got Tx from another worker with nonce {receipt.nonce}, skip")
+                sess.rollback()
+                return False
+            receipt.replace_tx(reservation.tx)
+            receipt.tx_status = TxStatus.CREATED
+            sess.commit()
+            logger.info(f"{reservation.uuid}: Tx created with nonce: {reservation.nonce}")
+            return True
+        finally:
+            sess.remove()
+
+    def stage(self, reservation: Reservation) -> Tuple[bool, str, Optional[str]]:
+        return stage_tx(reservation)
+
+    def save_staged(self, reservation: Reservation, tx_id: str):
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            receipt = sess.get(Receipt, reservation.receipt_id)
+            receipt.tx_id = tx_id
+            receipt.tx_status = TxStatus.STAGED
+            sess.commit()
+        finally:
+            sess.remove()
+
+
+class NonceSequencer:
+    """Lets Tx of a planet be staged in nonce order"""
+
+    def __init__(self):
+        self._pending: List[int] = []
+        self._condition = asyncio.Condition()
+
+    def add(self, nonce: int):
+        heapq.heappush(self._pending, nonce)
+
+    async def wait_turn(self, nonce: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._pending[0] == nonce)
+
+    async def done(self, nonce: int):
+        async with self._condition:
+            self._pending.remove(nonce)
+            heapq.heapify(self._pending)
+            self._condition.notify_all()
+
+
+class AsyncProductWorker:
+    def __init__(self, ops: ProductOps, concurrency: int = 32):
+        self.ops = ops
+        self.concurrency = concurrency
+        self._planet_lock: Dict[PlanetID, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._sequencer: Dict[PlanetID, NonceSequencer] = defaultdict(NonceSequencer)
+        self._finished: "queue.Queue[Tuple[Message, Optional[dict], str]]" = queue.Queue()
+        self._task_set: Set[asyncio.Task] = set()
+
+    async def process(self, uuid: str) -> bool:
+        """
+        Sends the product of the receipt.
+
+        :return: `False` if the message should be retried.
+        """
+        try:
+            planet_id = await asyncio.to_thread(self.ops.get_planet_id, uuid)
+            if planet_id is None:
+                logger.error(f"Receipt with UUID {uuid} not found in database")
+                return True
+
+            sequencer = self._sequencer[planet_id]
+            # Nonce is allocated one at a time per planet, and registered to sequencer in the same order
+            async with self._planet_lock[planet_id]:
+                reservation = await asyncio.to_thread(self.ops.reserve, uuid)
+                if reservation is None:
+                    return True
+                sequencer.add(reservation.nonce)
+        except Exception as e:
+            logger.error(f"Failed to reserve nonce for {uuid}: {e}")
+            return False
+
+        try:
+            if reservation.tx is None:
+                # Signing runs concurrently regardless of the planet
+                reservation.tx = await asyncio.to_thread(self.ops.sign, reservation)
+                if not await asyncio.to_thread(self.ops.save_tx, reservation):
+                    # Worker which saved its Tx stages it
+                    return True
+
+            await sequencer.wait_turn(reservation.nonce)
+            success, msg, tx_id = await asyncio.to_thread(self.ops.stage, reservation)
+            if success:
+                await asyncio.to_thread(self.ops.save_staged, reservation, tx_id)
+            else:
+                # Stage 실패 시 상태는 CREATED로 유지하여 retryer가 재시도
+                logger.warning(f"Failed to stage tx for {uuid}: {msg}")
+            return True
+        except Exception as e:
+            # Receipt keeps its nonce and is retried with it
+            logger.error(f"Failed to send product of {uuid}: {e}")
+            return False
+        finally:
+            await sequencer.done(reservation.nonce)
+
+    async def handle_message(self, message: Message):
+        try:
+            parsed, raw = parse_message(message)
+        except Exception as e:
+            logger.error(f"Failed to parse message {message.delivery_tag}: {e}")
+            self._finished.put((message, None, "reject"))
+            return
+        observe_queue_lag(parsed)
+        success = await self.process(str(parsed.uuid))
+        self._finished.put((message, raw, "ack" if success else "retry"))
+
+    def consume(self, loop: asyncio.AbstractEventLoop, inbox: asyncio.Queue, stopped: threading.Event):
+        """
+        AMQP consumer thread. kombu channel is not thread-safe:
+        messages are passed to the event loop and acked back in this thread.
+        """
+        with app.connection_for_read() as connection, create_lane_consumers(
+            connection,
+            [lambda body, message: loop.call_soon_threadsafe(inbox.put_nowait, message)],
+            self.concurrency,
+        ) as consumer_group:
+            while not stopped.is_set():
+                consumer_group.check_planets()
+                try:
+                    connection.drain_events(timeout=0.1)
+                except socket.timeout:
+                    pass
+                self.settle()
+
+    def settle(self):
+        """Ack, retry or reject processed messages"""
+        while True:
+            try:
+                message, raw, action = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            if action == "reject":
+                message.reject(requeue=False)
+                continue
+            if action == "retry":
+                retry_message(message, raw)
+            message.ack()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+        inbox = asyncio.Queue()
+        stopped = threading.Event()
+        thread = threading.Thread(target=self.consume, args=(loop, inbox, stopped), daemon=True)
+        thread.start()
+        logged_at = time.monotonic()
+        try:
+            while thread.is_alive():
+                if time.monotonic() - logged_at >= 60:
+                    logger.info("Product worker metrics", queue_lag=queue_lag_snapshot(), in_flight=len(self._task_set))
+                    logged_at = time.monotonic()
+                try:
+                    message = await asyncio.wait_for(inbox.get(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                task = asyncio.create_task(self.handle_message(message))
+                self._task_set.add(task)
+                task.add_done_callback(self._task_set.discard)
+        finally:
+            stopped.set()
+
+
+if __name__ == "__main__":
+    asyncio.run(AsyncProductWorker(ProductOps(), concurrency=config.async_worker_concurrency).run())
@@ -0,0 +1,129 @@
+"""
+Micro-batching consumer of `iap.send_product`.
+
+Run instead of celery worker of product queues. All delivery lanes are consumed with weighted prefetch:
+
+    python -m app.batch_consumer
+
+Messages are drained up to `send_product_batch_size` or until `send_product_batch_wait_ms` passes
+after the first message, then processed together by `handle_batch`.
+Like `acks_late`, each message is acked only after its receipt is processed,
+and failed messages are republished with Celery retry count.
+"""
+import socket
+import time
+from typing import Any, Dict, List, Tuple
+
+import structlog
+from kombu.message import Message
+from shared.schemas.message import SendProductMessage
+from shared.utils.metrics import snapshot
+
+from app.celery_app import app
+from app.config import config
+from app.lanes import create_lane_consumers, get_retry_queue, observe_queue_lag, queue_lag_snapshot, to_retry
+from app.tasks.send_product_task import handle_batch, send_product
+
+logger = structlog.get_logger(__name__)
+
+
+def parse_message(message: Message) -> Tuple[SendProductMessage, Dict[str, Any]]:
+    """Parse Celery task message (protocol 2) of `iap.send_product`"""
+    task_name = message.headers.get("task")
+    if task_name != send_product.name:
+        raise ValueError(f"Unexpected task {task_name} in {message.delivery_info.get('routing_key')}")
+    args, kwargs, _ = message.decode()
+    raw = args[0] if args else kwargs["message"]
+    return SendProductMessage.model_validate(raw), raw
+
+
+def retry_message(message: Message, raw: Dict[str, Any]):
+    """
+    Republish the message as Celery retry of `iap.send_product` to retry lane through its delay queue.
+    Call before acking the message.
+    """
+    retries = message.headers.get("retries") or 0
+    if retries >= send_product.max_retries:
+        logger.error("Max retries exceeded for send product", message=raw)
+        return
+    send_product.apply_async(
+        args=[to_retry(raw)],
+        # Delay queue holds the message instead of ETA, which lane consumers do not honor
+        countdown=0,
+        retries=retries + 1,
+        queue=get_retry_queue(raw),
+    )
+
+
+class SendProductBatchConsumer:
+    def __init__(self, connection, batch_size: int, wait_ms: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.wait = wait_ms / 1000
+        self.buffer: List[Message] = []
+
+    def on_message(self, body, message: Message):
+        self.buffer.append(message)
+
+    def collect(self):
+        """Drain messages until the batch is full or wait time passes after the first message"""
+        deadline = None
+        while len(self.buffer) < self.batch_size:
+            if self.buffer and deadline is None:
+                deadline = time.monotonic() + self.wait
+            timeout = 1 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                self.connection.drain_events(timeout=timeout)
+            except socket.timeout:
+                pass
+
+    def flush(self):
+        message_list, self.buffer = self.buffer, []
+        parsed_list = []
+        for message in message_list:
+            try:
+                parsed_list.append((message, *parse_message(message)))
+            except Exception as e:
+                logger.error(f"Failed to parse message {message.delivery_tag}: {e}")
+                message.reject(requeue=False)
+
+        if not parsed_list:
+            return
+        for _, parsed, _ in parsed_list:
+            observe_queue_lag(parsed)
+
+        try:
+            _, retry_set = handle_batch([x[1] for x in parsed_list])
+        except Exception as exc:
+            logger.error("Error processing send product batch", exc_info=exc)
+            retry_set = {str(x[1].uuid) for x in parsed_list}
+
+        # Retry is published before ack so the message is never lost
+        for message, parsed, raw in parsed_list:
+            if str(parsed.uuid) in retry_set:
+                retry_message(message, raw)
+            message.ack()
+        logger.info(
+            f"{len(parsed_list)} send product messages are processed, {len(retry_set)} to retry",
+            sign_latency=snapshot().get("sign_tx"),
+            queue_lag=queue_lag_snapshot(),
+        )
+
+    def run(self):
+        with create_lane_consumers(self.connection, [self.on_message], self.batch_size) as consumer_group:
+            while True:
+                consumer_group.check_planets()
+                self.collect()
+                if self.buffer:
+                    self.flush()
+
+
+if __name__ == "__main__":
+    with app.connection_for_read() as connection:
+        SendProductBatchConsumer(
+            connection,
+            batch_size=config.send_product_batch_size,
+            wait_ms=config.send_product_batch_wait_ms,
+        ).run()
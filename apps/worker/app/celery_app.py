@@ -1,7 +1,10 @@
+from typing import Optional
+
 import structlog
 from celery import Celery
 from celery.schedules import crontab
 from kombu import Exchange, Queue
+from shared.enums import DeliveryLane, PlanetID
 
 from app.config import config
 
@@ -14,12 +17,70 @@ product_queue = Queue(
     exchange=task_exchange,
     routing_key="product_tasks",
 )
+product_free_queue = Queue(
+    "product_free_queue",
+    exchange=task_exchange,
+    routing_key="product_free_tasks",
+)
+product_redeem_queue = Queue(
+    "product_redeem_queue",
+    exchange=task_exchange,
+    routing_key="product_redeem_tasks",
+)
+product_retry_queue = Queue(
+    "product_retry_queue",
+    exchange=task_exchange,
+    routing_key="product_retry_tasks",
+)
 background_job_queue = Queue(
     "background_job_queue",
     exchange=task_exchange,
     routing_key="background_job_tasks",
 )
 
+# `iap.send_product` queue of each delivery lane
+lane_queue_dict = {
+    DeliveryLane.PAID: product_queue,
+    DeliveryLane.FREE: product_free_queue,
+    DeliveryLane.REDEEM: product_redeem_queue,
+    DeliveryLane.RETRY: product_retry_queue,
+}
+
+
+def get_lane_queue(lane: DeliveryLane, planet_id: Optional[PlanetID] = None) -> Queue:
+    """Queue of the lane, or its shard of the planet"""
+    queue = lane_queue_dict[lane]
+    if planet_id is None:
+        return queue
+    return Queue(
+        lane.queue(planet_id),
+        exchange=task_exchange,
+        routing_key=f"{queue.routing_key}.{planet_id.name.lower()}",
+    )
+
+
+def get_delay_queue(queue: Queue) -> Queue:
+    """
+    Delay queue of the queue. Messages expire after `send_product_retry_delay` seconds
+    and are dead-lettered back to the queue. Lane consumers do not honor Celery ETA, so retry waits here instead.
+    It must not be consumed: it is left out of `task_queues` and declared when a retry is published to it.
+    """
+    return Queue(
+        f"{queue.name}.delay",
+        exchange=task_exchange,
+        routing_key=f"{queue.routing_key}.delay",
+        queue_arguments={
+            "x-message-ttl": config.send_product_retry_delay * 1000,
+            "x-dead-letter-exchange": task_exchange.name,
+            "x-dead-letter-routing-key": queue.routing_key,
+        },
+    )
+
+
+planet_queue_list = [
+    get_lane_queue(lane, planet_id) for lane in DeliveryLane for planet_id in config.converted_gql_urls_map
+]
+
 
 app = Celery("iap_worker", broker=config.broker_url, backend=config.result_backend)
 
@@ -39,9 +100,34 @@ beat_schedule = {
         "schedule": crontab(minute="*/1"),
         "options": {"queue": "background_job_queue"},
     },
-    "track-google-refund-every-minutes": {
+    "reconcile-nonce-every-10-minutes": {
+        "task": "iap.reconcile_nonce",
+        "schedule": crontab(minute="*/10"),
+        "options": {"queue": "background_job_queue"},
+    },
+    "repair-nonce-gap-every-minutes": {
+        "task": "iap.repair_nonce_gap",
+        "schedule": crontab(minute="*/1"),
+        "options": {"queue": "background_job_queue"},
+    },
+    "resign-stale-tx-every-10-minutes": {
+        "task": "iap.resign_stale_tx",
+        "schedule": crontab(minute="*/10"),
+        "options": {"queue": "background_job_queue"},
+    },
+    "batch-grant-every-window": {
+        "task": "iap.batch_grant",
+        "schedule": config.grant_batch_window,
+        "options": {"queue": "background_job_queue"},
+    },
+    "follow-blocks-every-interval": {
+        "task": "iap.follow_blocks",
+        "schedule": config.block_follow_interval,
+        "options": {"queue": "background_job_queue"},
+    },
+    "track-google-refund-every-6-hours": {
         "task": "iap.track_google_refund",
-        "schedule": crontab(minute="*/60"),
+        "schedule": crontab(minute=0, hour="*/6"),
         "options": {"queue": "background_job_queue"},
     },
 }
@@ -56,7 +142,7 @@ app.conf.update(
     task_acks_late=True,
     task_reject_on_worker_lost=True,
     worker_prefetch_multiplier=1,
-    task_queues=(product_queue, background_job_queue),
+    task_queues=(*lane_queue_dict.values(), *planet_queue_list, background_job_queue),
     task_default_queue="product_queue",
     task_default_exchange="tasks",
     task_default_routing_key="product_tasks",
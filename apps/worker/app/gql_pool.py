@@ -0,0 +1,138 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import structlog
+from graphql import GraphQLSchema
+from shared._graphql import GQL
+from shared.enums import PlanetID
+
+from app.config import config
+
+logger = structlog.get_logger(__name__)
+
+# Weight of the latest latency in moving average
+LATENCY_ALPHA = 0.3
+
+
+@dataclass
+class EndpointHealth:
+    healthy: bool = True
+    failure_count: int = 0
+    last_error: Optional[str] = None
+    failed_at: Optional[float] = None
+    success_count: int = 0
+    latency_ms: Optional[float] = None
+
+
+class GQLPool:
+    """
+    Worker process wide GQL clients per planet endpoint.
+
+    Schema is introspected once per endpoint and HTTP session is kept open, so tasks don't build `GQL` for every message.
+    When a client fails, it is dropped and rebuilt on the next `get` after `retry_interval` seconds.
+    Endpoints of a planet are ordered by health and latency, so the fastest healthy node is used first.
+    """
+
+    def __init__(self, url_map: Dict[PlanetID, List[str]], jwt_secret: Optional[str], retry_interval: float = 10):
+        self.retry_interval = retry_interval
+        self._url_map = url_map
+        self._jwt_secret = jwt_secret
+        self._lock = threading.Lock()
+        self._client_dict: Dict[str, GQL] = {}
+        self._schema_dict: Dict[str, GraphQLSchema] = {}
+        self._health_dict: Dict[str, EndpointHealth] = {}
+
+    def urls(self, planet_id: PlanetID) -> List[str]:
+        """Endpoints of the planet: healthy first, then lower latency. Unmeasured endpoint is tried first."""
+        url_list = self._url_map.get(PlanetID(planet_id), [])
+        health_dict = self._health_dict
+
+        def key(i: int):
+            health = health_dict.get(url_list[i])
+            if health is None:
+                return False, 0, i
+            return not health.healthy, health.latency_ms or 0, i
+
+        return [url_list[i] for i in sorted(range(len(url_list)), key=key)]
+
+    def get(self, planet_id: PlanetID) -> Optional[GQL]:
+        """Returns GQL client of the best endpoint of the planet. `None` if no node is available."""
+        for url in self.urls(planet_id):
+            client = self._get_client(url)
+            if client is not None:
+                return client
+        return None
+
+    def get_all(self, planet_id: PlanetID) -> List[GQL]:
+        """Returns GQL clients of all available endpoints of the planet in preferred order"""
+        return [x for x in (self._get_client(url) for url in self.urls(planet_id)) if x is not None]
+
+    def _get_client(self, url: str) -> Optional[GQL]:
+        client = self._client_dict.get(url)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._client_dict.get(url)
+            if client is not None:
+                return client
+
+            health = self._health_dict.setdefault(url, EndpointHealth())
+            if not health.healthy and time.monotonic() - health.failed_at < self.retry_interval:
+                return None
+
+            try:
+                client = GQL(url, self._jwt_secret, schema=self._schema_dict.get(url))
+                client.connect()
+            except Exception as e:
+                logger.error(f"Failed to create GQL client for {url}: {e}")
+                self._set_failed(url, e)
+                return None
+
+            self._client_dict[url] = client
+            self._schema_dict[url] = client.client.schema
+            health.healthy = True
+            logger.info(f"GQL client created for {url}")
+            return client
+
+    def report_success(self, client: GQL, latency: float):
+        """Records latency of a successful request in seconds"""
+        with self._lock:
+            health = self._health_dict.setdefault(client.url, EndpointHealth())
+            health.success_count += 1
+            latency_ms = latency * 1000
+            if health.latency_ms is None:
+                health.latency_ms = latency_ms
+            else:
+                health.latency_ms = LATENCY_ALPHA * latency_ms + (1 - LATENCY_ALPHA) * health.latency_ms
+
+    def report_failure(self, client: GQL, error: Exception):
+        """Drops the client after failed request. Schema is introspected again with the new client."""
+        url = client.url
+        with self._lock:
+            if self._client_dict.get(url) is client:
+                del self._client_dict[url]
+                self._schema_dict.pop(url, None)
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            self._set_failed(url, error)
+
+    def _set_failed(self, url: str, error: Exception):
+        health = self._health_dict.setdefault(url, EndpointHealth())
+        health.healthy = False
+        health.failure_count += 1
+        health.last_error = str(error)
+        health.failed_at = time.monotonic()
+
+    def health(self) -> Dict[str, Dict[str, dict]]:
+        return {
+            planet_id.name: {url: asdict(self._health_dict[url]) for url in url_list if url in self._health_dict}
+            for planet_id, url_list in self._url_map.items()
+        }
+
+
+gql_pool = GQLPool(config.converted_gql_urls_map, config.headless_jwt_secret, retry_interval=config.gql_retry_interval)
@@ -0,0 +1,129 @@
+"""
+Delivery lanes of `iap.send_product`.
+
+Paid, free/mileage, redeem and retry messages are sent to separate queues, and each lane is sharded by planet.
+Every queue is consumed with its own channel. Prefetch of each channel is weighted by `lane_weight_map`,
+so a burst in one lane takes only its share of in-flight messages.
+Shards of a planet are paused while no node of the planet is available, so an outage does not delay other planets.
+Pausing applies only to runtimes consuming through `LaneConsumerGroup` (`app.batch_consumer`, `app.async_worker`).
+A plain Celery worker of product queues consumes every shard and never pauses.
+"""
+import time
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import structlog
+from kombu import Consumer, Queue
+from shared.enums import DeliveryLane, PlanetID
+from shared.schemas.message import SendProductMessage
+from shared.utils.metrics import get_latency_metric
+
+from app.celery_app import get_delay_queue, get_lane_queue
+from app.config import config
+from app.gql_pool import gql_pool
+
+logger = structlog.get_logger(__name__)
+
+
+def get_lane_prefetch(total: int) -> Dict[DeliveryLane, int]:
+    """Splits `total` in-flight messages to lanes by weight. Every lane gets at least one."""
+    weight_dict = {lane: max(0, config.lane_weight_map.get(lane.name, 1)) for lane in DeliveryLane}
+    weight_sum = sum(weight_dict.values()) or 1
+    return {lane: max(1, round(total * weight / weight_sum)) for lane, weight in weight_dict.items()}
+
+
+class LaneConsumerGroup:
+    """
+    Consumers of all lanes and their planet shards. Use as a context manager, and drain events from `connection`.
+    Unsharded queues of lanes are consumed always, since they have messages of all planets.
+    """
+
+    def __init__(self, connection, callbacks: List[Callable], total: int, planet_list: List[PlanetID]):
+        self.planet_list = planet_list
+        self.paused: Set[PlanetID] = set()
+        self.checked_at = 0.0
+        self.consumer_dict: Dict[Tuple[DeliveryLane, Optional[PlanetID]], Consumer] = {}
+        self._stack = ExitStack()
+        for lane, prefetch_count in get_lane_prefetch(total).items():
+            for planet_id in [None, *planet_list]:
+                consumer = Consumer(
+                    connection.channel(),
+                    queues=[get_lane_queue(lane, planet_id)],
+                    callbacks=callbacks,
+                    accept=["json"],
+                )
+                consumer.qos(prefetch_count=prefetch_count)
+                self.consumer_dict[(lane, planet_id)] = consumer
+
+    def __enter__(self):
+        for consumer in self.consumer_dict.values():
+            self._stack.enter_context(consumer)
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+    def pause(self, planet_id: PlanetID):
+        if planet_id in self.paused:
+            return
+        for lane in DeliveryLane:
+            self.consumer_dict[(lane, planet_id)].cancel()
+        self.paused.add(planet_id)
+        logger.warning(f"Delivery to planet {planet_id.name} is paused")
+
+    def resume(self, planet_id: PlanetID):
+        if planet_id not in self.paused:
+            return
+        for lane in DeliveryLane:
+            self.consumer_dict[(lane, planet_id)].consume()
+        self.paused.discard(planet_id)
+        logger.info(f"Delivery to planet {planet_id.name} is resumed")
+
+    def check_planets(self, is_available: Callable[[PlanetID], bool] = lambda x: gql_pool.get(x) is not None):
+        """Pauses or resumes shards by node health, at most once in `planet_health_interval` seconds"""
+        now = time.monotonic()
+        if now - self.checked_at < config.planet_health_interval:
+            return
+        self.checked_at = now
+        for planet_id in self.planet_list:
+            if is_available(planet_id):
+                self.resume(planet_id)
+            else:
+                self.pause(planet_id)
+
+
+def create_lane_consumers(connection, callbacks: List[Callable], total: int) -> LaneConsumerGroup:
+    return LaneConsumerGroup(connection, callbacks, total, list(config.converted_gql_urls_map))
+
+
+def get_retry_queue(message: Dict[str, Any]) -> Queue:
+    """
+    Delay queue of retry lane for the message, in the shard of its planet if known.
+    Message is dead-lettered to the retry lane after `send_product_retry_delay` seconds.
+    Publish with the queue itself, not its name, so it is declared with its arguments.
+    """
+    planet_id = message.get("planet_id")
+    planet_id = PlanetID(planet_id.encode()) if planet_id else None
+    # Shards are consumed only for planets with node URL
+    if planet_id not in config.converted_gql_urls_map:
+        planet_id = None
+    return get_delay_queue(get_lane_queue(DeliveryLane.RETRY, planet_id))
+
+
+def to_retry(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Message body to send again through retry lane"""
+    return {**message, "lane": DeliveryLane.RETRY.value, "enqueued_at": time.time()}
+
+
+def observe_queue_lag(message: SendProductMessage, now: Optional[float] = None):
+    """Records time from enqueue to consume of the message in `queue_lag.<lane>` metric"""
+    if message.lane is None or message.enqueued_at is None:
+        return
+    lag = (now or time.time()) - message.enqueued_at
+    get_latency_metric(f"queue_lag.{message.lane.name.lower()}").observe(max(0.0, lag))
+
+
+def queue_lag_snapshot() -> Dict[str, Dict[str, Optional[float]]]:
+    return {
+        lane.name.lower(): get_latency_metric(f"queue_lag.{lane.name.lower()}").snapshot() for lane in DeliveryLane
+    }
@@ -0,0 +1,38 @@
+import hashlib
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import structlog
+from sqlalchemy import Engine, text
+
+logger = structlog.get_logger(__name__)
+
+
+def get_lock_key(name: str, slot: int) -> int:
+    """64-bit signed key of PostgreSQL advisory lock"""
+    return int.from_bytes(hashlib.sha256(f"{name}:{slot}".encode()).digest()[:8], "big", signed=True)
+
+
+@contextmanager
+def run_lock(engine: Engine, name: str, slots: int = 1) -> Iterator[Optional[int]]:
+    """
+    Distributed run-lock of a periodic task with PostgreSQL session advisory lock.
+
+    Up to `slots` runs of the task are allowed at the same time, and they split rows by `FOR UPDATE SKIP LOCKED`.
+    Yields the acquired slot, or `None` if every slot is taken by other runs.
+    The lock is released when the run ends, or by PostgreSQL when the connection is lost.
+    """
+    with engine.connect() as conn:
+        for slot in range(slots):
+            key = get_lock_key(name, slot)
+            if conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}):
+                conn.commit()
+                try:
+                    yield slot
+                finally:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    conn.commit()
+                return
+
+        logger.info(f"{name} is already running in all {slots} slots, skip this run")
+        yield None
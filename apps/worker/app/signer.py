@@ -0,0 +1,12 @@
+from shared._crypto import Signer, get_account, get_local_account
+
+from app.config import config
+
+
+def get_signer() -> Signer:
+    """Process wide signer of the worker selected by `config.signer`"""
+    if config.signer == "local":
+        if not config.local_key_file:
+            raise ValueError("WORKER_LOCAL_KEY_FILE is required for local signer")
+        return get_local_account(config.local_key_file)
+    return get_account(config.kms_key_id, cache_dir=config.kms_pubkey_cache_dir)
@@ -1,4 +1,9 @@
 # Import tasks here for autodiscovery
+from app.tasks.batch_grant import batch_grant
+from app.tasks.block_tracker import follow_blocks
+from app.tasks.nonce_gap import repair_nonce_gap
+from app.tasks.reconcile_nonce import reconcile_nonce
+from app.tasks.resign import resign_stale_tx
 from app.tasks.retryer import retryer
 from app.tasks.send_product_task import send_product
 from app.tasks.status_monitor import status_monitor
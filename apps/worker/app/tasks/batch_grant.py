@@ -0,0 +1,161 @@
+import datetime
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+import structlog
+from shared._crypto import Signer
+from shared.enums import PlanetID, ReceiptStatus, TxStatus
+from shared.models.product import Product
+from shared.models.receipt import Receipt
+from shared.utils.nonce import allocate_nonce, get_initial_nonce
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import selectinload, scoped_session, sessionmaker
+
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+from app.signer import get_signer
+from app.tasks.send_product_task import create_batch_tx, stage_tx
+
+logger = structlog.get_logger(__name__)
+
+engine = create_engine(
+    str(config.pg_dsn),
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+
+def split_batch(receipt_list: List[Receipt], batch_size: int) -> Tuple[List[Receipt], List[Receipt]]:
+    """
+    Pick receipts for one batch Tx.
+    An avatar can receive only once in one `GrantItems`, so duplicated avatars are left to the next batch.
+    """
+    batch = []
+    rest = []
+    avatar_set = set()
+    for receipt in receipt_list:
+        avatar = receipt.avatar_addr.lower()
+        if len(batch) >= batch_size or avatar in avatar_set:
+            rest.append(receipt)
+            continue
+        avatar_set.add(avatar)
+        batch.append(receipt)
+    return batch, rest
+
+
+def group_receipts(receipt_list: List[Receipt]) -> Dict[Tuple[bytes, int, str], List[Receipt]]:
+    # Receipts in the same group share the product and the memo
+    group_dict = defaultdict(list)
+    for receipt in receipt_list:
+        group_dict[(receipt.planet_id, receipt.product_id, receipt.package_name)].append(receipt)
+    return group_dict
+
+
+def grant_batch(sess, account: Signer, receipt_list: List[Receipt]):
+    planet_id = PlanetID(receipt_list[0].planet_id)
+
+    def get_nonce_from_node():
+        gql = gql_pool.get(planet_id)
+        if gql is None:
+            raise ValueError(f"Node of planet {planet_id} is unavailable")
+        try:
+            nonce = gql.get_next_nonce(account.address)
+        except Exception as e:
+            gql_pool.report_failure(gql, e)
+            raise
+        if nonce == -1:
+            raise ValueError(f"Failed to get nonce from node for planet {planet_id}")
+        return get_initial_nonce(sess, planet_id, nonce)
+
+    nonce = allocate_nonce(sess, planet_id, account.address, get_nonce_from_node)
+    tx = create_batch_tx(account, receipt_list, receipt_list[0].product, nonce).hex()
+    for receipt in receipt_list:
+        receipt.nonce = nonce
+        receipt.tx = tx
+        receipt.tx_status = TxStatus.CREATED
+    sess.commit()
+    logger.info(f"{len(receipt_list)} receipts of planet {planet_id}: Tx created with nonce: {nonce}")
+
+    success, msg, tx_id = stage_tx(receipt_list[0])
+    if not success:
+        # Stage 실패 시 상태는 CREATED로 유지하여 retryer가 재시도
+        logger.warning(f"Failed to stage batch tx with nonce {nonce} on planet {planet_id}: {msg}")
+        return
+    for receipt in receipt_list:
+        receipt.tx_id = tx_id
+        receipt.tx_status = TxStatus.STAGED
+    sess.commit()
+
+
+def handle() -> int:
+    sess = scoped_session(sessionmaker(bind=engine))
+    account = get_signer()
+    failed_planets: Set[bytes] = set()
+    count = 0
+
+    try:
+        while True:
+            query = (
+                select(Receipt)
+                .join(Product, Product.id == Receipt.product_id)
+                .options(
+                    selectinload(Receipt.product).selectinload(Product.fav_list),
+                    selectinload(Receipt.product).selectinload(Product.fungible_item_list),
+                )
+                .where(
+                    Receipt.status == ReceiptStatus.VALID,
+                    Receipt.tx_status.is_(None),
+                    Receipt.tx.is_(None),
+                    Receipt.nonce.is_(None),
+                    Receipt.created_at
+                    >= datetime.datetime.now(tz=datetime.timezone.utc)
+                    - datetime.timedelta(minutes=config.grant_batch_lookback_minutes),
+                    Product.google_sku.not_like("%pass%"),
+                )
+                .order_by(Receipt.id)
+                .limit(config.grant_batch_size * 10)
+                # Receipts locked by `send_product` or other batch are skipped
+                .with_for_update(of=Receipt, skip_locked=True)
+            )
+            if failed_planets:
+                query = query.where(Receipt.planet_id.not_in(failed_planets))
+
+            target_list = sess.scalars(query).all()
+            if not target_list:
+                sess.rollback()
+                break
+
+            # Only the oldest group is sent in a loop. Other locks are released by commit.
+            receipt_list = next(iter(group_receipts(target_list).values()))
+            batch, _ = split_batch(receipt_list, config.grant_batch_size)
+            try:
+                grant_batch(sess, account, batch)
+                count += len(batch)
+            except Exception as e:
+                sess.rollback()
+                logger.error(f"Failed to grant batch on planet {batch[0].planet_id}: {e}")
+                failed_planets.add(batch[0].planet_id)
+    finally:
+        sess.close()
+
+    return count
+
+
+@app.task(
+    name="iap.batch_grant",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    queue="background_job_queue",
+)
+def batch_grant(self):
+    if config.grant_batch_size <= 1:
+        return
+    count = handle()
+    if count:
+        logger.info(f"{count} receipts are granted by batch Tx")
@@ -0,0 +1,144 @@
+from typing import Dict, List, Set
+
+import structlog
+from shared.enums import PlanetID, ReceiptStatus, TxStatus
+from shared.models.cursor import WorkerCursor
+from shared.models.receipt import Receipt
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+from app.run_lock import run_lock
+from app.tasks.tracker import process
+
+logger = structlog.get_logger(__name__)
+
+CURSOR_NAME = "track_tx_block"
+
+engine = create_engine(
+    config.pg_dsn,
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+
+def get_pending_tx_ids(sess, planet_id: PlanetID) -> Set[str]:
+    return set(
+        sess.scalars(
+            select(Receipt.tx_id).where(
+                Receipt.status == ReceiptStatus.VALID,
+                Receipt.tx_status == TxStatus.STAGED,
+                Receipt.planet_id == planet_id.value,
+                Receipt.tx_id.is_not(None),
+            )
+        ).all()
+    )
+
+
+def update_statuses(sess, status_dict: Dict[str, tuple]):
+    """Updates matched receipts in bulk for each status. Receipts of a batch Tx are updated together."""
+    tx_dict: Dict[TxStatus, List[str]] = {}
+    for tx_id, (tx_status, msg) in status_dict.items():
+        if tx_status is None or tx_status == TxStatus.STAGED:
+            continue
+        tx_dict.setdefault(tx_status, []).append(tx_id)
+        if tx_status == TxStatus.FAILURE and msg:
+            sess.execute(
+                update(Receipt)
+                .where(Receipt.tx_id == tx_id)
+                .values(msg=func.concat(func.coalesce(Receipt.msg, ""), "\n", msg))
+            )
+
+    for tx_status, tx_id_list in tx_dict.items():
+        sess.execute(
+            update(Receipt)
+            .where(Receipt.tx_id.in_(tx_id_list), Receipt.tx_status == TxStatus.STAGED)
+            .values(tx_status=tx_status)
+        )
+        logger.info(f"{len(tx_id_list)} transactions are changed to {tx_status.name}")
+
+
+def follow_planet(sess, planet_id: PlanetID) -> int:
+    """
+    Scans blocks from the cursor to the tip and matches Tx in them with staged receipts.
+    Only matched Tx are queried for result. Returns the number of matched Tx.
+    """
+    client = gql_pool.get(planet_id)
+    if client is None:
+        logger.warning(f"Node of planet {planet_id} is unavailable, skip following blocks")
+        return 0
+
+    try:
+        tip = client.get_tip_index()
+    except Exception as e:
+        gql_pool.report_failure(client, e)
+        raise
+    if tip == -1:
+        raise ValueError(f"Failed to get tip of planet {planet_id}")
+
+    cursor = sess.scalar(
+        select(WorkerCursor)
+        .where(WorkerCursor.name == CURSOR_NAME, WorkerCursor.planet_id == planet_id.value)
+        .with_for_update()
+    )
+    if cursor is None:
+        cursor = WorkerCursor(
+            name=CURSOR_NAME, planet_id=planet_id.value, position=max(-1, tip - config.block_follow_lookback)
+        )
+        sess.add(cursor)
+
+    pending = get_pending_tx_ids(sess, planet_id)
+    # Nothing to find: jump to the tip without fetching blocks
+    end = tip if not pending else min(tip, cursor.position + config.block_follow_max_blocks)
+
+    matched = set()
+    offset = cursor.position + 1
+    while pending and offset <= end:
+        limit = min(config.block_follow_batch_size, end - offset + 1)
+        try:
+            block_list = client.get_block_tx_ids(offset, limit)
+        except Exception as e:
+            gql_pool.report_failure(client, e)
+            raise
+        for _, tx_id_list in block_list:
+            matched.update(pending.intersection(tx_id_list))
+        offset += limit
+
+    if matched:
+        update_statuses(sess, process(planet_id, sorted(matched)))
+    cursor.position = max(cursor.position, end)
+    sess.commit()
+    logger.info(f"Blocks of planet {planet_id.name} are followed to {cursor.position}, {len(matched)} Tx matched")
+    return len(matched)
+
+
+@app.task(
+    name="iap.follow_blocks",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    queue="background_job_queue",
+)
+def follow_blocks(self):
+    if config.track_tx_mode != "block":
+        return
+
+    with run_lock(engine, "iap.follow_blocks") as slot:
+        if slot is None:
+            return
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            for planet_id in config.converted_gql_urls_map:
+                try:
+                    follow_planet(sess, planet_id)
+                except Exception as e:
+                    sess.rollback()
+                    logger.error(f"Failed to follow blocks of planet {planet_id}: {e}")
+        finally:
+            sess.close()
@@ -0,0 +1,209 @@
+"""
+Nonce gap detector.
+
+A Tx of the signer which never gets into a block blocks every later Tx of the signer on the planet.
+For each planet, allocated `next_nonce` is compared with chain `nextTxNonce`.
+If chain nonce does not move for `nonce_gap_threshold_seconds` while later nonces are allocated,
+the Tx of the blocking nonce (= chain nonce) is repaired before anything else:
+staged again, or signed again with the same nonce if it is invalid or still stuck.
+A blocking nonce is signed again at most once, and the replaced Tx ID is kept in `Receipt.superseded_tx_ids`.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import structlog
+from shared.enums import PlanetID, TxStatus
+from shared.models.cursor import WorkerCursor
+from shared.models.nonce import PlanetNonce
+from shared.models.product import Product
+from shared.models.receipt import Receipt
+from shared.utils.metrics import get_latency_metric, set_gauge
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import joinedload, selectinload, scoped_session, sessionmaker
+
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+from app.run_lock import run_lock
+from app.signer import get_signer
+from app.tasks.send_product_task import create_batch_tx, stage_tx
+from app.tasks.status_monitor import create_block, send_message
+
+logger = structlog.get_logger(__name__)
+
+CURSOR_NAME = "nonce_gap"
+# Position is the last blocking nonce signed again
+RESIGN_CURSOR_NAME = "nonce_gap_resign"
+
+engine = create_engine(
+    config.pg_dsn,
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+
+def alert(text: str):
+    logger.error(text)
+    if config.iap_alert_webhook_url:
+        send_message(config.iap_alert_webhook_url, "[NineChronicles.IAP] Nonce Gap Alert", [create_block(text)])
+
+
+def get_blocking_receipts(sess, planet_id: PlanetID, nonce: int) -> List[Receipt]:
+    """Receipts sent by the Tx of the nonce. Receipts of a batch Tx share the nonce."""
+    return sess.scalars(
+        select(Receipt)
+        .options(
+            joinedload(Receipt.product).options(
+                selectinload(Product.fav_list), selectinload(Product.fungible_item_list)
+            )
+        )
+        .where(Receipt.planet_id == planet_id.value, Receipt.nonce == nonce)
+        .order_by(Receipt.id)
+        .with_for_update(of=Receipt)
+    ).unique().all()
+
+
+def get_resign_cursor(sess, planet_id: PlanetID) -> WorkerCursor:
+    cursor = sess.scalar(
+        select(WorkerCursor)
+        .where(WorkerCursor.name == RESIGN_CURSOR_NAME, WorkerCursor.planet_id == planet_id.value)
+        .with_for_update()
+    )
+    if cursor is None:
+        cursor = WorkerCursor(name=RESIGN_CURSOR_NAME, planet_id=planet_id.value, position=-1)
+        sess.add(cursor)
+    return cursor
+
+
+def repair(sess, planet_id: PlanetID, nonce: int, stalled_for: float) -> str:
+    """
+    Stages the Tx of the blocking nonce again. Signs it again with the same nonce
+    if it has no valid Tx or staging does not help for twice of the threshold, only once per blocking nonce.
+    Returns the action taken.
+    """
+    receipt_list = get_blocking_receipts(sess, planet_id, nonce)
+    if not receipt_list:
+        # Moving another receipt to this nonce may deliver it twice, so this is left to the operator.
+        alert(f"No receipt has blocking nonce {nonce} on planet {planet_id.name}. Fill the nonce manually.")
+        return "missing"
+
+    receipt = receipt_list[0]
+    if receipt.tx_status in (TxStatus.SUCCESS, TxStatus.FAILURE):
+        logger.warning(f"Tx of nonce {nonce} on planet {planet_id.name} is already {receipt.tx_status.name}")
+        return "included"
+
+    resign_cursor = get_resign_cursor(sess, planet_id)
+    resign = receipt.tx is None or (
+        resign_cursor.position != nonce
+        and (receipt.tx_status == TxStatus.INVALID or stalled_for >= 2 * config.nonce_gap_threshold_seconds)
+    )
+    if resign:
+        tx = create_batch_tx(get_signer(), receipt_list, receipt.product, nonce).hex()
+        for r in receipt_list:
+            r.replace_tx(tx)
+            r.tx_status = TxStatus.CREATED
+        resign_cursor.position = nonce
+        sess.commit()
+        logger.info(f"Tx of blocking nonce {nonce} on planet {planet_id.name} is signed again")
+
+    success, msg, tx_id = stage_tx(receipt)
+    if not success:
+        alert(f"Failed to stage Tx of blocking nonce {nonce} on planet {planet_id.name}: {msg}")
+        return "failed"
+
+    for r in receipt_list:
+        r.tx_id = tx_id
+        r.tx_status = TxStatus.STAGED
+        r.track_attempts = 0
+        r.next_check_at = func.now()
+    sess.commit()
+    logger.info(f"Tx {tx_id} of blocking nonce {nonce} on planet {planet_id.name} is staged again")
+    return "resigned" if resign else "restaged"
+
+
+def check_planet(sess, planet_id: PlanetID, address: str, next_nonce: int, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Compares allocated nonce with chain nonce of the planet and repairs the blocking nonce if stalled.
+    Cursor keeps the last chain nonce, and its `updated_at` is when the chain was last seen moving or without gap.
+    """
+    now = now or datetime.now(tz=timezone.utc)
+    client = gql_pool.get(planet_id)
+    if client is None:
+        logger.warning(f"Node of planet {planet_id} is unavailable, skip nonce gap check")
+        return None
+    try:
+        chain_nonce = client.get_next_nonce(address)
+    except Exception as e:
+        gql_pool.report_failure(client, e)
+        raise
+    if chain_nonce == -1:
+        raise ValueError(f"Failed to get nonce of {address} from planet {planet_id}")
+
+    gap = max(0, next_nonce - chain_nonce)
+    set_gauge(f"nonce_gap.{planet_id.name.lower()}", gap)
+
+    cursor = sess.scalar(
+        select(WorkerCursor)
+        .where(WorkerCursor.name == CURSOR_NAME, WorkerCursor.planet_id == planet_id.value)
+        .with_for_update()
+    )
+    if cursor is None:
+        cursor = WorkerCursor(name=CURSOR_NAME, planet_id=planet_id.value, position=chain_nonce, updated_at=now)
+        sess.add(cursor)
+        sess.commit()
+        return None
+
+    stalled_for = (now - cursor.updated_at).total_seconds()
+    if chain_nonce != cursor.position or gap == 0:
+        if chain_nonce > cursor.position and stalled_for >= config.nonce_gap_threshold_seconds:
+            get_latency_metric("nonce_gap_repair").observe(stalled_for)
+            logger.info(f"Nonce gap of planet {planet_id.name} at {cursor.position} is repaired in {stalled_for:.0f}s")
+        cursor.position = chain_nonce
+        cursor.updated_at = now
+        sess.commit()
+        return None
+
+    sess.commit()
+    if stalled_for < config.nonce_gap_threshold_seconds:
+        return None
+
+    logger.warning(
+        f"Nonce {chain_nonce} blocks {gap} Tx on planet {planet_id.name} for {stalled_for:.0f}s",
+        planet_id=planet_id.name, gap=gap, stalled_for=stalled_for,
+    )
+    return repair(sess, planet_id, chain_nonce, stalled_for)
+
+
+def handle():
+    sess = scoped_session(sessionmaker(bind=engine))
+    try:
+        target_list = sess.execute(select(PlanetNonce.planet_id, PlanetNonce.address, PlanetNonce.next_nonce)).all()
+        for planet_id, address, next_nonce in target_list:
+            planet_id = PlanetID(planet_id)
+            if planet_id not in config.converted_gql_url_map:
+                continue
+            try:
+                check_planet(sess, planet_id, address, next_nonce)
+            except Exception as e:
+                sess.rollback()
+                logger.error(f"Failed to check nonce gap of planet {planet_id}: {e}")
+    finally:
+        sess.close()
+
+
+@app.task(
+    name="iap.repair_nonce_gap",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    queue="background_job_queue",
+)
+def repair_nonce_gap(self):
+    with run_lock(engine, "iap.repair_nonce_gap") as slot:
+        if slot is None:
+            return
+        handle()
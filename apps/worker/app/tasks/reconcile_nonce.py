@@ -0,0 +1,64 @@
+import structlog
+from shared.enums import PlanetID
+from shared.models.nonce import PlanetNonce
+from shared.utils.nonce import reconcile_nonce as reconcile
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+
+logger = structlog.get_logger(__name__)
+
+engine = create_engine(
+    config.pg_dsn,
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+
+def handle():
+    sess = scoped_session(sessionmaker(bind=engine))
+    try:
+        target_list = sess.execute(select(PlanetNonce.planet_id, PlanetNonce.address)).all()
+        for planet_id, address in target_list:
+            planet_id = PlanetID(planet_id)
+            if planet_id not in config.converted_gql_url_map:
+                logger.warning(f"No GQL endpoint for planet {planet_id}, skip nonce reconciliation")
+                continue
+            gql = gql_pool.get(planet_id)
+            if gql is None:
+                logger.warning(f"Node of planet {planet_id} is unavailable, skip nonce reconciliation")
+                continue
+
+            try:
+                chain_nonce = gql.get_next_nonce(address)
+            except Exception as e:
+                gql_pool.report_failure(gql, e)
+                logger.error(f"Failed to get nonce of {address} from planet {planet_id}: {e}")
+                continue
+            if chain_nonce == -1:
+                logger.error(f"Failed to get nonce of {address} from planet {planet_id}")
+                continue
+
+            pending = reconcile(sess, planet_id, address, chain_nonce)
+            sess.commit()
+            logger.info(f"Nonce of {address} on planet {planet_id} is reconciled: chain {chain_nonce}, pending {pending}")
+    finally:
+        sess.close()
+
+
+@app.task(
+    name="iap.reconcile_nonce",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    queue="background_job_queue",
+)
+def reconcile_nonce(self):
+    handle()
@@ -0,0 +1,210 @@
+"""
+Bulk re-signing of stale Tx.
+
+Stored Tx is staged again by retryer as is, so a Tx which can never be included fails forever:
+- Nonce is consumed by another Tx: the Tx is signed again with a fresh nonce, only when every Tx ever signed
+  for the receipts (`Receipt.superseded_tx_ids` and the current one) is unknown to the chain.
+  Fresh nonces are allocated at once in the order of old nonces, so later Tx are not blocked by a gap.
+- Timestamp is passed: the Tx is signed again with the same nonce.
+  At most one Tx of a nonce is included, so this never delivers twice.
+All Tx of a planet are signed concurrently by `sign_tx_list` and saved as CREATED, then retryer stages them in nonce order.
+Replaced Tx IDs are kept in `Receipt.superseded_tx_ids`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import structlog
+from shared._crypto import sign_tx_list
+from shared.enums import PlanetID, ReceiptStatus, TxStatus
+from shared.models.product import Product
+from shared.models.receipt import Receipt
+from shared.utils.nonce import allocate_nonce, get_initial_nonce
+from shared.utils.transaction import append_signature_to_unsigned_tx, get_tx_timestamp
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import selectinload, scoped_session, sessionmaker
+
+from app.celery_app import app
+from app.config import config
+from app.gql_pool import gql_pool
+from app.run_lock import run_lock
+from app.signer import get_signer
+from app.tasks.send_product_task import create_unsigned_grant_tx
+from app.tasks.tracker import process
+
+logger = structlog.get_logger(__name__)
+
+PENDING_TX_STATUS = (TxStatus.CREATED, TxStatus.STAGED, TxStatus.INVALID)
+
+engine = create_engine(
+    config.pg_dsn,
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+
+def is_expired(tx: str, now: datetime) -> bool:
+    return get_tx_timestamp(bytes.fromhex(tx)) <= now
+
+
+def get_stale_nonces(sess, planet_id: PlanetID, chain_nonce: int, now: datetime) -> List[int]:
+    """Nonces of pending Tx which are consumed by other Tx or expired, up to `resign_batch_size` from the lowest"""
+    row_list = sess.execute(
+        select(Receipt.nonce, Receipt.tx)
+        .where(
+            Receipt.planet_id == planet_id.value,
+            Receipt.status == ReceiptStatus.VALID,
+            Receipt.tx_status.in_(PENDING_TX_STATUS),
+            Receipt.tx.is_not(None),
+            Receipt.nonce.is_not(None),
+            Receipt.created_at < now - timedelta(minutes=10),
+        )
+        .order_by(Receipt.nonce)
+    ).all()
+
+    nonce_list = []
+    for nonce, tx in row_list:
+        if nonce_list and nonce_list[-1] == nonce:
+            continue
+        if nonce < chain_nonce or is_expired(tx, now):
+            nonce_list.append(nonce)
+            if len(nonce_list) >= config.resign_batch_size:
+                break
+    return nonce_list
+
+
+def resign_planet(sess, planet_id: PlanetID, now: Optional[datetime] = None) -> int:
+    """Signs stale Tx of the planet again in one pass. Returns the number of signed Tx."""
+    now = now or datetime.now(tz=timezone.utc)
+    account = get_signer()
+    client = gql_pool.get(planet_id)
+    if client is None:
+        logger.warning(f"Node of planet {planet_id} is unavailable, skip re-signing")
+        return 0
+    try:
+        chain_nonce = client.get_next_nonce(account.address)
+    except Exception as e:
+        gql_pool.report_failure(client, e)
+        raise
+    if chain_nonce == -1:
+        raise ValueError(f"Failed to get nonce of {account.address} from planet {planet_id}")
+
+    stale_nonces = get_stale_nonces(sess, planet_id, chain_nonce, now)
+    if not stale_nonces:
+        return 0
+
+    receipt_list = sess.scalars(
+        select(Receipt)
+        .options(
+            selectinload(Receipt.product).options(
+                selectinload(Product.fav_list), selectinload(Product.fungible_item_list)
+            )
+        )
+        .where(
+            Receipt.planet_id == planet_id.value,
+            Receipt.nonce.in_(stale_nonces),
+            Receipt.tx_status.in_(PENDING_TX_STATUS),
+        )
+        .order_by(Receipt.nonce, Receipt.id)
+        .with_for_update(of=Receipt)
+    ).all()
+    group_dict: Dict[int, List[Receipt]] = defaultdict(list)
+    for receipt in receipt_list:
+        group_dict[receipt.nonce].append(receipt)
+
+    # Nonce consumed by another Tx can be by this Tx itself or by one signed before for the same receipts:
+    # signed again only when every Tx ever signed for them is unknown to the chain.
+    consumed_list = sorted(x for x in group_dict if x < chain_nonce)
+    tx_id_dict = {
+        nonce: list(dict.fromkeys(tx_id for receipt in group_dict[nonce] for tx_id in receipt.get_signed_tx_ids()))
+        for nonce in consumed_list
+    }
+    status_dict = (
+        process(planet_id, [tx_id for tx_id_list in tx_id_dict.values() for tx_id in tx_id_list])
+        if consumed_list
+        else {}
+    )
+    for nonce in consumed_list:
+        known_dict = {}
+        for tx_id in tx_id_dict[nonce]:
+            tx_status, _ = status_dict.get(tx_id, (None, None))
+            if tx_status != TxStatus.INVALID:
+                known_dict[tx_id] = tx_status
+        if known_dict:
+            logger.info(
+                f"Tx of consumed nonce {nonce} on planet {planet_id.name} is known to the chain, skip re-signing",
+                tx_status={k: v.name if v else "unknown" for k, v in known_dict.items()},
+            )
+            del group_dict[nonce]
+    for nonce in list(group_dict):
+        if group_dict[nonce][0].product is None:
+            logger.error(f"Product of receipts with nonce {nonce} on planet {planet_id.name} not found")
+            del group_dict[nonce]
+    if not group_dict:
+        sess.rollback()
+        return 0
+
+    # Fresh nonces in the order of old nonces. Allocator is locked until commit, so nothing is allocated on failure.
+    new_nonce_dict = {nonce: nonce for nonce in group_dict if nonce >= chain_nonce}
+    resign_list = sorted(x for x in group_dict if x < chain_nonce)
+    if resign_list:
+        start = allocate_nonce(
+            sess,
+            planet_id,
+            account.address,
+            lambda: get_initial_nonce(sess, planet_id.value, chain_nonce),
+            count=len(resign_list),
+        )
+        new_nonce_dict.update({old: start + i for i, old in enumerate(resign_list)})
+
+    target_list = sorted(group_dict.items(), key=lambda x: new_nonce_dict[x[0]])
+    unsigned_tx_list = [
+        create_unsigned_grant_tx(account, group, group[0].product, new_nonce_dict[nonce]) for nonce, group in target_list
+    ]
+    signature_list = sign_tx_list(account, unsigned_tx_list, config.sign_concurrency)
+    failure = next((x for x in signature_list if isinstance(x, Exception)), None)
+    if failure is not None:
+        sess.rollback()
+        raise failure
+
+    for (nonce, group), unsigned_tx, signature in zip(target_list, unsigned_tx_list, signature_list):
+        tx = append_signature_to_unsigned_tx(unsigned_tx, signature).hex()
+        for receipt in group:
+            receipt.nonce = new_nonce_dict[nonce]
+            receipt.replace_tx(tx)
+            receipt.tx_status = TxStatus.CREATED
+            receipt.track_attempts = 0
+            receipt.next_check_at = func.now()
+    sess.commit()
+    logger.info(
+        f"{len(target_list)} stale Tx on planet {planet_id.name} are signed again, "
+        f"{len(resign_list)} with fresh nonce"
+    )
+    return len(target_list)
+
+
+@app.task(
+    name="iap.resign_stale_tx",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    queue="background_job_queue",
+)
+def resign_stale_tx(self):
+    with run_lock(engine, "iap.resign_stale_tx") as slot:
+        if slot is None:
+            return
+        sess = scoped_session(sessionmaker(bind=engine))
+        try:
+            for planet_id in config.converted_gql_urls_map:
+                try:
+                    resign_planet(sess, planet_id)
+                except Exception as e:
+                    sess.rollback()
+                    logger.error(f"Failed to re-sign stale Tx of planet {planet_id}: {e}")
+        finally:
+            sess.close()
@@ -1,13 +1,21 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
-import requests
 import structlog
+from shared.enums import DeliveryLane, PlanetID
 from shared.schemas.message import SendProductMessage
-from sqlalchemy import create_engine, text
+from shared.models.cursor import WorkerCursor
+from shared.models.ledger import EnqueueLedger
+from sqlalchemy import create_engine, func, select, text, update
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app.celery_app import app
 from app.config import config
+from app.gql_pool import gql_pool
+from app.run_lock import run_lock
+from app.tasks.send_product_task import broadcast_tx
 
 logger = structlog.get_logger(__name__)
 
@@ -22,19 +30,33 @@ engine = create_engine(
 
 
 def get_pending_receipts(session) -> List[Dict]:
-    """CREATED, STAGED 또는 INVALID 상태이고 tx가 있는 영수증 중 생성된 지 10분 이상 지난 것들을 nonce 오름차순으로 조회"""
+    """
+    CREATED 또는 INVALID 상태이고 tx가 있는 영수증 중 생성된 지 10분 이상 지난 것들을 lease로 선점하여 nonce 오름차순으로 조회.
+    다른 retryer가 선점한 영수증은 SKIP LOCKED로 건너뛰고, lease(next_check_at)가 만료되기 전에는 다시 조회되지 않음
+    """
     query = text(
         """
-        SELECT id, tx, planet_id, nonce, tx_status, created_at
-        FROM receipt
-        WHERE tx_status IN ('CREATED', 'INVALID')
-        AND tx IS NOT NULL
-        AND created_at < NOW() - INTERVAL '10 minutes'
+        WITH due AS (
+            SELECT id
+            FROM receipt
+            WHERE tx_status IN ('CREATED', 'INVALID')
+            AND tx IS NOT NULL
+            AND created_at < NOW() - INTERVAL '10 minutes'
+            AND next_check_at <= NOW()
+            ORDER BY nonce
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE receipt r
+        SET next_check_at = NOW() + make_interval(secs => :lease)
+        FROM due
+        WHERE r.id = due.id
+        RETURNING r.id, r.tx, r.planet_id, r.nonce, r.tx_status, r.created_at
         """
     )
 
     result = []
-    for row in session.execute(query):
+    for row in session.execute(query, {"limit": config.retryer_batch_size, "lease": config.work_lease_seconds}):
         result.append(
             {
                 "id": row[0],
@@ -45,45 +67,131 @@ def get_pending_receipts(session) -> List[Dict]:
                 "created_at": row[5],
             }
         )
+    session.commit()
 
-    return result
+    return sorted(result, key=lambda x: (bytes(x["planet_id"]), x["nonce"] if x["nonce"] is not None else -1))
+
+
+NULL_TX_CURSOR_NAME = "retryer_null_tx"
 
 
-def get_null_tx_status_receipts(session) -> List[Dict]:
-    """tx_status가 NULL이고 특정 조건에 맞는 영수증들을 조회"""
+def get_null_tx_status_receipts(session, planet_id: PlanetID) -> List[Dict]:
+    """
+    tx_status가 NULL이고 특정 조건에 맞는 한 planet의 영수증들을 cursor 이후부터 batch 크기만큼 선점하여 조회.
+    enqueue_ledger의 lease가 남아 있는 영수증(이전에 보낸 task가 아직 큐에 있거나 처리 중)은 건너뛰고,
+    선점한 영수증은 보낼 task_id와 함께 ledger에 기록. lease는 다시 보낼 때마다 두 배로 늘어남.
+    """
+    cursor = session.scalar(
+        select(WorkerCursor)
+        .where(WorkerCursor.name == NULL_TX_CURSOR_NAME, WorkerCursor.planet_id == planet_id.value)
+        .with_for_update()
+    )
+    if cursor is None:
+        cursor = WorkerCursor(name=NULL_TX_CURSOR_NAME, planet_id=planet_id.value, position=0)
+        session.add(cursor)
+
     query = text(
         """
-        SELECT r.uuid
-        FROM receipt r
-        JOIN product p ON p.id = r.product_id
-        WHERE r.tx_status IS NULL
-        AND r.created_at < NOW() - INTERVAL '10 minutes'
-        AND r.created_at >= '2025-01-01'
-        AND p.google_sku NOT LIKE '%pass%'
-        AND r.status = 'VALID'
-        ORDER BY r.id DESC
+        WITH due AS (
+            SELECT r.id, r.uuid
+            FROM receipt r
+            JOIN product p ON p.id = r.product_id
+            LEFT JOIN enqueue_ledger l ON l.receipt_id = r.id
+            WHERE r.tx_status IS NULL
+            AND r.created_at < NOW() - INTERVAL '10 minutes'
+            AND r.created_at >= '2025-01-01'
+            AND p.google_sku NOT LIKE '%pass%'
+            AND r.status = 'VALID'
+            AND r.planet_id = :planet_id
+            AND r.id > :cursor
+            AND (l.lease_until IS NULL OR l.lease_until <= NOW())
+            ORDER BY r.id
+            LIMIT :limit
+            FOR UPDATE OF r SKIP LOCKED
+        ), ledger AS (
+            INSERT INTO enqueue_ledger (receipt_id, task_id, attempts, lease_until, created_at, updated_at)
+            SELECT id, gen_random_uuid()::text, 1, NOW() + make_interval(secs => :lease), NOW(), NOW()
+            FROM due
+            ON CONFLICT (receipt_id) DO UPDATE
+            SET task_id = EXCLUDED.task_id,
+                attempts = enqueue_ledger.attempts + 1,
+                lease_until = NOW() + make_interval(
+                    secs => LEAST(:lease * POWER(2, enqueue_ledger.attempts), :lease_max)
+                ),
+                updated_at = NOW()
+            RETURNING receipt_id, task_id, attempts
+        )
+        SELECT due.id, due.uuid, ledger.task_id, ledger.attempts
+        FROM due
+        JOIN ledger ON ledger.receipt_id = due.id
+        ORDER BY due.id
         """
     )
 
     result = []
-    for row in session.execute(query):
+    for row in session.execute(
+        query,
+        {
+            "planet_id": planet_id.value,
+            "cursor": cursor.position,
+            "limit": config.retryer_batch_size,
+            "lease": config.enqueue_lease_seconds,
+            "lease_max": config.enqueue_lease_max_seconds,
+        },
+    ):
         result.append(
             {
-                "uuid": row[0],
+                "id": row[0],
+                "uuid": row[1],
+                "task_id": row[2],
+                "attempts": row[3],
             }
         )
+    # 끝까지 조회했으면 다음 실행은 처음부터 다시 조회
+    cursor.position = result[-1]["id"] if len(result) == config.retryer_batch_size else 0
+    session.commit()
 
     return result
 
 
-def send_uuid_to_worker(uuid: str) -> bool:
-    """워커에 uuid만 보내서 처리하도록 요청"""
+def release_ledger(session, receipt_id_list: List[int]):
+    """워커 전송에 실패한 영수증은 lease를 풀어서 다음 실행에 다시 보냄"""
+    if not receipt_id_list:
+        return
+    session.execute(
+        update(EnqueueLedger).where(EnqueueLedger.receipt_id.in_(receipt_id_list)).values(lease_until=func.now())
+    )
+    session.commit()
+
+
+def cleanup_ledger(session):
+    """tx가 생성된 영수증은 더 이상 다시 보내지 않으므로 ledger에서 삭제"""
+    session.execute(
+        text(
+            """
+            DELETE FROM enqueue_ledger l
+            USING receipt r
+            WHERE l.receipt_id = r.id AND r.tx_status IS NOT NULL
+            """
+        )
+    )
+    session.commit()
+
+
+def send_uuid_to_worker(uuid: str, planet_id: Optional[PlanetID] = None, task_id: Optional[str] = None) -> bool:
+    """워커에 uuid만 보내서 처리하도록 요청. planet_id가 있으면 해당 planet의 retry 큐로 전송"""
     try:
-        send_product_message = SendProductMessage(uuid=uuid)
+        send_product_message = SendProductMessage(
+            uuid=uuid,
+            lane=DeliveryLane.RETRY,
+            planet_id=planet_id.value.decode() if planet_id else None,
+            enqueued_at=time.time(),
+        )
         task = app.send_task(
             "iap.send_product",
-            args=[send_product_message.model_dump()],
-            queue="product_queue",
+            args=[send_product_message.model_dump(mode="json")],
+            queue=DeliveryLane.RETRY.queue(planet_id),
+            task_id=task_id,
         )
         logger.info(f"UUID {uuid}를 워커에 전송했습니다. task_id: {task.id}")
         return True
@@ -93,48 +201,78 @@ def send_uuid_to_worker(uuid: str) -> bool:
 
 
 def stage_transaction(planet_id: str, tx: str) -> Optional[str]:
-    """GraphQL API로 트랜잭션 제출"""
-    endpoint = config.gql_url_map.get(planet_id)
-    if not endpoint:
+    """GQL pool의 노드들로 트랜잭션 제출. 실패한 노드는 pool에 보고되어 다음 요청에서 제외됨"""
+    try:
+        planet_id = PlanetID(planet_id.encode())
+    except ValueError:
         logger.error(f"알 수 없는 planet_id: {planet_id}")
         return None
 
-    query = (
-        """
-    mutation {
-      stageTransaction(payload: "%s")
-    }
+    success, msg, tx_id = broadcast_tx(planet_id, bytes.fromhex(tx))
+    if not success:
+        logger.error(f"트랜잭션 스테이징 실패: {msg}")
+        return None
+    return tx_id
+
+
+def update_receipt_status(session, staged_list: List[Tuple[int, str]]):
+    """
+    스테이징된 영수증들의 상태를 한 번의 UPDATE로 갱신.
+    같은 Tx를 다시 스테이징한 것이므로 track_attempts는 유지하여 tracker의 backoff가 계속 늘어나도록 함
     """
-        % tx
+    if not staged_list:
+        return
+    values = ", ".join(f"(:id_{i}, :tx_id_{i})" for i in range(len(staged_list)))
+    params = {}
+    for i, (receipt_id, tx_id) in enumerate(staged_list):
+        params[f"id_{i}"] = receipt_id
+        params[f"tx_id_{i}"] = tx_id
+    query = text(
+        f"""
+        UPDATE receipt
+        SET tx_status = 'STAGED', tx_id = v.tx_id, next_check_at = NOW()
+        FROM (VALUES {values}) AS v(id, tx_id)
+        WHERE receipt.id = v.id
+        """
     )
+    session.execute(query, params)
+    session.commit()
+    logger.info(f"{len(staged_list)}개 영수증의 상태를 STAGED로 업데이트")
 
-    try:
-        response = requests.post(endpoint, json={"query": query})
-
-        if response.status_code != 200:
-            logger.error(f"API 요청 실패: {response.status_code} - {response.text}")
-            return None
 
-        data = response.json()
-        if "errors" in data:
-            logger.error(f"GraphQL 오류: {data['errors']}")
-            return None
+def restage_planet(planet_id: str, receipts: List[Dict]) -> List[Tuple[int, str]]:
+    """
+    한 planet의 영수증을 nonce 오름차순으로 Tx마다 한 번씩 스테이징.
+    Batch Tx를 공유하는 영수증들은 한 번만 스테이징하고 tx_id를 모두에 기록
+    """
+    tx_dict: Dict[str, List[Dict]] = defaultdict(list)
+    for receipt in receipts:
+        tx_dict[receipt["tx"]].append(receipt)
 
-        return data["data"]["stageTransaction"]
+    staged_list = []
+    for tx, group in tx_dict.items():
+        receipt = group[0]
+        logger.info(
+            f"영수증 {[x['id'] for x in group]} 처리 중 (planet_id: {planet_id}, 현재 상태: {receipt['tx_status']}, "
+            f"nonce: {receipt['nonce']}, 생성 시간: {receipt['created_at']})"
+        )
+        tx_id = stage_transaction(planet_id, tx)
+        if tx_id:
+            staged_list.extend((x["id"], tx_id) for x in group)
+        else:
+            logger.info(f"영수증 {[x['id'] for x in group]}에 대한 트랜잭션 스테이징 실패")
+    return staged_list
 
-    except Exception as e:
-        logger.error(f"요청 중 오류 발생: {e}")
-        return None
 
+def restage_receipts(receipts: List[Dict]) -> List[Tuple[int, str]]:
+    """planet별로 묶어서 planet 간에는 동시에, planet 안에서는 nonce 순서대로 스테이징"""
+    planet_dict = defaultdict(list)
+    for receipt in receipts:
+        planet_dict[bytes(receipt["planet_id"]).decode()].append(receipt)
 
-def update_receipt_status(session, receipt_id: int, tx_id: str):
-    """영수증 상태 업데이트"""
-    query = text(
-        "UPDATE receipt SET tx_status = 'STAGED', tx_id = :tx_id WHERE id = :receipt_id"
-    )
-    session.execute(query, {"tx_id": tx_id, "receipt_id": receipt_id})
-    session.commit()
-    logger.info(f"receipt_id={receipt_id}의 상태를 STAGED로 업데이트, tx_id={tx_id}")
+    with ThreadPoolExecutor(max_workers=max(1, min(len(planet_dict), config.retryer_planet_concurrency))) as executor:
+        future_list = [executor.submit(restage_planet, planet_id, x) for planet_id, x in planet_dict.items()]
+        return [staged for future in future_list for staged in future.result()]
 
 
 @app.task(
@@ -149,6 +287,12 @@ def update_receipt_status(session, receipt_id: int, tx_id: str):
 def retryer(self):
     """보류 중인 영수증 처리"""
 
+    with run_lock(engine, "iap.retryer", config.retryer_concurrency) as slot:
+        if slot is not None:
+            retry_receipts()
+
+
+def retry_receipts():
     sess = scoped_session(sessionmaker(bind=engine))
 
     try:
@@ -165,44 +309,30 @@ def retryer(self):
                 f"CREATED 상태: {created_count}개, STAGED 상태: {staged_count}개, INVALID 상태: {invalid_count}개"
             )
 
-            logger.info("nonce 오름차순으로 처리를 시작합니다.")
+            logger.info("planet별 nonce 오름차순으로 처리를 시작합니다.")
+            update_receipt_status(sess, restage_receipts(receipts))
 
-            for receipt in receipts:
-                receipt_id = receipt["id"]
-                tx = receipt["tx"]
-                planet_id = bytes(receipt["planet_id"]).decode()
-                tx_status = receipt["tx_status"]
-                nonce = receipt["nonce"]
-                created_at = receipt["created_at"]
+        cleanup_ledger(sess)
+        for planet_id in config.converted_gql_urls_map:
+            # 노드가 다운된 planet의 영수증은 복구될 때까지 다시 보내지 않음 (큐 shard도 일시정지 상태)
+            if gql_pool.get(planet_id) is None:
+                logger.info(f"planet {planet_id.name} 노드 다운으로 tx_status가 NULL인 영수증 전송 보류")
+                continue
 
-                logger.info(
-                    f"영수증 {receipt_id} 처리 중 (planet_id: {planet_id}, 현재 상태: {tx_status}, nonce: {nonce}, 생성 시간: {created_at})"
-                )
+            null_tx_receipts = get_null_tx_status_receipts(sess, planet_id)
+            logger.info(f"planet {planet_id.name}에서 tx_status가 NULL인 영수증 {len(null_tx_receipts)}개 발견")
+            if not null_tx_receipts:
+                continue
 
-                tx_id = stage_transaction(planet_id, tx)
-
-                if tx_id:
-                    update_receipt_status(sess, receipt_id, tx_id)
-                else:
-                    logger.info(f"영수증 {receipt_id}에 대한 트랜잭션 스테이징 실패")
-
-        null_tx_receipts = get_null_tx_status_receipts(sess)
-        logger.info(f"tx_status가 NULL인 영수증 {len(null_tx_receipts)}개 발견")
-
-        if null_tx_receipts:
-            logger.info("tx_status가 NULL인 영수증들을 워커에 전송합니다.")
-
-            success_count = 0
+            failed_list = []
             for receipt in null_tx_receipts:
-                uuid = receipt["uuid"]
-
-                logger.info(f"영수증 (uuid: {uuid} 워커 전송 중")
-
-                if send_uuid_to_worker(str(uuid)):
-                    success_count += 1
+                logger.info(f"영수증 (uuid: {receipt['uuid']}, 전송 횟수: {receipt['attempts']}) 워커 전송 중")
+                if not send_uuid_to_worker(str(receipt["uuid"]), planet_id, receipt["task_id"]):
+                    failed_list.append(receipt["id"])
+            release_ledger(sess, failed_list)
 
             logger.info(
-                f"워커 전송 완료: {success_count}/{len(null_tx_receipts)}개 성공"
+                f"워커 전송 완료: {len(null_tx_receipts) - len(failed_list)}/{len(null_tx_receipts)}개 성공"
             )
 
     finally:
@@ -1,26 +1,34 @@
 import datetime
 import json
 import logging
-from typing import Any, Dict, Optional, Tuple
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid1
 
 import structlog
-from shared._crypto import Account
+from shared._crypto import Signer, sign_tx_list
 from shared._graphql import GQL
 from shared.enums import PackageName, PlanetID, TxStatus
-from shared.lib9c.actions.grant_items import GrantItems
 from shared.lib9c.models.address import Address
 from shared.lib9c.models.fungible_asset_value import FungibleAssetValue
 from shared.models.product import Product
 from shared.models.receipt import Receipt
 from shared.schemas.message import SendProductMessage
-from shared.utils.transaction import append_signature_to_unsigned_tx, create_unsigned_tx
-from sqlalchemy import create_engine, func, select
+from shared.utils.nonce import allocate_nonce, get_initial_nonce
+from shared.utils.transaction import GrantItemsTxTemplate, append_signature_to_unsigned_tx
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import Session, joinedload, selectinload, scoped_session, sessionmaker
 
 from app.celery_app import app
 from app.config import config
+from app.gql_pool import gql_pool
+from app.lanes import get_retry_queue, observe_queue_lag, to_retry
+from app.signer import get_signer
 
 logger = structlog.get_logger(__name__)
+_stage_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stage")
 engine = create_engine(
     str(config.pg_dsn),
     pool_size=10,  # 기본 연결 수 증가
@@ -31,7 +39,109 @@ engine = create_engine(
 )
 
 
-def create_tx(sess: Session, account: Account, receipt: Receipt) -> bytes:
+def get_memo(product: Product, package_name: PackageName) -> str:
+    return json.dumps(
+        {
+            "iap": {
+                "g_sku": product.google_sku,
+                "a_sku": (
+                    product.apple_sku_k
+                    if package_name == PackageName.NINE_CHRONICLES_K
+                    else product.apple_sku
+                ),
+                # Web payment uses google_sku as the primary identifier
+                "w_sku": (
+                    product.google_sku
+                    if package_name == PackageName.NINE_CHRONICLES_WEB
+                    else None
+                ),
+            }
+        }
+    )
+
+
+def get_reward_list(product: Product, planet_id: PlanetID) -> List[FungibleAssetValue]:
+    """Fungible asset values of the product to send to an avatar"""
+    reward_list = []
+
+    multiplier = 2 if planet_id in (PlanetID.THOR, PlanetID.THOR_INTERNAL) else 1
+
+    # Process fungible items
+    logger.debug(f"Processing {len(product.fungible_item_list)} fungible items")
+    for item in product.fungible_item_list:
+        reward_list.append(
+            FungibleAssetValue.from_raw_data(
+                ticker=item.fungible_item_id, decimal_places=0, amount=item.amount * multiplier
+            )
+        )
+
+    # Process fungible assets (fav_list)
+    logger.debug(f"Processing {len(product.fav_list)} fungible assets")
+    for fav in product.fav_list:
+        reward_list.append(
+            FungibleAssetValue.from_raw_data(
+                ticker=fav.ticker,
+                decimal_places=fav.decimal_places,
+                amount=fav.amount * multiplier,
+            )
+        )
+
+    logger.debug(f"Total claim_data items: {len(reward_list)}")
+    return reward_list
+
+
+# Encoded rewards per product and planet. Key includes reward contents, so edited product gets new entry.
+_reward_cache: Dict[Tuple, bytes] = {}
+_tx_template_dict: Dict[Tuple[PlanetID, str], GrantItemsTxTemplate] = {}
+
+
+def get_encoded_rewards(product: Product, planet_id: PlanetID) -> bytes:
+    key = (
+        product.id,
+        planet_id,
+        tuple((x.fungible_item_id, x.amount) for x in product.fungible_item_list),
+        tuple((x.ticker, x.decimal_places, x.amount) for x in product.fav_list),
+    )
+    if key not in _reward_cache:
+        _reward_cache[key] = GrantItemsTxTemplate.encode_rewards(
+            [x.plain_value for x in get_reward_list(product, planet_id)]
+        )
+    return _reward_cache[key]
+
+
+def get_tx_template(planet_id: PlanetID, account: Signer) -> GrantItemsTxTemplate:
+    key = (planet_id, account.address)
+    if key not in _tx_template_dict:
+        _tx_template_dict[key] = GrantItemsTxTemplate(planet_id, account.pubkey, account.address)
+    return _tx_template_dict[key]
+
+
+def create_unsigned_grant_tx(account: Signer, receipt_list: List[Receipt], product: Product, nonce: int) -> bytes:
+    """Unsigned `GrantItems` Tx sending the same product to all receipts' avatars"""
+    receipt = receipt_list[0]
+    planet_id = PlanetID(receipt.planet_id)
+    rewards = get_encoded_rewards(product, planet_id)
+    return get_tx_template(planet_id, account).build(
+        claim_list=[(Address(x.avatar_addr).raw, rewards) for x in receipt_list],
+        memo=get_memo(product, PackageName(receipt.package_name)),
+        nonce=nonce,
+        timestamp=datetime.datetime.now(tz=datetime.timezone.utc)
+        + datetime.timedelta(days=7),
+        action_id=uuid1().bytes,
+    )
+
+
+def create_batch_tx(account: Signer, receipt_list: List[Receipt], product: Product, nonce: int) -> bytes:
+    """
+    Create one `GrantItems` Tx sending the same product to all receipts' avatars.
+    All receipts must be for the same planet and package and have different avatars.
+    """
+    unsigned_tx = create_unsigned_grant_tx(account, receipt_list, product, nonce)
+    signature = account.sign_tx(unsigned_tx)
+    return append_signature_to_unsigned_tx(unsigned_tx, signature)
+
+
+def create_tx(sess: Session, account: Signer, receipt: Receipt) -> bytes:
     if receipt.tx is not None:
         return bytes.fromhex(receipt.tx)
 
@@ -104,94 +214,92 @@ def create_tx(sess: Session, account: Account, receipt: Receipt) -> bytes:
         logger.error(error_msg)
         raise ValueError(error_msg)
 
-    package_name = PackageName(receipt.package_name)
-    avatar_address = Address(receipt.avatar_addr)
-    memo = json.dumps(
-        {
-            "iap": {
-                "g_sku": product.google_sku,
-                "a_sku": (
-                    product.apple_sku_k
-                    if package_name == PackageName.NINE_CHRONICLES_K
-                    else product.apple_sku
-                ),
-                # Web payment uses google_sku as the primary identifier
-                "w_sku": (
-                    product.google_sku
-                    if package_name == PackageName.NINE_CHRONICLES_WEB
-                    else None
-                ),
-            }
-        }
-    )
+    return create_batch_tx(account, [receipt], product, receipt.nonce)
 
-    claim_data = []
 
-    planet_id = PlanetID(receipt.planet_id)
-    multiplier = 2 if planet_id in (PlanetID.THOR, PlanetID.THOR_INTERNAL) else 1
-
-    # Process fungible items
-    logger.debug(f"Processing {len(product.fungible_item_list)} fungible items")
-    for item in product.fungible_item_list:
-        claim_data.append(
-            FungibleAssetValue.from_raw_data(
-                ticker=item.fungible_item_id, decimal_places=0, amount=item.amount * multiplier
-            )
-        )
-
-    # Process fungible assets (fav_list)
-    logger.debug(f"Processing {len(product.fav_list)} fungible assets")
-    for fav in product.fav_list:
-        claim_data.append(
-            FungibleAssetValue.from_raw_data(
-                ticker=fav.ticker,
-                decimal_places=fav.decimal_places,
-                amount=fav.amount * multiplier,
-            )
-        )
-
-    logger.debug(f"Total claim_data items: {len(claim_data)}")
-
-    action = GrantItems(
-        claim_data=[
-            {"avatarAddress": avatar_address, "fungibleAssetValues": claim_data}
-        ],
-        memo=memo,
+def is_batch_target(receipt: Receipt) -> bool:
+    """Fresh receipts without Tx are sent by `iap.batch_grant` when batching is enabled"""
+    return (
+        config.grant_batch_size > 1
+        and receipt.tx is None
+        and receipt.nonce is None
+        and receipt.created_at is not None
+        and receipt.created_at
+        >= datetime.datetime.now(tz=datetime.timezone.utc)
+        - datetime.timedelta(minutes=config.grant_batch_lookback_minutes)
     )
 
-    unsigned_tx = create_unsigned_tx(
-        planet_id=PlanetID(receipt.planet_id),
-        public_key=account.pubkey.hex(),
-        address=account.address,
-        nonce=receipt.nonce,
-        plain_value=action.plain_value,
-        timestamp=datetime.datetime.now(tz=datetime.timezone.utc)
-        + datetime.timedelta(days=7),
-    )
 
-    signature = account.sign_tx(unsigned_tx)
-    signed_tx = append_signature_to_unsigned_tx(unsigned_tx, signature)
-    return signed_tx
+def stage_on(gql: GQL, tx: bytes) -> Tuple[bool, str, Optional[str]]:
+    """Stage transaction to one endpoint and record its latency or failure"""
+    start = time.perf_counter()
+    try:
+        result = gql.stage(tx)
+    except Exception as e:
+        gql_pool.report_failure(gql, e)
+        error_msg = f"Failed to connect to node {gql.url}: {str(e)}"
+        logger.error(error_msg)
+        return False, error_msg, None
+    gql_pool.report_success(gql, time.perf_counter() - start)
+    return result
 
 
 def stage_tx(receipt: Receipt) -> Tuple[bool, str, Optional[str]]:
     """Stage transaction to the blockchain node.
+    Tx is staged to `config.stage_broadcast_count` endpoints of the planet concurrently and the first success is used.
 
     Returns:
         Tuple[bool, str, Optional[str]]: (success, message, tx_id)
         If node is down, returns (False, error_message, None)
     """
     logging.debug(f"STAGE: {config.stage} || REGION: {config.region_name}")
-    try:
-        gql = GQL(
-            config.converted_gql_url_map[receipt.planet_id], config.headless_jwt_secret
-        )
-        return gql.stage(bytes.fromhex(receipt.tx))
-    except Exception as e:
-        error_msg = f"Failed to connect to node for planet {receipt.planet_id}: {str(e)}"
+    return broadcast_tx(PlanetID(receipt.planet_id), bytes.fromhex(receipt.tx))
+
+
+def broadcast_tx(planet_id: PlanetID, tx: bytes) -> Tuple[bool, str, Optional[str]]:
+    """Stage signed Tx to `config.stage_broadcast_count` endpoints of the planet. Returns the first success."""
+    gql_list = gql_pool.get_all(planet_id)[: max(1, config.stage_broadcast_count)]
+    if not gql_list:
+        error_msg = f"Node of planet {planet_id} is unavailable"
         logger.error(error_msg)
         return False, error_msg, None
 
+    if len(gql_list) == 1:
+        return stage_on(gql_list[0], tx)
+
+    # Don't wait for slower endpoints after the first success: they finish in background and update stats.
+    future_list = [_stage_executor.submit(stage_on, gql, tx) for gql in gql_list]
+    failure = None
+    for future in as_completed(future_list):
+        result = future.result()
+        if result[0]:
+            return result
+        failure = failure or result
+    return failure
+
+
+def relock_unsent(sess: Session, receipt_list: List[Receipt]) -> List[Receipt]:
+    """
+    Locks receipts again after nonce allocation is committed and returns ones still without Tx.
+    The commit releases receipt lock as well, so another worker may have created Tx of the receipt meanwhile.
+    """
+    if not receipt_list:
+        return []
+    sess.scalars(
+        select(Receipt)
+        .where(Receipt.id.in_([x.id for x in receipt_list]))
+        .order_by(Receipt.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).all()
+    unsent_list = []
+    for receipt in receipt_list:
+        if receipt.tx or receipt.tx_id:
+            logger.warning(f"{receipt.uuid} got Tx from another worker with nonce {receipt.nonce}, skip")
+        else:
+            unsent_list.append(receipt)
+    return unsent_list
+
 
 def handle(message: SendProductMessage):
     """
@@ -206,7 +314,8 @@ def handle(message: SendProductMessage):
     sess = scoped_session(sessionmaker(bind=engine))
 
     try:
-        receipt = sess.scalar(select(Receipt).where(Receipt.uuid == message.uuid))
+        # Lock the receipt not to create Tx together with batch grant
+        receipt = sess.scalar(select(Receipt).where(Receipt.uuid == message.uuid).with_for_update())
         logger.debug(f"Receipt lookup result for UUID {message.uuid}: {receipt}")
 
         if not receipt:
@@ -223,49 +332,12 @@ def handle(message: SendProductMessage):
             logger.info(f"{message.uuid} is already sent with Tx : {receipt.tx_id}")
             return
 
-        account = Account(config.kms_key_id)
-
-        # 지연 초기화를 지원하는 커스텀 딕셔너리 클래스
-        class LazyGQLDict(dict):
-            """지연 초기화를 지원하는 GQL 딕셔너리"""
-            def __init__(self, gql_url_map, jwt_secret):
-                super().__init__()
-                self._gql_url_map = gql_url_map
-                self._jwt_secret = jwt_secret
-                self._failed_planets = set()  # 초기화 실패한 planet 추적
+        if is_batch_target(receipt):
+            logger.info(f"{message.uuid} is left to batch grant")
+            return results
 
-            def __missing__(self, key: PlanetID):
-                """키가 없을 때 자동으로 GQL 객체 생성 (지연 초기화)"""
-                if key in self._failed_planets:
-                    # 이미 실패한 planet은 None 반환
-                    return None
+        account = get_signer()
 
-                try:
-                    gql = GQL(
-                        self._gql_url_map[key],
-                        self._jwt_secret
-                    )
-                    self[key] = gql
-                    logger.info(f"GQL client created for planet {key}")
-                    return gql
-                except Exception as e:
-                    logger.error(f"Failed to create GQL client for planet {key}: {e}")
-                    self._failed_planets.add(key)
-                    return None
-
-        # 지연 초기화를 지원하는 gql_dict 생성
-        gql_dict = LazyGQLDict(config.converted_gql_url_map, config.headless_jwt_secret)
-
-        db_nonce_dict = {
-            x.planet_id: x.nonce
-            for x in sess.execute(
-                select(
-                    Receipt.planet_id.label("planet_id"),
-                    func.max(Receipt.nonce).label("nonce"),
-                ).group_by(Receipt.planet_id)
-            ).all()
-        }
-        nonce_dict = {}
         target_list = []
 
         logger.debug(f"UUID : {message.uuid}")
@@ -285,8 +357,8 @@ def handle(message: SendProductMessage):
             # Fresh receipt - 노드 연결 확인 필요
             planet_id = PlanetID(receipt.planet_id)
 
-            # gql_dict에 접근하면 자동으로 지연 초기화됨
-            gql = gql_dict[planet_id]
+            # Process wide client. None if the node is down.
+            gql = gql_pool.get(planet_id)
 
             if gql is None:
                 # 노드가 다운되어 있으면 해당 receipt는 처리하지 않음
@@ -305,26 +377,25 @@ def handle(message: SendProductMessage):
                 return results
 
             # 노드가 정상이면 nonce 조회 및 트랜잭션 생성
-            receipt.tx_status = TxStatus.CREATED
             if receipt.nonce is None:
-                # nonce_dict에 값이 있으면 사용, 없으면 노드에서 가져오기
-                # 노드에서 가져올 때 실패하면 해당 receipt는 처리하지 않음
+                # 노드에서 nonce를 가져와야 하는데 실패하면 해당 receipt는 처리하지 않음
                 def get_nonce_from_node():
-                    """노드에서 nonce를 가져오는 헬퍼 함수"""
-                    nonce = gql_dict[receipt.planet_id].get_next_nonce(account.address)
+                    """노드에서 nonce를 가져오는 헬퍼 함수. Allocator row가 없을 때만 호출됨"""
+                    try:
+                        nonce = gql.get_next_nonce(account.address)
+                    except Exception as e:
+                        gql_pool.report_failure(gql, e)
+                        raise
                     if nonce == -1:
                         raise ValueError(f"Failed to get nonce from node for planet {receipt.planet_id}")
-                    return nonce
+                    return get_initial_nonce(sess, planet_id, nonce)
 
                 try:
-                    receipt.nonce = max(  # max nonce of
-                        nonce_dict.get(  # current handling nonce (or nonce in blockchain)
-                            receipt.planet_id,
-                            get_nonce_from_node(),  # 노드에서 가져온 nonce
-                        ),
-                        db_nonce_dict.get(receipt.planet_id, 0) + 1,  # DB stored nonce
-                    )
-                except (ValueError, Exception) as e:
+                    receipt.nonce = allocate_nonce(sess, planet_id, account.address, get_nonce_from_node)
+                    # Save allocated nonce with the receipt first to release allocator lock before signing
+                    sess.commit()
+                except Exception as e:
+                    sess.rollback()
                     # 노드에서 nonce를 가져오지 못함
                     error_msg = f"Failed to get nonce from node for planet {receipt.planet_id}, skipping receipt {receipt.uuid}: {str(e)}"
                     logger.error(error_msg)
@@ -340,10 +411,14 @@ def handle(message: SendProductMessage):
                     results.append(result)
                     return results
 
+                if not relock_unsent(sess, [receipt]):
+                    return results
+
+            receipt.tx_status = TxStatus.CREATED
             receipt.tx = create_tx(sess, account, receipt).hex()
-            nonce_dict[receipt.planet_id] = receipt.nonce + 1
             target_list.append((receipt, message.uuid))
             logger.info(f"{receipt.uuid}: Tx created with nonce: {receipt.nonce}")
+            logger.debug("Sign latency", **account.sign_latency.snapshot())
             sess.add(receipt)
         sess.commit()
 
@@ -387,11 +462,165 @@ def handle(message: SendProductMessage):
     return results
 
 
+def handle_batch(message_list: List[SendProductMessage]) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """
+    Process several `iap.send_product` messages as a group.
+    Same as `handle`, but receipts are fetched by one query, nonce is allocated once per planet
+    and created Tx are saved with one commit.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Set[str]]: (results, uuid set of messages to retry)
+    """
+    results = []
+    retry_set = set()
+    sess = scoped_session(sessionmaker(bind=engine))
+
+    def add_result(uuid: str, success: bool, msg: str, receipt: Optional[Receipt] = None):
+        result = {
+            "sqs_message_id": uuid,
+            "success": success,
+            "message": msg,
+            "uuid": uuid,
+            "tx_id": str(receipt.tx_id) if receipt else None,
+            "nonce": str(receipt.nonce) if receipt else None,
+            "order_id": str(receipt.order_id) if receipt else None,
+        }
+        results.append(result)
+        if success:
+            logger.info(json.dumps(result))
+        else:
+            logger.error(json.dumps(result))
+
+    try:
+        # Redelivered message can be in the same batch: treat each receipt once
+        uuid_list = list(dict.fromkeys(str(x.uuid) for x in message_list))
+        receipt_dict = {
+            str(x.uuid): x
+            for x in sess.scalars(
+                select(Receipt).where(Receipt.uuid.in_(uuid_list)).order_by(Receipt.id).with_for_update()
+            )
+        }
+
+        target_list = []
+        fresh_dict: Dict[PlanetID, List[Receipt]] = defaultdict(list)
+        for uuid in uuid_list:
+            receipt = receipt_dict.get(uuid)
+            if not receipt:
+                add_result(uuid, False, f"Receipt with UUID {uuid} not found in database")
+            elif receipt.tx_status == TxStatus.SUCCESS:
+                logger.info(f"{uuid} is already sent with Tx : {receipt.tx_id}")
+            elif is_batch_target(receipt):
+                logger.info(f"{uuid} is left to batch grant")
+            elif receipt.tx_id:
+                logger.warning(f"{uuid} is already treated with Tx : {receipt.tx_id}")
+            elif receipt.tx:
+                target_list.append(receipt)
+            else:
+                fresh_dict[PlanetID(receipt.planet_id)].append(receipt)
+
+        if fresh_dict:
+            account = get_signer()
+            fresh_list = []
+            for planet_id, receipt_list in fresh_dict.items():
+                gql = gql_pool.get(planet_id)
+                if gql is None:
+                    for receipt in receipt_list:
+                        add_result(str(receipt.uuid), False, f"Planet {planet_id} node is down, skipping receipt {receipt.uuid}")
+                    continue
+
+                # Receipts already having nonce from previous try reuse it
+                new_list = [x for x in receipt_list if x.nonce is None]
+                if new_list:
+                    def get_nonce_from_node():
+                        try:
+                            nonce = gql.get_next_nonce(account.address)
+                        except Exception as e:
+                            gql_pool.report_failure(gql, e)
+                            raise
+                        if nonce == -1:
+                            raise ValueError(f"Failed to get nonce from node for planet {planet_id}")
+                        return get_initial_nonce(sess, planet_id, nonce)
+
+                    try:
+                        with sess.begin_nested():
+                            nonce = allocate_nonce(
+                                sess, planet_id, account.address, get_nonce_from_node, count=len(new_list)
+                            )
+                    except Exception as e:
+                        for receipt in receipt_list:
+                            add_result(
+                                str(receipt.uuid),
+                                False,
+                                f"Failed to get nonce from node for planet {planet_id}, skipping receipt {receipt.uuid}: {str(e)}",
+                            )
+                        continue
+                    for i, receipt in enumerate(new_list):
+                        receipt.nonce = nonce + i
+                fresh_list.extend(receipt_list)
+            # Save allocated nonce with the receipts first to release allocator lock before signing
+            sess.commit()
+            fresh_list = relock_unsent(sess, fresh_list)
+
+            product_dict = {
+                x.id: x
+                for x in sess.scalars(
+                    select(Product)
+                    .options(selectinload(Product.fav_list))
+                    .options(selectinload(Product.fungible_item_list))
+                    .where(Product.id.in_({x.product_id for x in fresh_list}))
+                )
+            }
+            unsigned_list = []
+            for receipt in fresh_list:
+                try:
+                    product = product_dict.get(receipt.product_id)
+                    if product is None:
+                        raise ValueError(
+                            f"Product not found for product_id: {receipt.product_id} in receipt: {receipt.uuid}"
+                        )
+                    unsigned_list.append((receipt, create_unsigned_grant_tx(account, [receipt], product, receipt.nonce)))
+                except Exception as e:
+                    logger.error(f"Failed to create tx for {receipt.uuid}: {e}")
+                    retry_set.add(str(receipt.uuid))
+
+            # Sign concurrently. Failed receipt keeps its nonce and signs again on retry, so no nonce gap is left.
+            signature_list = sign_tx_list(account, [x[1] for x in unsigned_list], max_workers=config.sign_concurrency)
+            for (receipt, unsigned_tx), signature in zip(unsigned_list, signature_list):
+                if isinstance(signature, Exception):
+                    logger.error(f"Failed to sign tx for {receipt.uuid}: {signature}")
+                    retry_set.add(str(receipt.uuid))
+                    continue
+                receipt.tx = append_signature_to_unsigned_tx(unsigned_tx, signature).hex()
+                receipt.tx_status = TxStatus.CREATED
+                target_list.append(receipt)
+                logger.info(f"{receipt.uuid}: Tx created with nonce: {receipt.nonce}")
+            sess.commit()
+
+        # Stage strictly in nonce order per planet
+        target_list.sort(key=lambda x: (x.planet_id, x.nonce))
+        # Stage created tx
+        logger.info(f"Stage {len(target_list)} receipts")
+        for receipt in target_list:
+            success, msg, tx_id = stage_tx(receipt)
+            if success:
+                receipt.tx_id = tx_id
+                receipt.tx_status = TxStatus.STAGED
+            else:
+                # Stage 실패 시 (노드 다운 등) 상태는 CREATED로 유지하여 나중에 재시도 가능
+                logger.warning(f"Failed to stage tx for {receipt.uuid}: {msg}")
+            add_result(str(receipt.uuid), success, msg, receipt)
+        sess.commit()
+    finally:
+        sess.close()
+
+    return results, retry_set
+
+
 @app.task(
     name="iap.send_product",
     bind=True,
     max_retries=3,
-    default_retry_delay=30,
+    default_retry_delay=config.send_product_retry_delay,
     acks_late=True,
     priority=0,
     queue="product_queue",
@@ -410,8 +639,9 @@ def send_product(self, message: Dict[str, Any]) -> str:
     try:
         logger.info("Send product", message=message)
         send_product_message = SendProductMessage.model_validate(message)
+        observe_queue_lag(send_product_message)
         handle(send_product_message)
         return "Send product successfully"
     except Exception as exc:
         logger.error("Error processing send product", message=message, exc_info=exc)
-        self.retry(exc=exc)
+        self.retry(args=[to_retry(message)], exc=exc, countdown=0, queue=get_retry_queue(message))
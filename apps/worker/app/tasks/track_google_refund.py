@@ -1,17 +1,40 @@
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import IntEnum
-from typing import Optional
+from typing import Dict, List, Optional
 
 import requests
 import structlog
+from shared.enums import ReceiptStatus, Store
+from shared.models.receipt import Receipt
+from shared.schemas.notification import RefundSchema
 from shared.utils.google import get_google_client
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app.celery_app import app
 from app.config import config
 
 logger = structlog.get_logger(__name__)
 
+engine = create_engine(
+    config.pg_dsn,
+    pool_size=10,  # 기본 연결 수 증가
+    max_overflow=20,  # 오버플로우 연결 수 증가
+    pool_timeout=60,  # 연결 타임아웃 증가
+    pool_recycle=3600,  # 연결 재사용 시간 (1시간)
+    pool_pre_ping=True  # 연결 상태 확인
+)
+
+# Refund from store notification does not tell whether the receipt is from sandbox or not.
+REFUND_STORE_MAP = {
+    Store.GOOGLE: (Store.GOOGLE, Store.GOOGLE_TEST),
+    Store.GOOGLE_TEST: (Store.GOOGLE, Store.GOOGLE_TEST),
+    Store.APPLE: (Store.APPLE, Store.APPLE_TEST),
+    Store.APPLE_TEST: (Store.APPLE, Store.APPLE_TEST),
+}
+
 
 class VoidReason(IntEnum):
     Other = 0
@@ -54,6 +77,17 @@ class RefundData:
         self.voidedSource = VoidSource(self.voidedSource)
         self.voidedReason = VoidReason(self.voidedReason)
 
+    def to_refund(self, package_name: str) -> RefundSchema:
+        return RefundSchema(
+            store=Store.GOOGLE,
+            packageName=package_name,
+            orderId=self.orderId,
+            purchasedAt=self.purchaseTime,
+            refundedAt=self.voidedTime,
+            source=self.voidedSource.name,
+            reason=self.voidedReason.name,
+        )
+
 
 def send_slack_alert(message: str) -> None:
     if not config.iap_alert_webhook_url:
@@ -69,19 +103,97 @@ def send_slack_alert(message: str) -> None:
         logger.error(f"Slack 알림 전송 실패: {e}")
 
 
+class RefundAlertCoalescer:
+    """
+    Collects refund alerts and sends them as a few Slack messages instead of one message per refund.
+    """
+
+    def __init__(self, title: str, chunk_size: int = 20):
+        self.title = title
+        self.chunk_size = chunk_size
+        self._alerts: List[str] = []
+
+    def add(self, refund: RefundSchema, uuid: str):
+        self._alerts.append(
+            f"주문 ID: {refund.orderId} ({refund.store.name} :: {refund.packageName})\n"
+            f"영수증: {uuid}\n"
+            f"구매 시간: {refund.purchasedAt.isoformat() if refund.purchasedAt else '-'}\n"
+            f"환불 시간: {refund.refundedAt.isoformat()}\n"
+            f"환불 소스: {refund.source or '-'}\n"
+            f"환불 사유: {refund.reason or '-'}"
+        )
+
+    def flush(self):
+        for i in range(0, len(self._alerts), self.chunk_size):
+            chunk = self._alerts[i:i + self.chunk_size]
+            send_slack_alert(f"{self.title} ({len(chunk)}건)\n\n" + "\n\n".join(chunk))
+        self._alerts = []
+
+
+def apply_refunds(sess, refund_list: List[RefundSchema]) -> Dict[str, str]:
+    """
+    Mark receipts of refunded orders as `REFUNDED_BY_BUYER` with one bulk update per store.
+    Only `VALID` receipts are updated: already refunded, invalid or admin-refunded receipts keep their status,
+    so the same refund can be applied several times.
+
+    :return: Dict of order_id to receipt uuid which is newly marked as refunded.
+    """
+    order_dict = defaultdict(list)
+    for refund in refund_list:
+        order_dict[REFUND_STORE_MAP[refund.store]].append(refund.orderId)
+
+    updated = {}
+    for store_list, order_id_list in order_dict.items():
+        result = sess.execute(
+            update(Receipt)
+            .where(
+                Receipt.store.in_(store_list),
+                Receipt.order_id.in_(order_id_list),
+                Receipt.status == ReceiptStatus.VALID,
+            )
+            .values(status=ReceiptStatus.REFUNDED_BY_BUYER)
+            .returning(Receipt.order_id, Receipt.uuid)
+        )
+        updated.update({order_id: str(uuid) for order_id, uuid in result.all()})
+    sess.commit()
+    return updated
+
+
+def process_refunds(sess, refund_list: List[RefundSchema]) -> int:
+    if not refund_list:
+        return 0
+
+    updated = apply_refunds(sess, refund_list)
+    coalescer = RefundAlertCoalescer("🚨 환불 알림")
+    for refund in refund_list:
+        if refund.orderId in updated:
+            coalescer.add(refund, updated[refund.orderId])
+        else:
+            logger.info(f"Refund {refund.orderId} is already applied or has no matching receipt")
+    coalescer.flush()
+
+    logger.info(f"{len(updated)}/{len(refund_list)} receipts are marked as refunded")
+    return len(updated)
+
+
 def handle(event, context):
+    """
+    Reconciliation sweep for refunds.
+    Refunds are applied by store notifications in near real-time, so this only catches missed notifications.
+    """
     client = get_google_client(config.google_credential)
     current_time = datetime.now(timezone.utc)
-    one_hour_ago = current_time - timedelta(hours=1)
+    start_time = current_time - timedelta(hours=config.google_refund_sweep_hours)
 
-    start_time_ms = int(one_hour_ago.timestamp() * 1000)
+    start_time_ms = int(start_time.timestamp() * 1000)
     end_time_ms = int(current_time.timestamp() * 1000)
 
     logger.info(f"환불 데이터 확인 시작 - {current_time.isoformat()}")
     logger.info(
-        f"1시간 이내 환불 건만 조회 (시작: {one_hour_ago.isoformat()}, 종료: {current_time.isoformat()})"
+        f"{config.google_refund_sweep_hours}시간 이내 환불 건만 조회 (시작: {start_time.isoformat()}, 종료: {current_time.isoformat()})"
     )
 
+    refund_list = []
     for package_name, data in config.google_package_dict.items():
         logger.info(f"{package_name.value} 패키지의 환불 데이터를 확인합니다.")
 
@@ -96,35 +208,24 @@ def handle(event, context):
 
         if not voided_list.get("voidedPurchases"):
             logger.info(
-                f"{package_name.value} 패키지에서 최근 1시간 내 환불 건이 없습니다."
+                f"{package_name.value} 패키지에서 최근 {config.google_refund_sweep_hours}시간 내 환불 건이 없습니다."
             )
             continue
 
         voided_purchases = [RefundData(**x) for x in voided_list["voidedPurchases"]]
-
         logger.info(
-            f"{package_name.value} 패키지에서 최근 1시간 내 {len(voided_purchases)}개 환불 발견"
+            f"{package_name.value} 패키지에서 최근 {config.google_refund_sweep_hours}시간 내 {len(voided_purchases)}개 환불 발견"
         )
+        refund_list.extend(x.to_refund(data) for x in voided_purchases)
 
-        for void in voided_purchases:
-            message = (
-                f"🚨 Google Play 환불 알림\n"
-                f"패키지: {package_name.value}\n"
-                f"주문 ID: {void.orderId}\n"
-                f"구매 시간: {void.purchaseTime.isoformat()}\n"
-                f"환불 시간: {void.voidedTime.isoformat()}\n"
-                f"환불 소스: {void.voidedSource.name}\n"
-                f"환불 사유: {void.voidedReason.name}"
-            )
-
-            send_slack_alert(message)
-            logger.info(
-                f"환불 알림 전송: {void.orderId} (환불 시간: {void.voidedTime.isoformat()})"
-            )
+    if not refund_list:
+        return
 
-        logger.info(
-            f"{package_name.value} 패키지에서 {len(voided_purchases)}개의 최근 환불 데이터를 처리했습니다."
-        )
+    sess = scoped_session(sessionmaker(bind=engine))
+    try:
+        process_refunds(sess, refund_list)
+    finally:
+        sess.close()
 
 
 @app.task(
@@ -140,5 +241,24 @@ def track_google_refund(self):
     handle(self, None)
 
 
+@app.task(
+    name="iap.apply_refunds",
+    bind=True,
+    max_retries=10,
+    default_retry_delay=60,
+    acks_late=True,
+    retry_backoff=True,
+    queue="background_job_queue",
+)
+def apply_refunds_task(self, message: dict):
+    """Applies refunds pushed from store notifications. `message` has list of `RefundSchema` as `refunds`."""
+    refund_list = [RefundSchema(**x) for x in message["refunds"]]
+    sess = scoped_session(sessionmaker(bind=engine))
+    try:
+        process_refunds(sess, refund_list)
+    finally:
+        sess.close()
+
+
 if __name__ == "__main__":
     handle(None, None)
@@ -1,18 +1,20 @@
+import datetime
 import json
 import time
 from collections import defaultdict
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import structlog
 from gql.dsl import DSLQuery, dsl_gql
-from shared._graphql import GQL
-from shared.enums import ReceiptStatus, Store, TxStatus
+from shared.enums import PlanetID, ReceiptStatus, Store, TxStatus
 from shared.models.receipt import Receipt
-from sqlalchemy import create_engine, select
+from sqlalchemy import create_engine, or_, select
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app.celery_app import app
 from app.config import config
+from app.gql_pool import gql_pool
+from app.run_lock import run_lock
 
 logger = structlog.get_logger(__name__)
 
@@ -27,54 +29,141 @@ engine = create_engine(
     pool_pre_ping=True  # 연결 상태 확인
 )
 
-# GQL 클라이언트 캐시
-_gql_clients: Dict[str, GQL] = {}
 
-
-def get_gql_client(url: str) -> GQL:
-    """URL별로 캐싱된 GQL 클라이언트를 반환합니다."""
-    if url not in _gql_clients:
-        _gql_clients[url] = GQL(url, config.headless_jwt_secret)
-    return _gql_clients[url]
-
-
-def process(url: str, tx_id: str) -> Tuple[str, Optional[TxStatus], Optional[str]]:
-    client = GQL(url, config.headless_jwt_secret)
-    query_start = time.time()
+def parse_tx_result(tx_result: Optional[Dict[str, Any]]) -> Tuple[Optional[TxStatus], Optional[str]]:
+    if not tx_result:
+        return None, None
+    msg = json.dumps(tx_result.get("exceptionNames"))
+    try:
+        return TxStatus[tx_result["txStatus"]], msg
+    except KeyError:
+        return None, msg
+
+
+def process(planet_id: PlanetID, tx_id_list: List[str]) -> Dict[str, Tuple[Optional[TxStatus], Optional[str]]]:
+    """
+    Fetches status of all Tx in one aliased `transactionResult` query.
+    Tx without status is left out of the result.
+    """
+    client = gql_pool.get(planet_id)
+    if client is None:
+        logger.error(f"Node of planet {planet_id} is unavailable, skip tracking {len(tx_id_list)} transactions")
+        return {}
+
+    tx_result_type = client.ds.TxResultType
     query = dsl_gql(
         DSLQuery(
             client.ds.StandaloneQuery.transaction.select(
-                client.ds.TransactionHeadlessQuery.transactionResult.args(
-                    txId=tx_id
-                ).select(
-                    client.ds.TxResultType.txStatus,
-                    client.ds.TxResultType.blockIndex,
-                    client.ds.TxResultType.blockHash,
-                    client.ds.TxResultType.exceptionNames,
-                )
+                *[
+                    client.ds.TransactionHeadlessQuery.transactionResult.args(txId=tx_id)
+                    .alias(f"tx{i}")
+                    .select(
+                        tx_result_type.txStatus,
+                        tx_result_type.blockIndex,
+                        tx_result_type.blockHash,
+                        tx_result_type.exceptionNames,
+                    )
+                    for i, tx_id in enumerate(tx_id_list)
+                ]
             )
         )
     )
 
-    execute_start = time.time()
-    resp = client.execute(query)
+    start = time.time()
+    try:
+        resp = client.execute(query)
+    except Exception as e:
+        gql_pool.report_failure(client, e)
+        logger.error(f"GQL failed to get transaction status of planet {planet_id}: {e}")
+        return {}
+    gql_pool.report_success(client, time.time() - start)
 
     if "errors" in resp:
         logger.error(f"GQL failed to get transaction status: {resp['errors']}")
-        return tx_id, None, json.dumps(resp["errors"])
-
-    try:
-        return (
-            tx_id,
-            TxStatus[resp["transaction"]["transactionResult"]["txStatus"]],
-            json.dumps(resp["transaction"]["transactionResult"]["exceptionNames"]),
+        msg = json.dumps(resp["errors"])
+        return {tx_id: (None, msg) for tx_id in tx_id_list}
+
+    result = {}
+    for i, tx_id in enumerate(tx_id_list):
+        result[tx_id] = parse_tx_result(resp["transaction"].get(f"tx{i}"))
+    return result
+
+
+def schedule_next_check(receipt: Receipt, now: datetime.datetime):
+    """Backs off next check of unfinished Tx exponentially, so stuck Tx does not take the place of fresh ones"""
+    delay = min(config.track_tx_backoff_base * 2 ** receipt.track_attempts, config.track_tx_backoff_max)
+    receipt.track_attempts += 1
+    receipt.next_check_at = now + datetime.timedelta(seconds=delay)
+
+
+def claim_due(sess, now: datetime.datetime) -> List[Receipt]:
+    """
+    Leases due receipts by pushing `next_check_at` forward for `work_lease_seconds`.
+    Rows claimed by other trackers are skipped, and lease of a crashed tracker expires by itself.
+    """
+    query = (
+        select(Receipt)
+        .where(
+            Receipt.status == ReceiptStatus.VALID,
+            Receipt.tx_status.in_((TxStatus.STAGED, TxStatus.INVALID)),
+            Receipt.next_check_at <= now,
         )
-    except:
-        return (
-            tx_id,
-            None,
-            json.dumps(resp["transaction"]["transactionResult"]["exceptionNames"]),
+        .order_by(Receipt.next_check_at)
+        .limit(LIMIT)
+        .with_for_update(skip_locked=True)
+    )
+    if config.track_tx_mode == "block":
+        # Staged Tx are found by `follow_blocks`. Poll only ones not found for a while.
+        query = query.where(
+            or_(
+                Receipt.tx_status != TxStatus.STAGED,
+                Receipt.created_at < now - datetime.timedelta(minutes=config.block_follow_fallback_minutes),
+            )
         )
+    receipt_list = sess.scalars(query).fetchall()
+    for receipt in receipt_list:
+        receipt.next_check_at = now + datetime.timedelta(seconds=config.work_lease_seconds)
+    sess.commit()
+    return receipt_list
+
+
+def track_batch(sess) -> int:
+    """Tracks status of due Tx. Returns the number of tracked receipts."""
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    receipt_list = claim_due(sess, now)
+
+    # One query per planet. Batch Tx is shared by several receipts.
+    planet_dict = defaultdict(set)
+    for receipt in receipt_list:
+        planet_dict[PlanetID(receipt.planet_id)].add(receipt.tx_id)
+    status_dict = {}
+    for planet_id, tx_id_set in planet_dict.items():
+        status_dict.update(process(planet_id, sorted(tx_id_set)))
+
+    result = defaultdict(list)
+    for receipt in receipt_list:
+        tx_status, msg = status_dict.get(receipt.tx_id, (None, None))
+        if tx_status is not None:
+            result[tx_status.name].append(receipt.tx_id)
+            receipt.tx_status = tx_status
+        if msg:
+            receipt.msg = "\n".join([receipt.msg or "", msg])
+        if receipt.tx_status in (TxStatus.STAGED, TxStatus.INVALID):
+            schedule_next_check(receipt, now)
+        sess.add(receipt)
+
+    sess.commit()
+
+    logger.info(f"{len(receipt_list)} transactions are found to track status")
+    for status, tx_list in result.items():
+        if status == TxStatus.STAGED.name:
+            logger.info(f"{len(tx_list)} transactions are still staged.")
+        else:
+            logger.info(f"{len(tx_list)} transactions are changed to {status}")
+    untracked = len(receipt_list) - sum(len(x) for x in result.values())
+    if untracked:
+        logger.error(f"{untracked} transactions are not able to track.")
+    return len(receipt_list)
 
 
 @app.task(
@@ -87,50 +176,23 @@ def process(url: str, tx_id: str) -> Tuple[str, Optional[TxStatus], Optional[str
     queue="background_job_queue",
 )
 def track_tx(self) -> str:
-    logger.info("Tracking unfinished transactions")
-
-    db_start = time.time()
-    sess = scoped_session(sessionmaker(bind=engine))
-
-    try:
-        query_start = time.time()
-        receipt_list = sess.scalars(
-            select(Receipt)
-            .where(
-                Receipt.status == ReceiptStatus.VALID,
-                Receipt.tx_status.in_((TxStatus.STAGED, TxStatus.INVALID)),
-            )
-            .order_by(Receipt.id)
-            .limit(LIMIT)
-        ).fetchall()
-
-        result = defaultdict(list)
-        for receipt in receipt_list:
-            tx_id, tx_status, msg = process(
-                config.converted_gql_url_map[receipt.planet_id], receipt.tx_id
-            )
-            if tx_status is not None:
-                result[tx_status.name].append(tx_id)
-                receipt.tx_status = tx_status
-            if msg:
-                receipt.msg = "\n".join([receipt.msg or "", msg])
-            sess.add(receipt)
-
-        commit_start = time.time()
-        sess.commit()
-
-        logger.info(f"{len(receipt_list)} transactions are found to track status")
-        for status, tx_list in result.items():
-            if status is None:
-                logger.error(f"{len(tx_list)} transactions are not able to track.")
-                for tx in tx_list:
-                    logger.error(tx)
-            elif status == TxStatus.STAGED:
-                logger.info(f"{len(tx_list)} transactions are still staged.")
-            else:
-                logger.info(f"{len(tx_list)} transactions are changed to {status}")
-
-    finally:
-        if sess is not None:
-            sess.close()
-            logger.debug("track_tx session closed successfully")
+    with run_lock(engine, "iap.track_tx", config.track_tx_concurrency) as slot:
+        if slot is None:
+            return "All tracking slots are busy, skipped"
+        logger.info("Tracking unfinished transactions", slot=slot)
+        # Claimed receipts are used after lease commit: do not reload them
+        sess = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+        tracked = 0
+        try:
+            # Keep tracking while due Tx are left
+            for _ in range(config.track_tx_max_batches):
+                count = track_batch(sess)
+                tracked += count
+                if count < LIMIT:
+                    break
+        finally:
+            if sess is not None:
+                sess.close()
+                logger.debug("track_tx session closed successfully")
+        return f"{tracked} receipts are tracked"
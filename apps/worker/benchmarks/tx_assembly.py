@@ -0,0 +1,92 @@
+"""
+Benchmark of unsigned `GrantItems` Tx assembly and signature append. Signing itself is excluded.
+
+    cd apps/worker
+    WORKER_KMS_KEY_ID=x PYTHONPATH=.:../shared python -m benchmarks.tx_assembly
+"""
+import datetime
+import os
+import timeit
+from decimal import Decimal
+from types import SimpleNamespace
+
+import bencodex
+from shared.enums import PackageName, PlanetID
+from shared.lib9c.actions.grant_items import GrantItems
+from shared.lib9c.models.address import Address
+from shared.lib9c.models.fungible_asset_value import FungibleAssetValue
+from shared.utils.transaction import append_signature_to_unsigned_tx, create_unsigned_tx
+
+from app.tasks.send_product_task import create_unsigned_grant_tx, get_memo
+
+NUMBER = 2000
+
+account = SimpleNamespace(pubkey=b"\x04" + os.urandom(64), address="0x" + os.urandom(20).hex())
+product = SimpleNamespace(
+    id=1,
+    google_sku="g_pkg_benchmark",
+    apple_sku="a_pkg_benchmark",
+    apple_sku_k="a_pkg_benchmark_k",
+    fungible_item_list=[
+        SimpleNamespace(fungible_item_id=os.urandom(32).hex(), amount=10),
+        SimpleNamespace(fungible_item_id="Item_NT_500000", amount=3),
+    ],
+    fav_list=[
+        SimpleNamespace(ticker="CRYSTAL", decimal_places=18, amount=Decimal("100000")),
+        SimpleNamespace(ticker="FAV__RUNESTONE_GOLDENLEAF", decimal_places=0, amount=Decimal("5")),
+    ],
+)
+receipt = SimpleNamespace(
+    avatar_addr="0x" + os.urandom(20).hex(),
+    planet_id=PlanetID.ODIN.value,
+    package_name=PackageName.NINE_CHRONICLES_M.value,
+)
+signature = os.urandom(71)
+
+
+def previous_path() -> bytes:
+    """`create_tx` before template: action objects, two full `dumps` and `loads` + `dumps` for the signature"""
+    claim_data = [
+        FungibleAssetValue.from_raw_data(ticker=x.fungible_item_id, decimal_places=0, amount=x.amount)
+        for x in product.fungible_item_list
+    ] + [
+        FungibleAssetValue.from_raw_data(ticker=x.ticker, decimal_places=x.decimal_places, amount=x.amount)
+        for x in product.fav_list
+    ]
+    action = GrantItems(
+        claim_data=[{"avatarAddress": Address(receipt.avatar_addr), "fungibleAssetValues": claim_data}],
+        memo=get_memo(product, PackageName(receipt.package_name)),
+    )
+    unsigned_tx = create_unsigned_tx(
+        planet_id=PlanetID(receipt.planet_id),
+        public_key=account.pubkey.hex(),
+        address=account.address,
+        nonce=1,
+        plain_value=action.plain_value,
+        timestamp=datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(days=7),
+    )
+    decoded = bencodex.loads(unsigned_tx)
+    decoded[b"S"] = signature
+    return bencodex.dumps(decoded)
+
+
+def template_path() -> bytes:
+    unsigned_tx = create_unsigned_grant_tx(account, [receipt], product, 1)
+    return append_signature_to_unsigned_tx(unsigned_tx, signature)
+
+
+def main():
+    # Both paths must produce the same Tx except action id and timestamp
+    previous, template = bencodex.loads(previous_path()), bencodex.loads(template_path())
+    assert previous[b"a"][0]["values"]["cd"] == template[b"a"][0]["values"]["cd"]
+    assert previous[b"S"] == template[b"S"]
+
+    result = {}
+    for name, fn in (("previous", previous_path), ("template", template_path)):
+        result[name] = min(timeit.repeat(fn, number=NUMBER, repeat=5)) / NUMBER
+        print(f"{name:>8}: {result[name] * 1_000_000:8.1f} us/tx")
+    print(f" speedup: {result['previous'] / result['template']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Throughput of product worker runtimes with local stand-ins of DB, KMS and node.
+
+Prefork model is emulated by processes handling one message at a time (celery `-c` with `prefetch=1`).
+Blocking steps sleep for the typical latency, so the result shows how much waiting is overlapped.
+
+    cd apps/worker
+    WORKER_KMS_KEY_ID=x PYTHONPATH=.:../shared python -m benchmarks.worker_runtime
+"""
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from shared.enums import PlanetID
+
+from app.async_worker import AsyncProductWorker, Reservation
+
+MESSAGES = 400
+PREFORK_CONCURRENCY = 4
+ASYNC_CONCURRENCY = 32
+
+# Seconds
+DB_LATENCY = 0.005
+KMS_LATENCY = 0.030
+STAGE_LATENCY = 0.020
+
+PLANETS = [PlanetID.ODIN, PlanetID.HEIMDALL]
+
+
+class StandInOps:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nonce = {planet_id: itertools.count() for planet_id in PLANETS}
+        self.staged = {planet_id: [] for planet_id in PLANETS}
+
+    def get_planet_id(self, uuid: str) -> PlanetID:
+        time.sleep(DB_LATENCY)
+        return PLANETS[int(uuid) % len(PLANETS)]
+
+    def reserve(self, uuid: str) -> Optional[Reservation]:
+        time.sleep(DB_LATENCY * 2)
+        planet_id = PLANETS[int(uuid) % len(PLANETS)]
+        with self._lock:
+            nonce = next(self._nonce[planet_id])
+        return Reservation(int(uuid), uuid, planet_id, nonce, unsigned_tx=b"")
+
+    def sign(self, reservation: Reservation) -> str:
+        time.sleep(KMS_LATENCY)
+        return "00"
+
+    def save_tx(self, reservation: Reservation):
+        time.sleep(DB_LATENCY)
+
+    def stage(self, reservation: Reservation):
+        time.sleep(STAGE_LATENCY)
+        with self._lock:
+            self.staged[reservation.planet_id].append(reservation.nonce)
+        return True, "", reservation.uuid
+
+    def save_staged(self, reservation: Reservation, tx_id: str):
+        time.sleep(DB_LATENCY)
+
+
+def send_sync(ops: StandInOps, lock_dict, uuid: str):
+    """One message of `send_product` task"""
+    planet_id = ops.get_planet_id(uuid)
+    # Row lock of nonce allocator is held until the Tx is staged
+    with lock_dict[planet_id]:
+        reservation = ops.reserve(uuid)
+        reservation.tx = ops.sign(reservation)
+        ops.save_tx(reservation)
+        ops.stage(reservation)
+        ops.save_staged(reservation, reservation.uuid)
+
+
+def run_prefork() -> float:
+    ops = StandInOps()
+    lock_dict = {planet_id: threading.Lock() for planet_id in PLANETS}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PREFORK_CONCURRENCY) as executor:
+        list(executor.map(lambda i: send_sync(ops, lock_dict, str(i)), range(MESSAGES)))
+    return MESSAGES / (time.perf_counter() - start)
+
+
+def run_async() -> float:
+    ops = StandInOps()
+    worker = AsyncProductWorker(ops, concurrency=ASYNC_CONCURRENCY)
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=ASYNC_CONCURRENCY))
+        semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+        async def one(uuid: str):
+            async with semaphore:
+                assert await worker.process(uuid)
+
+        await asyncio.gather(*(one(str(i)) for i in range(MESSAGES)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    for staged in ops.staged.values():
+        assert staged == sorted(staged)
+    return MESSAGES / elapsed
+
+
+def main():
+    prefork = run_prefork()
+    print(f" prefork: {prefork:8.1f} msgs/s (concurrency {PREFORK_CONCURRENCY})")
+    async_ = run_async()
+    print(f"   async: {async_:8.1f} msgs/s (concurrency {ASYNC_CONCURRENCY})")
+    print(f" speedup: {async_ / prefork:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
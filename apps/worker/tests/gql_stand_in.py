@@ -0,0 +1,93 @@
+"""
+In-memory stand-in of headless GraphQL API.
+
+Queries are executed by graphql-core against a subset of headless schema, so `GQL` methods and DSL queries
+are tested without a node.
+"""
+from typing import Dict, List, Optional
+
+from graphql import build_schema, graphql_sync, print_ast
+from shared._graphql import GQL
+
+SCHEMA = build_schema(
+    """
+    scalar Long
+    scalar TxId
+    enum TxStatus { INVALID STAGING SUCCESS FAILURE INCLUDED }
+
+    type TxResultType {
+      txStatus: TxStatus!
+      blockIndex: Long
+      blockHash: String
+      exceptionNames: [String]
+    }
+    type TransactionType { id: ID! }
+    type BlockType { index: Long! hash: String! transactions: [TransactionType!]! }
+    type BlockHeaderType { index: Long! }
+    type NodeStatusType { tip: BlockHeaderType! }
+    type BlockQuery { blocks(offset: Int, limit: Int, desc: Boolean): [BlockType!]! }
+    type ChainQuery { blockQuery: BlockQuery! }
+    type TransactionHeadlessQuery { transactionResult(txId: TxId!): TxResultType! }
+    type StandaloneQuery {
+      nodeStatus: NodeStatusType!
+      chainQuery: ChainQuery!
+      transaction: TransactionHeadlessQuery!
+    }
+    schema { query: StandaloneQuery }
+    """
+)
+
+
+class StandInChain:
+    def __init__(self):
+        self.block_list: List[List[str]] = []
+        self.result_dict: Dict[str, Dict] = {}
+        self.query_count = 0
+
+    def add_block(self, tx_id_list: List[str], status: str = "SUCCESS", exception: Optional[str] = None) -> int:
+        index = len(self.block_list)
+        self.block_list.append(tx_id_list)
+        for tx_id in tx_id_list:
+            self.result_dict[tx_id] = {
+                "txStatus": status,
+                "blockIndex": index,
+                "blockHash": f"hash{index}",
+                "exceptionNames": [exception],
+            }
+        return index
+
+    # Resolvers: graphql-core calls attributes of root value
+    @property
+    def nodeStatus(self):
+        return {"tip": {"index": len(self.block_list) - 1}}
+
+    @property
+    def chainQuery(self):
+        return {"blockQuery": self}
+
+    def blocks(self, info, offset=0, limit=100, desc=False):
+        return [
+            {"index": i, "hash": f"hash{i}", "transactions": [{"id": x} for x in self.block_list[i]]}
+            for i in range(offset, min(offset + limit, len(self.block_list)))
+        ]
+
+    @property
+    def transaction(self):
+        return self
+
+    def transactionResult(self, info, txId):
+        return self.result_dict.get(txId, {"txStatus": "STAGING", "exceptionNames": None})
+
+    def execute(self, query) -> Dict:
+        self.query_count += 1
+        document = getattr(query, "document", query)
+        result = graphql_sync(SCHEMA, print_ast(document), root_value=self)
+        if result.errors:
+            return {"errors": [{"message": str(e)} for e in result.errors]}
+        return result.data
+
+    def client(self, url: str = "http://stand-in/graphql") -> GQL:
+        client = GQL(url, "stand-in-jwt-secret-of-32-bytes!", schema=SCHEMA)
+        client.execute = self.execute
+        return client
+
@@ -0,0 +1,149 @@
+import asyncio
+import random
+import threading
+import time
+from unittest.mock import patch
+
+from shared.enums import PlanetID, TxStatus
+from shared.models.receipt import Receipt
+
+from app.async_worker import AsyncProductWorker, NonceSequencer, ProductOps, Reservation
+
+
+class FakeOps:
+    def __init__(self, fail_sign=()):
+        self.fail_sign = set(fail_sign)
+        self.nonce = 0
+        self.staged = []
+        self.saved = []
+        self._lock = threading.Lock()
+
+    def get_planet_id(self, uuid):
+        return PlanetID.ODIN
+
+    def reserve(self, uuid):
+        if uuid == "done":
+            return None
+        nonce = self.nonce
+        self.nonce += 1
+        return Reservation(nonce, uuid, PlanetID.ODIN, nonce, unsigned_tx=b"")
+
+    def sign(self, reservation):
+        # Later nonce may be signed earlier
+        time.sleep(random.random() * 0.01)
+        if reservation.uuid in self.fail_sign:
+            raise ValueError("KMS error")
+        return "00"
+
+    def save_tx(self, reservation):
+        return True
+
+    def stage(self, reservation):
+        with self._lock:
+            self.staged.append(reservation.nonce)
+        return True, "", f"tx-{reservation.nonce}"
+
+    def save_staged(self, reservation, tx_id):
+        self.saved.append(tx_id)
+
+
+def test_sequencer_order():
+    async def main():
+        sequencer = NonceSequencer()
+        order = []
+        for nonce in (3, 1, 2):
+            sequencer.add(nonce)
+
+        async def stage(nonce):
+            await sequencer.wait_turn(nonce)
+            order.append(nonce)
+            await sequencer.done(nonce)
+
+        await asyncio.gather(*(stage(x) for x in (3, 2, 1)))
+        return order
+
+    assert asyncio.run(main()) == [1, 2, 3]
+
+
+def test_process_stages_in_nonce_order():
+    ops = FakeOps()
+    worker = AsyncProductWorker(ops)
+
+    async def main():
+        return await asyncio.gather(*(worker.process(str(i)) for i in range(20)))
+
+    assert all(asyncio.run(main()))
+    assert ops.staged == list(range(20))
+    assert len(ops.saved) == 20
+
+
+def test_process_failure():
+    ops = FakeOps(fail_sign={"1"})
+    worker = AsyncProductWorker(ops)
+
+    async def main():
+        return await asyncio.gather(*(worker.process(x) for x in ("0", "1", "2", "done")))
+
+    # Failed message is retried, and does not block later nonce
+    assert asyncio.run(main()) == [True, False, True, True]
+    assert ops.staged == [0, 2]
+
+
+class SameReceiptOps(FakeOps):
+    """One receipt delivered twice: both reserve the saved nonce, and the first saved Tx wins"""
+
+    def __init__(self):
+        super().__init__()
+        self.receipt = Receipt(id=1, nonce=None, tx=None, tx_id=None)
+
+    def reserve(self, uuid):
+        with self._lock:
+            if self.receipt.nonce is None:
+                self.receipt.nonce = 7
+        return Reservation(1, uuid, PlanetID.ODIN, self.receipt.nonce, unsigned_tx=b"")
+
+    def sign(self, reservation):
+        time.sleep(random.random() * 0.01)
+        return "aa" if reservation.uuid == "first" else "bb"
+
+    def save_tx(self, reservation):
+        with self._lock:
+            if self.receipt.tx:
+                return False
+            self.receipt.replace_tx(reservation.tx)
+            return True
+
+
+def test_process_same_receipt_concurrently():
+    ops = SameReceiptOps()
+    worker = AsyncProductWorker(ops)
+
+    async def main():
+        return await asyncio.gather(worker.process("first"), worker.process("second"))
+
+    assert asyncio.run(main()) == [True, True]
+    # Only the saved Tx is staged
+    assert ops.staged == [7]
+    assert ops.receipt.tx in ("aa", "bb")
+
+
+@patch("app.async_worker.scoped_session")
+def test_save_tx_keeps_tx_of_another_worker(scoped_session):
+    receipt = Receipt(id=1, nonce=7, tx=None, tx_id=None, tx_status=None)
+    sess = scoped_session.return_value
+    sess.scalar.return_value = receipt
+    ops = ProductOps()
+
+    assert ops.save_tx(Reservation(1, "uuid", PlanetID.ODIN, 7, tx="aa")) is True
+    assert receipt.tx == "aa" and receipt.tx_status == TxStatus.CREATED
+    assert sess.scalar.call_args.args[0]._for_update_arg is not None
+
+    # Second reservation of the same nonce does not replace the saved Tx
+    assert ops.save_tx(Reservation(1, "uuid", PlanetID.ODIN, 7, tx="bb")) is False
+    assert receipt.tx == "aa"
+    assert not receipt.superseded_tx_ids
+    # Nonce moved by re-signing is not overwritten either
+    receipt.tx = None
+    receipt.nonce = 20
+    assert ops.save_tx(Reservation(1, "uuid", PlanetID.ODIN, 7, tx="bb")) is False
+    sess.commit.assert_called_once()
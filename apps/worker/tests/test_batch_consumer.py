@@ -0,0 +1,101 @@
+import socket
+from unittest.mock import MagicMock, patch
+
+from app.batch_consumer import SendProductBatchConsumer
+
+UUID_A = "5d2b9ad8-8b1b-4b36-bc76-4a4f1a1f8c01"
+UUID_B = "5d2b9ad8-8b1b-4b36-bc76-4a4f1a1f8c02"
+
+
+def make_message(uuid, task="iap.send_product", retries=0):
+    message = MagicMock()
+    message.headers = {"task": task, "retries": retries}
+    message.decode.return_value = [[{"uuid": uuid}], {}, {}]
+    return message
+
+
+def make_consumer(batch_size=10, wait_ms=50):
+    return SendProductBatchConsumer(MagicMock(), batch_size=batch_size, wait_ms=wait_ms)
+
+
+def test_collect_until_batch_size():
+    consumer = make_consumer(batch_size=2)
+    consumer.connection.drain_events.side_effect = lambda timeout: consumer.on_message(None, make_message(UUID_A))
+
+    consumer.collect()
+
+    assert len(consumer.buffer) == 2
+
+
+def test_collect_until_wait_time():
+    consumer = make_consumer(batch_size=10, wait_ms=10)
+    delivered = [make_message(UUID_A)]
+
+    def drain_events(timeout):
+        if delivered:
+            consumer.on_message(None, delivered.pop())
+        else:
+            raise socket.timeout()
+
+    consumer.connection.drain_events.side_effect = drain_events
+
+    consumer.collect()
+
+    assert len(consumer.buffer) == 1
+
+
+@patch("app.batch_consumer.send_product")
+@patch("app.batch_consumer.handle_batch")
+def test_flush_acks_each_message(handle_batch, send_product):
+    send_product.name = "iap.send_product"
+    send_product.max_retries = 3
+    consumer = make_consumer()
+    message_a, message_b = make_message(UUID_A), make_message(UUID_B, retries=1)
+    consumer.buffer = [message_a, message_b]
+    handle_batch.return_value = ([], {UUID_B})
+
+    consumer.flush()
+
+    assert [x.uuid for x in handle_batch.call_args.args[0]] == [UUID_A, UUID_B]
+    message_a.ack.assert_called_once()
+    message_b.ack.assert_called_once()
+    # Only failed message is retried with increased retry count
+    send_product.apply_async.assert_called_once()
+    retried = send_product.apply_async.call_args.kwargs["args"][0]
+    assert retried["uuid"] == UUID_B
+    assert retried["lane"] == "product_retry_queue"
+    assert send_product.apply_async.call_args.kwargs["queue"].name == "product_retry_queue.delay"
+    assert send_product.apply_async.call_args.kwargs["countdown"] == 0
+    assert send_product.apply_async.call_args.kwargs["retries"] == 2
+    assert consumer.buffer == []
+
+
+@patch("app.batch_consumer.send_product")
+@patch("app.batch_consumer.handle_batch")
+def test_flush_batch_error(handle_batch, send_product):
+    send_product.name = "iap.send_product"
+    send_product.max_retries = 3
+    consumer = make_consumer()
+    message_a, message_b = make_message(UUID_A), make_message(UUID_B, retries=3)
+    consumer.buffer = [message_a, message_b]
+    handle_batch.side_effect = Exception("DB is down")
+
+    consumer.flush()
+
+    # Max retries exceeded message is not republished
+    send_product.apply_async.assert_called_once()
+    assert send_product.apply_async.call_args.kwargs["args"][0]["uuid"] == UUID_A
+    message_a.ack.assert_called_once()
+    message_b.ack.assert_called_once()
+
+
+@patch("app.batch_consumer.handle_batch")
+def test_flush_unexpected_message(handle_batch):
+    consumer = make_consumer()
+    message = make_message(UUID_A, task="iap.other")
+    consumer.buffer = [message]
+
+    consumer.flush()
+
+    message.reject.assert_called_once_with(requeue=False)
+    handle_batch.assert_not_called()
@@ -0,0 +1,91 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import bencodex
+
+from shared.enums import PackageName, PlanetID
+
+from app.tasks.batch_grant import group_receipts, split_batch
+from app.tasks.send_product_task import create_batch_tx
+
+AVATAR_A = "0x" + "a" * 40
+AVATAR_B = "0x" + "b" * 40
+AVATAR_C = "0x" + "c" * 40
+
+
+def make_receipt(avatar_addr, planet_id=PlanetID.ODIN, product_id=1, package_name=PackageName.NINE_CHRONICLES_M):
+    receipt = MagicMock()
+    receipt.avatar_addr = avatar_addr
+    receipt.planet_id = planet_id.value
+    receipt.product_id = product_id
+    receipt.package_name = package_name.value
+    return receipt
+
+
+def make_product():
+    product = MagicMock()
+    product.google_sku = "test_sku"
+    product.apple_sku = "test_apple_sku"
+    product.apple_sku_k = "test_apple_sku_k"
+    item = MagicMock(fungible_item_id="3991e04dd808dc0bc24b21f5adb7bf1997312f8700daf1334bf34936e8a0813a", amount=10)
+    fav = MagicMock(ticker="CRYSTAL", decimal_places=18, amount=Decimal("100"))
+    product.fungible_item_list = [item]
+    product.fav_list = [fav]
+    return product
+
+
+def test_split_batch_by_size():
+    receipt_list = [make_receipt("0x" + str(i) * 40) for i in range(5)]
+
+    batch, rest = split_batch(receipt_list, 3)
+
+    assert batch == receipt_list[:3]
+    assert rest == receipt_list[3:]
+
+
+def test_split_batch_duplicated_avatar():
+    receipt_list = [
+        make_receipt(AVATAR_A),
+        make_receipt("0x" + "A" * 40),
+        make_receipt(AVATAR_B),
+    ]
+
+    batch, rest = split_batch(receipt_list, 10)
+
+    # Same avatar cannot receive twice in one Tx
+    assert batch == [receipt_list[0], receipt_list[2]]
+    assert rest == [receipt_list[1]]
+
+
+def test_group_receipts():
+    receipt_list = [
+        make_receipt(AVATAR_A),
+        make_receipt(AVATAR_B, product_id=2),
+        make_receipt(AVATAR_C),
+        make_receipt(AVATAR_A, package_name=PackageName.NINE_CHRONICLES_K),
+    ]
+
+    group_dict = group_receipts(receipt_list)
+
+    assert len(group_dict) == 3
+    assert group_dict[(PlanetID.ODIN.value, 1, PackageName.NINE_CHRONICLES_M.value)] == [
+        receipt_list[0],
+        receipt_list[2],
+    ]
+
+
+def test_create_batch_tx():
+    account = MagicMock()
+    account.pubkey = b"\x04" + b"\x00" * 64
+    account.address = "0x" + "d" * 40
+    account.sign_tx.return_value = b"signature"
+    receipt_list = [make_receipt(AVATAR_A), make_receipt(AVATAR_B), make_receipt(AVATAR_C)]
+
+    tx = bencodex.loads(create_batch_tx(account, receipt_list, make_product(), 7))
+
+    assert tx[b"S"] == b"signature"
+    assert tx[b"n"] == 7
+    claim_data = tx[b"a"][0]["values"]["cd"]
+    assert [x[0] for x in claim_data] == [bytes.fromhex(x[2:]) for x in (AVATAR_A, AVATAR_B, AVATAR_C)]
+    assert [len(x[1]) for x in claim_data] == [2, 2, 2]
+    account.sign_tx.assert_called_once()
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+from shared.enums import PlanetID, TxStatus
+from shared.models.cursor import WorkerCursor
+
+from app.tasks.block_tracker import follow_planet
+from tests.gql_stand_in import StandInChain
+
+
+def run_follow(chain, cursor, pending):
+    sess = MagicMock()
+    sess.scalar.return_value = cursor
+    client = chain.client()
+    with patch("app.tasks.block_tracker.gql_pool") as pool, patch("app.tasks.tracker.gql_pool") as tracker_pool, patch(
+        "app.tasks.block_tracker.get_pending_tx_ids", return_value=set(pending)
+    ), patch("app.tasks.block_tracker.update_statuses") as update_statuses:
+        pool.get.return_value = client
+        tracker_pool.get.return_value = client
+        matched = follow_planet(sess, PlanetID.ODIN)
+    sess.commit.assert_called_once()
+    return matched, update_statuses
+
+
+def test_stand_in_gql():
+    chain = StandInChain()
+    chain.add_block([])
+    chain.add_block(["a", "b"])
+    client = chain.client()
+
+    assert client.get_tip_index() == 1
+    assert client.get_block_tx_ids(0, 10) == [(0, []), (1, ["a", "b"])]
+
+
+@patch("app.tasks.block_tracker.config")
+def test_follow_planet_matches_pending(config):
+    config.block_follow_max_blocks = 1000
+    config.block_follow_batch_size = 2
+    chain = StandInChain()
+    chain.add_block(["other"])
+    chain.add_block(["a", "other2"])
+    chain.add_block(["b"], status="FAILURE", exception="InvalidAction")
+    chain.add_block([])
+    chain.add_block(["c"])
+    cursor = WorkerCursor(position=0)
+
+    matched, update_statuses = run_follow(chain, cursor, ["a", "b", "not-included"])
+
+    assert matched == 2
+    assert cursor.position == 4
+    status_dict = update_statuses.call_args.args[1]
+    assert status_dict == {"a": (TxStatus.SUCCESS, "[null]"), "b": (TxStatus.FAILURE, '["InvalidAction"]')}
+    # Tip + 2 block queries of 4 blocks + 1 aliased result query
+    assert chain.query_count == 4
+
+
+@patch("app.tasks.block_tracker.config")
+def test_follow_planet_without_pending_jumps_to_tip(config):
+    config.block_follow_max_blocks = 1
+    chain = StandInChain()
+    for _ in range(5):
+        chain.add_block(["x"])
+    cursor = WorkerCursor(position=0)
+
+    matched, update_statuses = run_follow(chain, cursor, [])
+
+    assert matched == 0
+    assert cursor.position == 4
+    update_statuses.assert_not_called()
+    assert chain.query_count == 1
+
+
+@patch("app.tasks.block_tracker.config")
+def test_follow_planet_max_blocks(config):
+    config.block_follow_max_blocks = 2
+    config.block_follow_batch_size = 10
+    chain = StandInChain()
+    for i in range(5):
+        chain.add_block([str(i)])
+    cursor = WorkerCursor(position=0)
+
+    matched, _ = run_follow(chain, cursor, ["4"])
+
+    # Catches up over several runs
+    assert matched == 0
+    assert cursor.position == 2
@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shared.enums import PlanetID
+
+from app.gql_pool import GQLPool
+
+URL_A = "https://odin-a.example/graphql"
+URL_B = "https://odin-b.example/graphql"
+URL_MAP = {PlanetID.ODIN: [URL_A, URL_B]}
+
+
+def make_client(url, *args, **kwargs):
+    client = MagicMock()
+    client.url = url
+    client.client.schema = f"schema of {url}"
+    return client
+
+
+@pytest.fixture
+def gql():
+    with patch("app.gql_pool.GQL", side_effect=make_client) as gql:
+        yield gql
+
+
+def test_get_reuses_client(gql):
+    pool = GQLPool(URL_MAP, "secret")
+
+    client = pool.get(PlanetID.ODIN)
+
+    assert client.url == URL_A
+    # Same client for raw planet id bytes of receipt
+    assert pool.get(PlanetID.ODIN.value) is client
+    gql.assert_called_once_with(URL_A, "secret", schema=None)
+    client.connect.assert_called_once()
+    assert pool.health()["ODIN"][URL_A]["healthy"] is True
+
+
+def test_get_failed_endpoint(gql):
+    def create(url, *args, **kwargs):
+        if url == URL_A:
+            raise Exception("Connection refused")
+        return make_client(url)
+
+    gql.side_effect = create
+    pool = GQLPool(URL_MAP, "secret", retry_interval=60)
+
+    # Next endpoint is used
+    assert pool.get(PlanetID.ODIN).url == URL_B
+    assert pool.get(PlanetID.ODIN).url == URL_B
+    # Failed endpoint is not rebuilt until retry interval passes
+    assert [x.args[0] for x in gql.call_args_list] == [URL_A, URL_B]
+    health = pool.health()["ODIN"][URL_A]
+    assert health["healthy"] is False
+    assert health["failure_count"] == 1
+    assert health["last_error"] == "Connection refused"
+    assert pool.urls(PlanetID.ODIN) == [URL_B, URL_A]
+
+
+def test_report_failure_rebuilds_client(gql):
+    pool = GQLPool({PlanetID.ODIN: [URL_A]}, "secret", retry_interval=0)
+    client = pool.get(PlanetID.ODIN)
+
+    pool.report_failure(client, Exception("Timeout"))
+
+    client.close.assert_called_once()
+    assert pool.health()["ODIN"][URL_A]["healthy"] is False
+    new_client = pool.get(PlanetID.ODIN)
+    assert new_client is not client
+    assert pool.health()["ODIN"][URL_A]["healthy"] is True
+    # Schema is introspected again after failure
+    assert gql.call_args.kwargs["schema"] is None
+
+
+def test_get_shares_schema(gql):
+    pool = GQLPool(URL_MAP, "secret")
+    pool.get(PlanetID.ODIN)
+    # Drop client only, schema is kept
+    pool._client_dict.clear()
+
+    pool.get(PlanetID.ODIN)
+
+    assert gql.call_args.kwargs["schema"] == f"schema of {URL_A}"
+
+
+def test_endpoint_order_by_latency(gql):
+    pool = GQLPool(URL_MAP, "secret")
+    client_a, client_b = pool.get_all(PlanetID.ODIN)
+
+    pool.report_success(client_a, 0.5)
+    pool.report_success(client_b, 0.1)
+
+    assert pool.urls(PlanetID.ODIN) == [URL_B, URL_A]
+    assert pool.get(PlanetID.ODIN) is client_b
+    assert pool.health()["ODIN"][URL_B]["latency_ms"] == pytest.approx(100)
+    pool.report_success(client_b, 2.1)
+    # Moving average: 0.3 * 2100 + 0.7 * 100
+    assert pool.health()["ODIN"][URL_B]["latency_ms"] == pytest.approx(700)
+    assert pool.urls(PlanetID.ODIN) == [URL_A, URL_B]
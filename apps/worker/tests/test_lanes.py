@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock, patch
+
+from shared.enums import DeliveryLane, PlanetID
+from shared.schemas.message import SendProductMessage
+from shared.utils.metrics import get_latency_metric
+
+from app.celery_app import app, get_delay_queue, get_lane_queue
+from app.config import config as app_config
+from app.lanes import LaneConsumerGroup, get_lane_prefetch, get_retry_queue, observe_queue_lag, to_retry
+
+
+@patch("app.lanes.config")
+def test_get_lane_prefetch(config):
+    config.lane_weight_map = {"PAID": 8, "FREE": 2, "REDEEM": 1, "RETRY": 1}
+    assert get_lane_prefetch(24) == {
+        DeliveryLane.PAID: 16,
+        DeliveryLane.FREE: 4,
+        DeliveryLane.REDEEM: 2,
+        DeliveryLane.RETRY: 2,
+    }
+    # Every lane is consumed even with small prefetch or zero weight
+    config.lane_weight_map = {"PAID": 8, "FREE": 0}
+    prefetch = get_lane_prefetch(4)
+    assert prefetch[DeliveryLane.PAID] == 3
+    assert prefetch[DeliveryLane.FREE] == 1
+
+
+def test_to_retry():
+    message = SendProductMessage(uuid="uuid", lane=DeliveryLane.PAID, enqueued_at=1).model_dump(mode="json")
+    retried = SendProductMessage.model_validate(to_retry(message))
+    assert retried.uuid == "uuid"
+    assert retried.lane == DeliveryLane.RETRY
+    assert retried.enqueued_at > 1
+
+
+def test_observe_queue_lag():
+    metric = get_latency_metric("queue_lag.redeem")
+    count = metric.count
+    observe_queue_lag(SendProductMessage(uuid="uuid", lane=DeliveryLane.REDEEM, enqueued_at=100), now=102.5)
+    assert metric.count == count + 1
+    assert metric.max >= 2.5
+
+    # Message from old producer has no lane
+    observe_queue_lag(SendProductMessage(uuid="uuid"))
+    assert metric.count == count + 1
+
+
+@patch("app.lanes.config")
+def test_get_retry_queue(config):
+    config.converted_gql_urls_map = {PlanetID.ODIN: ["odin"]}
+    assert get_retry_queue({"uuid": "uuid", "planet_id": "0x000000000000"}).name == "product_retry_queue.odin.delay"
+    # Planet without node URL has no consumer of its shard
+    assert get_retry_queue({"uuid": "uuid", "planet_id": "0x000000000001"}).name == "product_retry_queue.delay"
+    assert get_retry_queue({"uuid": "uuid"}).name == "product_retry_queue.delay"
+
+
+def test_delay_queue_dead_letters_to_retry_lane():
+    queue = get_lane_queue(DeliveryLane.RETRY, PlanetID.ODIN)
+    delay_queue = get_delay_queue(queue)
+    assert delay_queue.name == "product_retry_queue.odin.delay"
+    assert delay_queue.queue_arguments == {
+        "x-message-ttl": app_config.send_product_retry_delay * 1000,
+        "x-dead-letter-exchange": queue.exchange.name,
+        "x-dead-letter-routing-key": queue.routing_key,
+    }
+    # Declared with its arguments when the retry is published
+    assert app.amqp.router.expand_destination({"queue": delay_queue})["queue"] is delay_queue
+
+
+def test_worker_does_not_consume_delay_queue():
+    # Celery worker of product queues runs with `-X background_job_queue` and consumes the rest of `task_queues`
+    queues = app.amqp.Queues(app.conf.task_queues)
+    queues.deselect("background_job_queue")
+    assert DeliveryLane.RETRY.queue() in queues.consume_from
+    assert not [x for x in queues.consume_from if x.endswith(".delay")]
+
+
+@patch("app.lanes.config")
+@patch("app.lanes.Consumer")
+def test_lane_consumer_group_pause_and_resume(consumer_cls, config):
+    config.lane_weight_map = {}
+    config.planet_health_interval = 0
+    consumer_cls.side_effect = lambda *args, **kwargs: MagicMock(queues=kwargs["queues"])
+    group = LaneConsumerGroup(MagicMock(), [], 8, [PlanetID.ODIN, PlanetID.HEIMDALL])
+    # Unsharded queue and a shard per planet for each lane
+    assert len(group.consumer_dict) == len(DeliveryLane) * 3
+    assert group.consumer_dict[(DeliveryLane.FREE, PlanetID.HEIMDALL)].queues[0].name == "product_free_queue.heimdall"
+
+    down = {PlanetID.HEIMDALL}
+    group.check_planets(lambda x: x not in down)
+    assert group.paused == {PlanetID.HEIMDALL}
+    for (lane, planet_id), consumer in group.consumer_dict.items():
+        if planet_id == PlanetID.HEIMDALL:
+            consumer.cancel.assert_called_once()
+        else:
+            consumer.cancel.assert_not_called()
+
+    # Still down: not cancelled again
+    group.check_planets(lambda x: x not in down)
+    down.clear()
+    group.check_planets(lambda x: x not in down)
+    assert group.paused == set()
+    for lane in DeliveryLane:
+        group.consumer_dict[(lane, PlanetID.HEIMDALL)].cancel.assert_called_once()
+        group.consumer_dict[(lane, PlanetID.HEIMDALL)].consume.assert_called_once()
+        group.consumer_dict[(lane, PlanetID.ODIN)].consume.assert_not_called()
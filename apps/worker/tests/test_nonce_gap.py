@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from shared.enums import PlanetID, TxStatus
+from shared.models.cursor import WorkerCursor
+from shared.models.receipt import Receipt
+from shared.utils.metrics import gauges, get_latency_metric
+from shared.utils.transaction import get_tx_id
+
+from app.config import config
+from app.tasks.nonce_gap import CURSOR_NAME, check_planet, repair
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_session(cursor):
+    sess = MagicMock()
+    sess.scalar.return_value = cursor
+    return sess
+
+
+def make_cursor(position, seconds_ago):
+    return WorkerCursor(
+        name=CURSOR_NAME, planet_id=PlanetID.ODIN.value, position=position, updated_at=NOW - timedelta(seconds=seconds_ago)
+    )
+
+
+def make_receipt(tx_status, tx="aa"):
+    return Receipt(planet_id=PlanetID.ODIN.value, nonce=10, tx=tx, tx_status=tx_status)
+
+
+@patch("app.tasks.nonce_gap.gql_pool")
+def test_no_gap_touches_cursor(gql_pool):
+    gql_pool.get.return_value.get_next_nonce.return_value = 10
+    cursor = make_cursor(10, 600)
+    sess = make_session(cursor)
+
+    with patch("app.tasks.nonce_gap.repair") as repair_:
+        assert check_planet(sess, PlanetID.ODIN, "0xabc", 10, now=NOW) is None
+    repair_.assert_not_called()
+    assert cursor.updated_at == NOW
+    assert gauges()["nonce_gap.odin"] == 0
+
+
+@patch("app.tasks.nonce_gap.gql_pool")
+def test_stalled_gap_is_repaired(gql_pool):
+    gql_pool.get.return_value.get_next_nonce.return_value = 10
+    cursor = make_cursor(10, config.nonce_gap_threshold_seconds + 1)
+    sess = make_session(cursor)
+
+    with patch("app.tasks.nonce_gap.repair", return_value="restaged") as repair_:
+        assert check_planet(sess, PlanetID.ODIN, "0xabc", 15, now=NOW) == "restaged"
+    repair_.assert_called_once_with(sess, PlanetID.ODIN, 10, config.nonce_gap_threshold_seconds + 1)
+    assert gauges()["nonce_gap.odin"] == 5
+
+    # Not stalled long enough yet
+    cursor = make_cursor(10, 10)
+    with patch("app.tasks.nonce_gap.repair") as repair_:
+        assert check_planet(make_session(cursor), PlanetID.ODIN, "0xabc", 15, now=NOW) is None
+    repair_.assert_not_called()
+
+
+@patch("app.tasks.nonce_gap.gql_pool")
+def test_time_to_repair(gql_pool):
+    gql_pool.get.return_value.get_next_nonce.return_value = 12
+    cursor = make_cursor(10, 300)
+    count = get_latency_metric("nonce_gap_repair").snapshot()["count"]
+
+    assert check_planet(make_session(cursor), PlanetID.ODIN, "0xabc", 15, now=NOW) is None
+    assert cursor.position == 12
+    assert cursor.updated_at == NOW
+    assert get_latency_metric("nonce_gap_repair").snapshot()["count"] == count + 1
+
+
+@patch("app.tasks.nonce_gap.stage_tx", return_value=(True, "", "txid"))
+@patch("app.tasks.nonce_gap.create_batch_tx")
+@patch("app.tasks.nonce_gap.get_blocking_receipts")
+def test_repair_restages_staged_tx(get_blocking_receipts, create_batch_tx, stage_tx):
+    receipt_list = [make_receipt(TxStatus.STAGED), make_receipt(TxStatus.STAGED)]
+    get_blocking_receipts.return_value = receipt_list
+
+    assert repair(MagicMock(), PlanetID.ODIN, 10, config.nonce_gap_threshold_seconds) == "restaged"
+    create_batch_tx.assert_not_called()
+    stage_tx.assert_called_once_with(receipt_list[0])
+    assert all(x.tx_id == "txid" and x.tx_status == TxStatus.STAGED for x in receipt_list)
+
+
+@patch("app.tasks.nonce_gap.get_signer")
+@patch("app.tasks.nonce_gap.stage_tx", return_value=(True, "", "txid"))
+@patch("app.tasks.nonce_gap.create_batch_tx", return_value=b"\xbb")
+@patch("app.tasks.nonce_gap.get_blocking_receipts")
+def test_repair_resigns_with_same_nonce(get_blocking_receipts, create_batch_tx, stage_tx, get_signer):
+    # Invalid Tx is signed again at once
+    receipt_list = [make_receipt(TxStatus.INVALID)]
+    get_blocking_receipts.return_value = receipt_list
+    assert repair(make_session(None), PlanetID.ODIN, 10, 0) == "resigned"
+    assert create_batch_tx.call_args.args[3] == 10
+    assert receipt_list[0].tx == "bb"
+    # Replaced Tx can still be included, so its ID is kept
+    assert receipt_list[0].superseded_tx_ids == [get_tx_id(b"\xaa")]
+
+    # Staged Tx is signed again when it is stuck for twice of threshold
+    receipt_list = [make_receipt(TxStatus.STAGED)]
+    get_blocking_receipts.return_value = receipt_list
+    resign_cursor = make_cursor(-1, 0)
+    assert repair(make_session(resign_cursor), PlanetID.ODIN, 10, 2 * config.nonce_gap_threshold_seconds) == "resigned"
+    assert receipt_list[0].tx_status == TxStatus.STAGED
+    assert resign_cursor.position == 10
+
+
+@patch("app.tasks.nonce_gap.get_signer")
+@patch("app.tasks.nonce_gap.stage_tx", return_value=(True, "", "txid"))
+@patch("app.tasks.nonce_gap.create_batch_tx", return_value=b"\xbb")
+@patch("app.tasks.nonce_gap.get_blocking_receipts")
+def test_repair_resigns_once_per_nonce(get_blocking_receipts, create_batch_tx, stage_tx, get_signer):
+    # Blocking nonce is already signed again in this stall: only staged again
+    receipt_list = [make_receipt(TxStatus.INVALID)]
+    get_blocking_receipts.return_value = receipt_list
+    sess = make_session(make_cursor(10, 0))
+    assert repair(sess, PlanetID.ODIN, 10, 10 * config.nonce_gap_threshold_seconds) == "restaged"
+    create_batch_tx.assert_not_called()
+    assert receipt_list[0].tx == "aa"
+    assert receipt_list[0].tx_id == "txid"
+
+
+@patch("app.tasks.nonce_gap.alert")
+@patch("app.tasks.nonce_gap.stage_tx")
+@patch("app.tasks.nonce_gap.get_blocking_receipts", return_value=[])
+def test_repair_missing_nonce_only_alerts(get_blocking_receipts, stage_tx, alert):
+    assert repair(MagicMock(), PlanetID.ODIN, 10, 0) == "missing"
+    stage_tx.assert_not_called()
+    alert.assert_called_once()
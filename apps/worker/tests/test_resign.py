@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import bencodex
+import pytest
+
+from shared.enums import PlanetID, TxStatus
+from shared.models.receipt import Receipt
+from shared.utils.transaction import create_unsigned_tx, get_tx_id
+
+from app.tasks.resign import get_stale_nonces, resign_planet
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_tx(nonce: int, timestamp: datetime) -> str:
+    return create_unsigned_tx(PlanetID.ODIN, "02" * 33, "0x" + "ab" * 20, nonce, {"type_id": "test"}, timestamp).hex()
+
+
+def make_receipt(nonce: int, timestamp: datetime = NOW + timedelta(days=7)) -> Receipt:
+    return Receipt(
+        planet_id=PlanetID.ODIN.value,
+        nonce=nonce,
+        tx=make_tx(nonce, timestamp),
+        tx_status=TxStatus.STAGED,
+        product=MagicMock(),
+    )
+
+
+def test_get_stale_nonces():
+    fresh = NOW + timedelta(days=7)
+    expired = NOW - timedelta(hours=1)
+    sess = MagicMock()
+    sess.execute.return_value.all.return_value = [
+        (3, make_tx(3, fresh)),
+        (3, make_tx(3, fresh)),
+        (5, make_tx(5, fresh)),
+        (6, make_tx(6, expired)),
+        (7, make_tx(7, NOW + timedelta(hours=1))),
+    ]
+    # 3 is consumed, 6 is expired. 7 is not expired yet.
+    assert get_stale_nonces(sess, PlanetID.ODIN, 5, NOW) == [3, 6]
+
+
+@patch(
+    "app.tasks.resign.create_unsigned_grant_tx",
+    side_effect=lambda account, group, product, nonce: bencodex.dumps({b"n": nonce}),
+)
+@patch("app.tasks.resign.allocate_nonce", return_value=20)
+@patch("app.tasks.resign.process")
+@patch("app.tasks.resign.get_stale_nonces", return_value=[1, 2, 3, 4, 12])
+@patch("app.tasks.resign.gql_pool")
+@patch("app.tasks.resign.get_signer")
+def test_resign_planet(get_signer, gql_pool, _, process, allocate_nonce, create_unsigned_grant_tx):
+    get_signer.return_value.sign_tx.return_value = b"sig"
+    gql_pool.get.return_value.get_next_nonce.return_value = 10
+    # Receipts of a batch Tx share nonce 2
+    receipt_list = [
+        make_receipt(1), make_receipt(2), make_receipt(2), make_receipt(3), make_receipt(4), make_receipt(12)
+    ]
+    receipt_list[2].tx = receipt_list[1].tx
+    receipt_list[4].superseded_tx_ids = ["old"]
+    old_tx_id = get_tx_id(bytes.fromhex(receipt_list[0].tx))
+    # Tx of nonce 3 is included by itself, and Tx signed before for nonce 4 is included
+    process.return_value = {
+        old_tx_id: (TxStatus.INVALID, None),
+        get_tx_id(bytes.fromhex(receipt_list[1].tx)): (TxStatus.INVALID, None),
+        get_tx_id(bytes.fromhex(receipt_list[3].tx)): (TxStatus.SUCCESS, None),
+        get_tx_id(bytes.fromhex(receipt_list[4].tx)): (TxStatus.INVALID, None),
+        "old": (TxStatus.SUCCESS, None),
+    }
+    sess = MagicMock()
+    sess.scalars.return_value.all.return_value = receipt_list
+
+    assert resign_planet(sess, PlanetID.ODIN, now=NOW) == 3
+
+    # Every Tx signed for receipts of consumed nonces is checked at once
+    assert "old" in process.call_args.args[1]
+    # Two fresh nonces in old nonce order, expired Tx of unconsumed nonce 12 keeps its nonce
+    assert allocate_nonce.call_args.kwargs["count"] == 2
+    assert [x.nonce for x in receipt_list] == [20, 21, 21, 3, 4, 12]
+    assert [x.args[3] for x in create_unsigned_grant_tx.call_args_list] == [12, 20, 21]
+    assert receipt_list[1].tx == receipt_list[2].tx != receipt_list[0].tx
+    assert all(x.tx_status == TxStatus.CREATED and x.tx_id is None for x in receipt_list if x.nonce > 10)
+    assert receipt_list[3].tx_status == receipt_list[4].tx_status == TxStatus.STAGED
+    # Replaced Tx is kept to check before signing again
+    assert receipt_list[0].superseded_tx_ids == [old_tx_id]
+    sess.commit.assert_called_once()
+
+
+@patch("app.tasks.resign.create_unsigned_grant_tx", return_value=bencodex.dumps({}))
+@patch("app.tasks.resign.allocate_nonce", return_value=20)
+@patch("app.tasks.resign.process")
+@patch("app.tasks.resign.get_stale_nonces", return_value=[1])
+@patch("app.tasks.resign.gql_pool")
+@patch("app.tasks.resign.get_signer")
+def test_resign_planet_sign_failure_rolls_back(get_signer, gql_pool, _, process, allocate_nonce, __):
+    get_signer.return_value.sign_tx.side_effect = RuntimeError("KMS")
+    gql_pool.get.return_value.get_next_nonce.return_value = 10
+    receipt = make_receipt(1)
+    process.return_value = {get_tx_id(bytes.fromhex(receipt.tx)): (TxStatus.INVALID, None)}
+    sess = MagicMock()
+    sess.scalars.return_value.all.return_value = [receipt]
+
+    with pytest.raises(RuntimeError):
+        resign_planet(sess, PlanetID.ODIN, now=NOW)
+    # Allocated nonce is released by rollback, not to leave a gap
+    sess.rollback.assert_called_once()
+    sess.commit.assert_not_called()
+    assert receipt.nonce == 1
@@ -0,0 +1,199 @@
+import datetime
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from shared.enums import PlanetID, TxStatus
+from shared.models.cursor import WorkerCursor
+from shared.models.receipt import Receipt
+
+from app.config import config
+from app.tasks.retryer import (
+    NULL_TX_CURSOR_NAME,
+    get_null_tx_status_receipts,
+    restage_receipts,
+    retry_receipts,
+    stage_transaction,
+    update_receipt_status,
+)
+from app.tasks.tracker import schedule_next_check
+
+ODIN = b"0x000000000000"
+HEIMDALL = b"0x000000000001"
+
+
+def make_receipt(receipt_id, planet_id, nonce):
+    return {
+        "id": receipt_id,
+        "tx": f"tx{receipt_id}",
+        "planet_id": planet_id,
+        "nonce": nonce,
+        "tx_status": "CREATED",
+        "created_at": None,
+    }
+
+
+@patch("app.tasks.retryer.stage_transaction")
+def test_restage_receipts_nonce_order_per_planet(stage_transaction):
+    lock = threading.Lock()
+    staged = {}
+    running = set()
+    overlapped = []
+
+    def stage(planet_id, tx):
+        with lock:
+            running.add(planet_id)
+            overlapped.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.discard(planet_id)
+            staged.setdefault(planet_id, []).append(tx)
+        return None if tx == "tx3" else f"id-{tx}"
+
+    stage_transaction.side_effect = stage
+    receipts = [
+        make_receipt(1, ODIN, 10),
+        make_receipt(2, HEIMDALL, 5),
+        make_receipt(3, ODIN, 11),
+        make_receipt(4, ODIN, 12),
+        make_receipt(5, HEIMDALL, 6),
+    ]
+
+    result = restage_receipts(receipts)
+
+    assert staged == {"0x000000000000": ["tx1", "tx3", "tx4"], "0x000000000001": ["tx2", "tx5"]}
+    # Planets are staged concurrently
+    assert max(overlapped) == 2
+    # Failed one is left to the next run
+    assert sorted(result) == [(1, "id-tx1"), (2, "id-tx2"), (4, "id-tx4"), (5, "id-tx5")]
+
+
+@patch("app.tasks.send_product_task.config")
+@patch("app.tasks.send_product_task.gql_pool")
+def test_stage_transaction_uses_gql_pool(gql_pool, config):
+    config.stage_broadcast_count = 1
+    gql = MagicMock()
+    gql.stage.side_effect = ConnectionError("down")
+    gql_pool.get_all.return_value = [gql]
+
+    assert stage_transaction("0x000000000000", "00") is None
+    gql_pool.get_all.assert_called_once_with(PlanetID.ODIN)
+    # Failed endpoint is reported to the pool to be skipped by later requests
+    gql_pool.report_failure.assert_called_once()
+
+    gql.stage.side_effect = None
+    gql.stage.return_value = (True, "", "txid")
+    assert stage_transaction("0x000000000000", "00") == "txid"
+    gql.stage.assert_called_with(b"\x00")
+    gql_pool.report_success.assert_called_once()
+    # Unknown planet is not staged
+    assert stage_transaction("unknown", "00") is None
+
+
+def test_update_receipt_status_in_one_statement():
+    sess = MagicMock()
+    update_receipt_status(sess, [(1, "a"), (2, "b")])
+
+    sess.execute.assert_called_once()
+    query, params = sess.execute.call_args.args
+    assert "VALUES (:id_0, :tx_id_0), (:id_1, :tx_id_1)" in str(query)
+    assert params == {"id_0": 1, "tx_id_0": "a", "id_1": 2, "tx_id_1": "b"}
+    sess.commit.assert_called_once()
+
+    sess.reset_mock()
+    update_receipt_status(sess, [])
+    sess.execute.assert_not_called()
+
+
+def test_restage_keeps_tracker_backoff():
+    receipt = Receipt(id=1, tx_status=TxStatus.STAGED, track_attempts=0)
+
+    def execute(query, params):
+        # Apply what the UPDATE sets on the receipt
+        set_clause = str(query).split("SET")[1].split("FROM")[0]
+        receipt.tx_status = TxStatus.STAGED
+        receipt.tx_id = params["tx_id_0"]
+        if "track_attempts = 0" in set_clause:
+            receipt.track_attempts = 0
+
+    sess = MagicMock()
+    sess.execute.side_effect = execute
+    now = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    delay_list = []
+    for _ in range(4):
+        # Tracker finds the dropped Tx INVALID and backs off, then retryer stages the same Tx again
+        schedule_next_check(receipt, now)
+        delay_list.append((receipt.next_check_at - now).total_seconds())
+        receipt.tx_status = TxStatus.INVALID
+        update_receipt_status(sess, [(receipt.id, "txid")])
+
+    assert receipt.tx_status == TxStatus.STAGED
+    assert receipt.track_attempts == 4
+    assert delay_list == sorted(delay_list) and delay_list[0] < delay_list[-1]
+
+
+@patch("app.tasks.retryer.stage_transaction", return_value="txid")
+def test_restage_batch_tx_once(stage_transaction):
+    # Receipts of a batch Tx share one Tx and nonce
+    receipts = [make_receipt(1, ODIN, 10), make_receipt(2, ODIN, 10), make_receipt(3, ODIN, 11)]
+    receipts[1]["tx"] = receipts[0]["tx"]
+
+    assert restage_receipts(receipts) == [(1, "txid"), (2, "txid"), (3, "txid")]
+    assert [x.args[1] for x in stage_transaction.call_args_list] == ["tx1", "tx3"]
+
+
+def make_null_tx_session(cursor, row_list):
+    sess = MagicMock()
+    sess.scalar.return_value = cursor
+    sess.execute.return_value = row_list
+    return sess
+
+
+def test_null_tx_sweep_moves_cursor(monkeypatch):
+    monkeypatch.setattr(config, "retryer_batch_size", 2)
+    cursor = WorkerCursor(name=NULL_TX_CURSOR_NAME, planet_id=PlanetID.ODIN.value, position=0)
+
+    sess = make_null_tx_session(cursor, [(3, "u3", "t3", 1), (5, "u5", "t5", 2)])
+    result = get_null_tx_status_receipts(sess, PlanetID.ODIN)
+    assert [x["task_id"] for x in result] == ["t3", "t5"]
+    params = sess.execute.call_args.args[1]
+    assert params["cursor"] == 0 and params["planet_id"] == PlanetID.ODIN.value
+    # Full batch: next run continues after the last one
+    assert cursor.position == 5
+
+    sess = make_null_tx_session(cursor, [(8, "u8", "t8", 1)])
+    get_null_tx_status_receipts(sess, PlanetID.ODIN)
+    assert sess.execute.call_args.args[1]["cursor"] == 5
+    # Reached the end: next run starts over
+    assert cursor.position == 0
+
+
+@patch("app.tasks.retryer.release_ledger")
+@patch("app.tasks.retryer.cleanup_ledger")
+@patch("app.tasks.retryer.get_pending_receipts", return_value=[])
+@patch("app.tasks.retryer.send_uuid_to_worker")
+@patch("app.tasks.retryer.get_null_tx_status_receipts")
+@patch("app.tasks.retryer.gql_pool")
+def test_null_tx_sweep_sends_with_ledger_task_id(
+    gql_pool, get_null_tx_status_receipts_, send_uuid_to_worker, _, __, release_ledger, monkeypatch
+):
+    monkeypatch.setattr(config, "gql_url_map", {"0x000000000000": "http://odin", "0x000000000001": "http://heimdall"})
+    # Heimdall is down
+    gql_pool.get.side_effect = lambda x: None if x == PlanetID.HEIMDALL else MagicMock()
+    get_null_tx_status_receipts_.return_value = [
+        {"id": 1, "uuid": "u1", "task_id": "t1", "attempts": 1},
+        {"id": 2, "uuid": "u2", "task_id": "t2", "attempts": 3},
+    ]
+    send_uuid_to_worker.side_effect = [True, False]
+
+    with patch("app.tasks.retryer.scoped_session"):
+        retry_receipts()
+
+    get_null_tx_status_receipts_.assert_called_once()
+    assert get_null_tx_status_receipts_.call_args.args[1] == PlanetID.ODIN
+    assert [x.args for x in send_uuid_to_worker.call_args_list] == [
+        ("u1", PlanetID.ODIN, "t1"),
+        ("u2", PlanetID.ODIN, "t2"),
+    ]
+    # Failed send is released to be sent again in the next run
+    assert release_ledger.call_args.args[1] == [2]
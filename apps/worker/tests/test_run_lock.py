@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from app.run_lock import get_lock_key, run_lock
+
+
+def make_engine(held):
+    """Engine whose connection acquires advisory lock of keys not in `held`"""
+    conn = MagicMock()
+    conn.scalar.side_effect = lambda query, params: params["key"] not in held
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine, conn
+
+
+def test_get_lock_key():
+    key = get_lock_key("iap.track_tx", 0)
+    assert key == get_lock_key("iap.track_tx", 0)
+    assert key != get_lock_key("iap.track_tx", 1)
+    assert -(2**63) <= key < 2**63
+
+
+def test_run_lock_takes_free_slot():
+    engine, conn = make_engine({get_lock_key("iap.retryer", 0)})
+    with run_lock(engine, "iap.retryer", slots=2) as slot:
+        assert slot == 1
+    # Released after the run
+    unlock = conn.execute.call_args.args
+    assert "pg_advisory_unlock" in str(unlock[0])
+    assert unlock[1] == {"key": get_lock_key("iap.retryer", 1)}
+
+
+def test_run_lock_all_slots_taken():
+    engine, conn = make_engine({get_lock_key("iap.retryer", 0)})
+    with run_lock(engine, "iap.retryer") as slot:
+        assert slot is None
+    conn.execute.assert_not_called()
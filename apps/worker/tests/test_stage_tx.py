@@ -0,0 +1,78 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from shared.enums import PlanetID
+
+from app.tasks.send_product_task import relock_unsent, stage_tx
+
+
+def make_gql(url, stage):
+    gql = MagicMock()
+    gql.url = url
+    gql.stage.side_effect = stage
+    return gql
+
+
+def make_receipt():
+    receipt = MagicMock()
+    receipt.planet_id = PlanetID.ODIN.value
+    receipt.tx = "00"
+    return receipt
+
+
+@patch("app.tasks.send_product_task.gql_pool")
+def test_stage_tx_first_success(gql_pool):
+    released = threading.Event()
+
+    def slow_stage(tx):
+        released.wait(5)
+        return True, "", "slow"
+
+    slow = make_gql("slow", slow_stage)
+    fast = make_gql("fast", lambda tx: (True, "", "tx_id"))
+    gql_pool.get_all.return_value = [slow, fast]
+
+    # Returns without waiting for the slow endpoint
+    assert stage_tx(make_receipt()) == (True, "", "tx_id")
+    released.set()
+
+
+@patch("app.tasks.send_product_task.gql_pool")
+def test_stage_tx_endpoint_down(gql_pool):
+    def down(tx):
+        raise ConnectionError("Connection refused")
+
+    broken = make_gql("broken", down)
+    working = make_gql("working", lambda tx: (True, "", "tx_id"))
+    gql_pool.get_all.return_value = [broken, working]
+
+    assert stage_tx(make_receipt()) == (True, "", "tx_id")
+    gql_pool.report_failure.assert_called_once()
+    assert gql_pool.report_failure.call_args.args[0] is broken
+
+
+@patch("app.tasks.send_product_task.gql_pool")
+def test_stage_tx_all_failed(gql_pool):
+    gql_pool.get_all.return_value = [make_gql("a", lambda tx: (False, "Nonce too low", None))] * 2
+
+    assert stage_tx(make_receipt()) == (False, "Nonce too low", None)
+
+    gql_pool.get_all.return_value = []
+    success, msg, tx_id = stage_tx(make_receipt())
+    assert success is False and tx_id is None
+
+
+def test_relock_unsent_skips_receipt_with_tx():
+    receipt_list = [MagicMock(id=1, tx=None, tx_id=None), MagicMock(id=2, tx=None, tx_id=None)]
+    sess = MagicMock()
+
+    def lock(*_):
+        # Another worker created Tx of the second receipt while it was unlocked
+        receipt_list[1].tx = "00"
+        return MagicMock()
+
+    sess.scalars.side_effect = lock
+    assert relock_unsent(sess, receipt_list) == [receipt_list[0]]
+    stmt = sess.scalars.call_args.args[0]
+    assert stmt._for_update_arg is not None
+    assert stmt.get_execution_options()["populate_existing"] is True
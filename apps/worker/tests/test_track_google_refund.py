@@ -2,13 +2,20 @@ from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+from sqlalchemy.dialects import postgresql
+
+from shared.enums import PackageName, ReceiptStatus, Store
+from shared.schemas.notification import RefundSchema
 
 from app.config import config
 from app.tasks.track_google_refund import (
+    RefundAlertCoalescer,
     RefundData,
     VoidReason,
     VoidSource,
+    apply_refunds,
     handle,
+    process_refunds,
     send_slack_alert,
 )
 
@@ -108,22 +115,106 @@ class TestSendSlackAlert:
             )
 
 
+class TestRefundAlertCoalescer:
+    @patch("app.tasks.track_google_refund.send_slack_alert")
+    def test_flush_sends_one_message_per_chunk(self, mock_send_alert):
+        coalescer = RefundAlertCoalescer("환불 알림", chunk_size=2)
+        for i in range(3):
+            coalescer.add(
+                RefundSchema(
+                    store=Store.GOOGLE,
+                    packageName="com.planetariumlabs.ninechroniclesmobile",
+                    orderId=f"order_{i}",
+                    refundedAt=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                ),
+                f"uuid_{i}",
+            )
+
+        coalescer.flush()
+
+        assert mock_send_alert.call_count == 2
+        assert "order_0" in mock_send_alert.call_args_list[0].args[0]
+        assert "order_1" in mock_send_alert.call_args_list[0].args[0]
+        assert "order_2" in mock_send_alert.call_args_list[1].args[0]
+
+        mock_send_alert.reset_mock()
+        coalescer.flush()
+        mock_send_alert.assert_not_called()
+
+
+class TestApplyRefunds:
+    def _refund(self, order_id, store=Store.GOOGLE):
+        return RefundSchema(
+            store=store,
+            packageName="com.planetariumlabs.ninechroniclesmobile",
+            orderId=order_id,
+            refundedAt=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+
+    def test_apply_refunds_bulk_update_per_store(self):
+        sess = Mock()
+        sess.execute.return_value.all.side_effect = [[("order_1", "uuid_1")], []]
+
+        updated = apply_refunds(
+            sess,
+            [self._refund("order_1"), self._refund("order_2"), self._refund("apple_1", Store.APPLE)],
+        )
+
+        assert updated == {"order_1": "uuid_1"}
+        assert sess.execute.call_count == 2
+        stmt = str(sess.execute.call_args_list[0].args[0])
+        assert "UPDATE receipt" in stmt
+        sess.commit.assert_called_once()
+
+    def test_apply_refunds_updates_only_valid_receipts(self):
+        sess = Mock()
+        sess.execute.return_value.all.return_value = []
+
+        apply_refunds(sess, [self._refund("order_1")])
+
+        stmt = sess.execute.call_args.args[0]
+        status_list = [
+            x for x in stmt.compile(dialect=postgresql.dialect()).params.values() if isinstance(x, ReceiptStatus)
+        ]
+        # INVALID and REFUNDED_BY_ADMIN receipts are left unchanged
+        assert status_list == [ReceiptStatus.REFUNDED_BY_BUYER, ReceiptStatus.VALID]
+        assert ReceiptStatus.INVALID not in status_list
+        assert ReceiptStatus.REFUNDED_BY_ADMIN not in status_list
+
+    @patch("app.tasks.track_google_refund.send_slack_alert")
+    @patch("app.tasks.track_google_refund.apply_refunds")
+    def test_process_refunds_alerts_only_updated(self, mock_apply, mock_send_alert):
+        mock_apply.return_value = {"order_1": "uuid_1"}
+
+        count = process_refunds(Mock(), [self._refund("order_1"), self._refund("order_2")])
+
+        assert count == 1
+        mock_send_alert.assert_called_once()
+        assert "order_1" in mock_send_alert.call_args.args[0]
+        assert "order_2" not in mock_send_alert.call_args.args[0]
+
+    @patch("app.tasks.track_google_refund.apply_refunds")
+    def test_process_refunds_empty(self, mock_apply):
+        assert process_refunds(Mock(), []) == 0
+        mock_apply.assert_not_called()
+
+
 class TestHandle:
     @patch("app.tasks.track_google_refund.get_google_client")
     @patch("app.tasks.track_google_refund.config")
-    @patch("app.tasks.track_google_refund.send_slack_alert")
+    @patch("app.tasks.track_google_refund.process_refunds")
     @patch("app.tasks.track_google_refund.datetime")
     def test_handle_with_refunds(
-        self, mock_datetime, mock_send_alert, mock_config, mock_get_client
+        self, mock_datetime, mock_process_refunds, mock_config, mock_get_client
     ):
+        mock_config.google_refund_sweep_hours = 6
         mock_config.google_package_dict = {
-            "NINE_CHRONICLES_M": "com.planetariumlabs.ninechroniclesmobile",
-            "NINE_CHRONICLES_WEB": "com.planetariumlabs.ninechroniclesweb"
+            PackageName.NINE_CHRONICLES_M: "com.planetariumlabs.ninechroniclesmobile",
         }
 
         current_time = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
         mock_datetime.now.return_value = current_time
-        mock_datetime.side_effect = lambda *args, **kw: datetime(*args, **kw)
+        mock_datetime.fromtimestamp.side_effect = datetime.fromtimestamp
 
         mock_client = Mock()
         mock_voided_list = {
@@ -143,24 +234,27 @@ class TestHandle:
         mock_client.purchases.return_value.voidedpurchases.return_value.list.return_value.execute.return_value = mock_voided_list
         mock_get_client.return_value = mock_client
 
-        with patch("app.tasks.track_google_refund.logger") as mock_logger:
-            handle(None, None)
+        handle(None, None)
 
-            mock_send_alert.assert_called_once()
-            mock_logger.info.assert_called()
+        mock_process_refunds.assert_called_once()
+        refund_list = mock_process_refunds.call_args.args[1]
+        assert len(refund_list) == 1
+        assert refund_list[0].orderId == "order_123"
+        assert refund_list[0].store == Store.GOOGLE
+        assert refund_list[0].reason == VoidReason.Remorse.name
 
     @patch("app.tasks.track_google_refund.get_google_client")
     @patch("app.tasks.track_google_refund.config")
+    @patch("app.tasks.track_google_refund.process_refunds")
     @patch("app.tasks.track_google_refund.datetime")
-    def test_handle_no_refunds(self, mock_datetime, mock_config, mock_get_client):
+    def test_handle_no_refunds(self, mock_datetime, mock_process_refunds, mock_config, mock_get_client):
+        mock_config.google_refund_sweep_hours = 6
         mock_config.google_package_dict = {
-            "NINE_CHRONICLES_M": "com.planetariumlabs.ninechroniclesmobile",
-            "NINE_CHRONICLES_WEB": "com.planetariumlabs.ninechroniclesweb"
+            PackageName.NINE_CHRONICLES_M: "com.planetariumlabs.ninechroniclesmobile",
         }
 
         current_time = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
         mock_datetime.now.return_value = current_time
-        mock_datetime.side_effect = lambda *args, **kw: datetime(*args, **kw)
 
         mock_client = Mock()
         mock_voided_list = {"voidedPurchases": []}
@@ -172,21 +266,21 @@ class TestHandle:
             handle(None, None)
 
             mock_logger.info.assert_called_with(
-                "NINE_CHRONICLES_M 패키지에서 최근 1시간 내 환불 건이 없습니다."
+                "com.planetariumlabs.ninechroniclesmobile 패키지에서 최근 6시간 내 환불 건이 없습니다."
             )
+        mock_process_refunds.assert_not_called()
 
     @patch("app.tasks.track_google_refund.get_google_client")
     @patch("app.tasks.track_google_refund.config")
     @patch("app.tasks.track_google_refund.datetime")
     def test_handle_api_parameters(self, mock_datetime, mock_config, mock_get_client):
+        mock_config.google_refund_sweep_hours = 6
         mock_config.google_package_dict = {
-            "NINE_CHRONICLES_M": "com.planetariumlabs.ninechroniclesmobile",
-            "NINE_CHRONICLES_WEB": "com.planetariumlabs.ninechroniclesweb"
+            PackageName.NINE_CHRONICLES_M: "com.planetariumlabs.ninechroniclesmobile",
         }
 
         current_time = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
         mock_datetime.now.return_value = current_time
-        mock_datetime.side_effect = lambda *args, **kw: datetime(*args, **kw)
 
         mock_client = Mock()
         mock_voided_list = {"voidedPurchases": []}
@@ -203,7 +297,7 @@ class TestHandle:
         handle(None, None)
 
         expected_start_time = str(
-            int((current_time - timedelta(hours=1)).timestamp() * 1000)
+            int((current_time - timedelta(hours=6)).timestamp() * 1000)
         )
         expected_end_time = str(int(current_time.timestamp() * 1000))
 
@@ -0,0 +1,127 @@
+import datetime
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from graphql import build_schema, print_ast
+from shared._graphql import GQL
+from shared.enums import PlanetID, TxStatus
+
+from app.tasks.tracker import LIMIT, process, schedule_next_check, track_batch, track_tx
+
+SCHEMA = build_schema(
+    """
+    enum TxStatus { INVALID STAGING SUCCESS FAILURE INCLUDED }
+    type TxResultType {
+      txStatus: TxStatus!
+      blockIndex: Long
+      blockHash: String
+      exceptionNames: [String]
+    }
+    scalar Long
+    type TransactionHeadlessQuery { transactionResult(txId: TxId!): TxResultType! }
+    scalar TxId
+    type StandaloneQuery { transaction: TransactionHeadlessQuery! }
+    schema { query: StandaloneQuery }
+    """
+)
+
+
+@patch("app.tasks.tracker.gql_pool")
+def test_process_one_query_per_planet(gql_pool):
+    client = GQL("http://localhost/graphql", "secret", schema=SCHEMA)
+    gql_pool.get.return_value = client
+    with patch.object(client, "execute") as execute:
+        execute.return_value = {
+            "transaction": {
+                "tx0": {"txStatus": "SUCCESS", "exceptionNames": [None]},
+                "tx1": {"txStatus": "FAILURE", "exceptionNames": ["InvalidAction"]},
+                "tx2": {"txStatus": "STAGING", "exceptionNames": None},
+            }
+        }
+
+        result = process(PlanetID.ODIN, ["a", "b", "c"])
+
+    execute.assert_called_once()
+    request = execute.call_args.args[0]
+    query = print_ast(getattr(request, "document", request))
+    assert 'tx0: transactionResult(txId: "a")' in query
+    assert 'tx2: transactionResult(txId: "c")' in query
+    assert result["a"] == (TxStatus.SUCCESS, "[null]")
+    assert result["b"] == (TxStatus.FAILURE, '["InvalidAction"]')
+    # Unknown status of the node is not tracked
+    assert result["c"] == (None, "null")
+    gql_pool.report_success.assert_called_once()
+
+
+@patch("app.tasks.tracker.gql_pool")
+def test_process_node_error(gql_pool):
+    client = GQL("http://localhost/graphql", "secret", schema=SCHEMA)
+    gql_pool.get.return_value = client
+    with patch.object(client, "execute", side_effect=ConnectionError("down")):
+        assert process(PlanetID.ODIN, ["a"]) == {}
+    gql_pool.report_failure.assert_called_once()
+
+    gql_pool.get.return_value = None
+    assert process(PlanetID.ODIN, ["a"]) == {}
+
+
+def make_receipt(tx_id, attempts=0):
+    return SimpleNamespace(
+        planet_id=PlanetID.ODIN.value,
+        tx_id=tx_id,
+        tx_status=TxStatus.STAGED,
+        msg=None,
+        track_attempts=attempts,
+        next_check_at=None,
+    )
+
+
+@patch("app.tasks.tracker.config")
+def test_schedule_next_check(config):
+    config.track_tx_backoff_base = 15
+    config.track_tx_backoff_max = 100
+    now = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    receipt = make_receipt("a")
+
+    delay_list = []
+    for _ in range(5):
+        schedule_next_check(receipt, now)
+        delay_list.append((receipt.next_check_at - now).seconds)
+    assert delay_list == [15, 30, 60, 100, 100]
+    assert receipt.track_attempts == 5
+
+
+@patch("app.tasks.tracker.process")
+def test_track_batch_backs_off_unfinished(process):
+    done, stuck = make_receipt("done"), make_receipt("stuck", 3)
+    batch_a, batch_b = make_receipt("batch"), make_receipt("batch")
+    sess = MagicMock()
+    sess.scalars.return_value.fetchall.return_value = [done, stuck, batch_a, batch_b]
+    process.return_value = {"done": (TxStatus.SUCCESS, "[null]"), "batch": (TxStatus.FAILURE, None)}
+
+    assert track_batch(sess) == 4
+
+    # Shared batch Tx is queried once
+    assert process.call_args.args == (PlanetID.ODIN, ["batch", "done", "stuck"])
+    assert done.tx_status == TxStatus.SUCCESS and done.track_attempts == 0
+    assert batch_a.tx_status == batch_b.tx_status == TxStatus.FAILURE
+    # Not found: checked again later
+    assert stuck.tx_status == TxStatus.STAGED
+    assert stuck.track_attempts == 4
+    assert stuck.next_check_at > datetime.datetime.now(tz=datetime.timezone.utc)
+    # Lease and result are committed separately
+    assert sess.commit.call_count == 2
+
+
+@patch("app.tasks.tracker.scoped_session")
+@patch("app.tasks.tracker.track_batch")
+@patch("app.tasks.tracker.run_lock")
+def test_track_tx_returns_summary(run_lock, track_batch, _):
+    run_lock.return_value = nullcontext(None)
+    assert track_tx.run() == "All tracking slots are busy, skipped"
+    track_batch.assert_not_called()
+
+    run_lock.return_value = nullcontext(0)
+    track_batch.side_effect = [LIMIT, 3]
+    assert track_tx.run() == f"{LIMIT + 3} receipts are tracked"
@@ -222,8 +222,8 @@ class TestWebPaymentWithDatabase:
         assert expected_amount_cents < 0, "가격이 음수여야 함"
 
     @patch('app.api.purchase.validate_web')
-    @patch('app.api.purchase.send_to_worker')
-    def test_request_endpoint_zero_price_rejection(self, mock_send_to_worker, mock_validate_web, db_session):
+    @patch('app.api.purchase.send_product_to_worker')
+    def test_request_endpoint_zero_price_rejection(self, mock_send_product_to_worker, mock_validate_web, db_session):
         """/request 엔드포인트에서 가격이 0원인 경우 거부 테스트"""
         from app.api.purchase import request_product
         from shared.schemas.receipt import ReceiptSchema
@@ -284,8 +284,8 @@ class TestWebPaymentWithDatabase:
         assert receipt.status == ReceiptStatus.INVALID
 
     @patch('app.api.purchase.validate_web')
-    @patch('app.api.purchase.send_to_worker')
-    def test_request_endpoint_negative_price_rejection(self, mock_send_to_worker, mock_validate_web, db_session):
+    @patch('app.api.purchase.send_product_to_worker')
+    def test_request_endpoint_negative_price_rejection(self, mock_send_product_to_worker, mock_validate_web, db_session):
         """/request 엔드포인트에서 가격이 음수인 경우 거부 테스트"""
         from app.api.purchase import request_product
         from shared.schemas.receipt import ReceiptSchema
@@ -0,0 +1,124 @@
+import hashlib
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed, decode_dss_signature
+from eth_keys.constants import SECPK1_N
+from eth_utils import keccak, to_checksum_address
+
+import shared._crypto
+from shared._crypto import Account, LocalAccount, get_account, sign_tx_list
+
+KMS_KEY = "arn:aws:kms:us-east-2:000000000000:key/test"
+
+
+@pytest.fixture
+def kms():
+    key = ec.generate_private_key(ec.SECP256K1())
+    client = MagicMock()
+    client.get_public_key.return_value = {
+        "PublicKey": key.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    }
+    with patch("shared._crypto.boto3.client", return_value=client):
+        yield client
+
+
+def test_account_cache(kms, tmp_path):
+    account = Account(KMS_KEY, cache_dir=str(tmp_path))
+    assert kms.get_public_key.call_count == 1
+
+    cached = Account(KMS_KEY, cache_dir=str(tmp_path))
+
+    # Public key is loaded from cache file without KMS call
+    assert kms.get_public_key.call_count == 1
+    assert cached.address == account.address
+    assert cached.pubkey == account.pubkey
+    assert cached.pubkey_der == account.pubkey_der
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_account_broken_cache(kms, tmp_path):
+    account = Account(KMS_KEY, cache_dir=str(tmp_path))
+    next(tmp_path.iterdir()).write_text("broken")
+
+    assert Account(KMS_KEY, cache_dir=str(tmp_path)).address == account.address
+    assert kms.get_public_key.call_count == 2
+
+
+def test_get_account(kms):
+    with patch.dict(shared._crypto._account_dict, clear=True):
+        account = get_account(KMS_KEY)
+
+        assert get_account(KMS_KEY) is account
+        assert kms.get_public_key.call_count == 1
+
+
+def test_local_account(tmp_path):
+    account = LocalAccount.generate(str(tmp_path / "key"))
+    unsigned_tx = b"unsigned tx"
+
+    signature = account.sign_tx(unsigned_tx)
+
+    public_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256K1(), account.pubkey)
+    public_key.verify(signature, hashlib.sha256(unsigned_tx).digest(), ec.ECDSA(Prehashed(hashes.SHA256())))
+    r, s = decode_dss_signature(signature)
+    assert s <= SECPK1_N // 2
+    # Same key file, same signer
+    assert LocalAccount(str(tmp_path / "key")).address == account.address
+    assert account.address == to_checksum_address(keccak(account.pubkey[1:])[-20:])
+
+
+def test_local_account_existing_key_file(tmp_path):
+    (tmp_path / "key").write_text("0x" + "11" * 32 + "\n")
+
+    account = LocalAccount(str(tmp_path / "key"))
+
+    assert account.address == "0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A"
+    with pytest.raises(FileExistsError):
+        LocalAccount.generate(str(tmp_path / "key"))
+
+
+def test_account_sign_tx():
+    key = ec.generate_private_key(ec.SECP256K1())
+    client = MagicMock()
+    client.get_public_key.return_value = {
+        "PublicKey": key.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    }
+    client.sign.side_effect = lambda Message, **kwargs: {
+        "Signature": key.sign(Message, ec.ECDSA(Prehashed(hashes.SHA256())))
+    }
+    with patch("shared._crypto.boto3.client", return_value=client):
+        account = Account(KMS_KEY)
+
+    signature = account.sign_tx(b"unsigned tx")
+
+    key.public_key().verify(signature, hashlib.sha256(b"unsigned tx").digest(), ec.ECDSA(Prehashed(hashes.SHA256())))
+    assert decode_dss_signature(signature)[1] <= SECPK1_N // 2
+    assert account.sign_latency.count >= 1
+
+
+def test_sign_tx_list():
+    workers = 4
+    barrier = threading.Barrier(workers, timeout=5)
+    signer = MagicMock()
+
+    def sign_tx(unsigned_tx):
+        # Every signing waits for others: passes only when signed concurrently
+        barrier.wait()
+        if unsigned_tx == b"3":
+            raise ValueError("KMS throttled")
+        return b"signed " + unsigned_tx
+
+    signer.sign_tx.side_effect = sign_tx
+
+    result = sign_tx_list(signer, [b"0", b"1", b"2", b"3"], max_workers=workers)
+
+    assert result[:3] == [b"signed 0", b"signed 1", b"signed 2"]
+    assert isinstance(result[3], ValueError)
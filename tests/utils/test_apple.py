@@ -0,0 +1,103 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from shared.utils.apple import (
+    APPLE_INTERMEDIATE_OID,
+    APPLE_LEAF_OID,
+    AppleSignatureError,
+    verify_signed_payload,
+)
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def create_cert(name, key, issuer_name, issuer_key, marker=None, ca=False):
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)]))
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer_name)]))
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(NOW - timedelta(days=1))
+        .not_valid_after(NOW + timedelta(days=365))
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+    )
+    if marker:
+        builder = builder.add_extension(x509.UnrecognizedExtension(marker, b"\x05\x00"), critical=False)
+    return builder.sign(issuer_key, hashes.SHA256())
+
+
+@pytest.fixture(scope="module")
+def chain():
+    root_key = ec.generate_private_key(ec.SECP256R1())
+    intermediate_key = ec.generate_private_key(ec.SECP256R1())
+    leaf_key = ec.generate_private_key(ec.SECP256R1())
+    root = create_cert("Test Root", root_key, "Test Root", root_key, ca=True)
+    intermediate = create_cert("Test WWDR", intermediate_key, "Test Root", root_key, APPLE_INTERMEDIATE_OID, ca=True)
+    leaf = create_cert("Test Signing", leaf_key, "Test WWDR", intermediate_key, APPLE_LEAF_OID)
+    return leaf_key, [leaf, intermediate, root]
+
+
+def sign(payload, key, certs):
+    x5c = [base64.b64encode(x.public_bytes(serialization.Encoding.DER)).decode() for x in certs]
+    return jwt.encode(payload, key, algorithm="ES256", headers={"x5c": x5c})
+
+
+def fingerprint(cert):
+    return cert.fingerprint(hashes.SHA256()).hex().upper()
+
+
+def test_verify_signed_payload(chain):
+    key, certs = chain
+    signed = sign({"notificationType": "REFUND"}, key, certs)
+
+    assert verify_signed_payload(signed, [fingerprint(certs[2])], now=NOW) == {"notificationType": "REFUND"}
+
+
+def test_verify_signed_payload_untrusted_root(chain):
+    key, certs = chain
+    signed = sign({"notificationType": "REFUND"}, key, certs)
+
+    # Default is Apple Root CA - G3
+    with pytest.raises(AppleSignatureError, match="not trusted"):
+        verify_signed_payload(signed, now=NOW)
+
+
+def test_verify_signed_payload_expired(chain):
+    key, certs = chain
+    signed = sign({"notificationType": "REFUND"}, key, certs)
+
+    with pytest.raises(AppleSignatureError, match="expired"):
+        verify_signed_payload(signed, [fingerprint(certs[2])], now=NOW + timedelta(days=400))
+
+
+def test_verify_signed_payload_wrong_key(chain):
+    _, certs = chain
+    signed = sign({"notificationType": "REFUND"}, ec.generate_private_key(ec.SECP256R1()), certs)
+
+    with pytest.raises(AppleSignatureError, match="Invalid signature"):
+        verify_signed_payload(signed, [fingerprint(certs[2])], now=NOW)
+
+
+def test_verify_signed_payload_broken_chain(chain):
+    key, certs = chain
+    other_key = ec.generate_private_key(ec.SECP256R1())
+    other_intermediate = create_cert("Test WWDR", other_key, "Test Root", other_key, APPLE_INTERMEDIATE_OID, ca=True)
+    signed = sign({"notificationType": "REFUND"}, key, [certs[0], other_intermediate, certs[2]])
+
+    with pytest.raises(AppleSignatureError, match="Invalid certificate chain"):
+        verify_signed_payload(signed, [fingerprint(certs[2])], now=NOW)
+
+
+def test_verify_signed_payload_without_chain():
+    signed = jwt.encode({"notificationType": "REFUND"}, ec.generate_private_key(ec.SECP256R1()), algorithm="ES256")
+
+    with pytest.raises(AppleSignatureError, match="3 certificates"):
+        verify_signed_payload(signed)
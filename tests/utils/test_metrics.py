@@ -0,0 +1,32 @@
+from shared.utils.metrics import LatencyMetric, gauges, get_latency_metric, set_gauge, snapshot
+
+
+def test_latency_metric():
+    metric = LatencyMetric("test", window=10)
+    assert metric.snapshot() == {"count": 0, "avg_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": 0.0}
+
+    for i in range(1, 21):
+        metric.observe(i / 1000)
+
+    result = metric.snapshot()
+    assert result["count"] == 20
+    assert round(result["avg_ms"], 6) == 10.5
+    assert round(result["max_ms"], 6) == 20
+    # Percentiles from the latest 10 samples: 11ms ~ 20ms
+    assert round(result["p50_ms"], 6) == 16
+    assert round(result["p95_ms"], 6) == 20
+
+
+def test_latency_metric_time():
+    metric = get_latency_metric("test_time")
+    with metric.time():
+        pass
+
+    assert get_latency_metric("test_time") is metric
+    assert snapshot()["test_time"]["count"] == 1
+
+
+def test_gauge():
+    set_gauge("test_gauge", 3)
+    set_gauge("test_gauge", 1)
+    assert gauges()["test_gauge"] == 1
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from shared.enums import PlanetID
+from shared.models.nonce import PlanetNonce
+from shared.utils.nonce import allocate_nonce, reconcile_nonce
+
+ADDRESS = "0x2Bb1A0Bf6d6B7e2F3bC0c8b5Aa9E4F2a6A3a9e11"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # SQLite ignores `FOR UPDATE`: `BEGIN IMMEDIATE` takes the write lock at the start of transaction instead,
+    # so concurrent allocators are serialized just like row lock in PostgreSQL.
+    engine = create_engine(f"sqlite:///{tmp_path / 'nonce.db'}", connect_args={"timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    PlanetNonce.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def allocate(engine, count: int, initial_nonce: int = 10):
+    Session = sessionmaker(bind=engine)
+    allocated = []
+    for _ in range(count):
+        with Session() as sess:
+            allocated.append(allocate_nonce(sess, PlanetID.ODIN, ADDRESS, lambda: initial_nonce))
+            sess.commit()
+    return allocated
+
+
+def test_allocate_nonce_sequential(engine):
+    assert allocate(engine, 3) == [10, 11, 12]
+    # Other planet has its own allocator
+    with sessionmaker(bind=engine)() as sess:
+        assert allocate_nonce(sess, PlanetID.HEIMDALL, ADDRESS, lambda: 0) == 0
+
+
+def test_allocate_nonce_count(engine):
+    with sessionmaker(bind=engine)() as sess:
+        assert allocate_nonce(sess, PlanetID.ODIN, ADDRESS, lambda: 10, count=3) == 10
+        sess.commit()
+
+    assert allocate(engine, 1) == [13]
+
+
+def test_allocate_nonce_concurrent_workers(engine):
+    workers, count = 8, 25
+    barrier = threading.Barrier(workers)
+
+    def worker():
+        # Start together to race on creating allocator row as well
+        barrier.wait()
+        return allocate(engine, count)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = [f.result() for f in [executor.submit(worker) for _ in range(workers)]]
+
+    allocated = sorted(x for result in results for x in result)
+    # No duplicated nor skipped nonce
+    assert allocated == list(range(10, 10 + workers * count))
+    for result in results:
+        assert result == sorted(result)
+
+
+def test_allocate_nonce_rollback_does_not_consume(engine):
+    Session = sessionmaker(bind=engine)
+    with Session() as sess:
+        assert allocate_nonce(sess, PlanetID.ODIN, ADDRESS, lambda: 10) == 10
+        sess.rollback()
+
+    assert allocate(engine, 1, initial_nonce=10) == [10]
+
+
+def test_reconcile_nonce(engine):
+    allocate(engine, 3)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as sess:
+        # Staged Tx not included yet: never move backward
+        assert reconcile_nonce(sess, PlanetID.ODIN, ADDRESS, 11) == 2
+        sess.commit()
+    with Session() as sess:
+        # Nonce used outside of allocator: move forward
+        assert reconcile_nonce(sess, PlanetID.ODIN, ADDRESS, 20) == 0
+        sess.commit()
+    with Session() as sess:
+        row = sess.scalar(select(PlanetNonce))
+        assert row.next_nonce == 20
+        assert row.reconciled_at is not None
+        assert reconcile_nonce(sess, PlanetID.HEIMDALL, ADDRESS, 5) == 0
@@ -1,11 +1,22 @@
 import datetime
+from decimal import Decimal
 
 import bencodex
 import pytest
 from shared.utils.actions import create_unload_my_garages_action_plain_value
 
 from shared.enums import PlanetID
-from shared.utils.transaction import append_signature_to_unsigned_tx, create_unsigned_tx, get_genesis_block_hash
+from shared.lib9c.actions.grant_items import GrantItems
+from shared.lib9c.models.address import Address
+from shared.lib9c.models.fungible_asset_value import FungibleAssetValue
+from shared.utils.transaction import (
+    GrantItemsTxTemplate,
+    append_signature_to_unsigned_tx,
+    create_unsigned_tx,
+    get_genesis_block_hash,
+    get_tx_id,
+    get_tx_timestamp,
+)
 
 
 def test_get_same_byteshex():
@@ -85,3 +96,46 @@ def test_create_unsigned_tx():
     assert loaded_tx[b'a'][0]['values']['m'] == plain_value_dict['values']['m']
     assert loaded_tx[b'a'][0]['type_id'] == plain_value_dict['type_id']
     assert loaded_tx[b'g'] == get_genesis_block_hash(PlanetID.ODIN)
+
+
+@pytest.mark.parametrize("memo", ['{"iap": {"g_sku": "test_sku", "a_sku": "테스트", "w_sku": null}}', None])
+def test_grant_items_tx_template(memo):
+    fav_list = [
+        FungibleAssetValue.from_raw_data("CRYSTAL", 18, amount=Decimal("100")),
+        FungibleAssetValue.from_raw_data("Item_NT_500000", 0, amount=3),
+    ]
+    avatar_list = ["0x" + "ab" * 20, "0x" + "cd" * 20]
+    action_id = bytes.fromhex("3979aba1631d25438c8bf93eed328eff")
+    public_key = "04" + "11" * 64
+    address = "0x8bA11bEf1DB41F3118f7478cCfcbE7f1Af4650fa"
+    timestamp = datetime.datetime(2021, 10, 1, 5, 36, 33, 194530)
+    action = GrantItems(
+        claim_data=[{"avatarAddress": Address(x), "fungibleAssetValues": fav_list} for x in avatar_list],
+        memo=memo,
+        _id=action_id.hex(),
+    )
+
+    template = GrantItemsTxTemplate(PlanetID.THOR, bytes.fromhex(public_key), address)
+    rewards = template.encode_rewards([x.plain_value for x in fav_list])
+    unsigned_tx = template.build([(Address(x).raw, rewards) for x in avatar_list], memo, 123, timestamp, action_id)
+
+    assert unsigned_tx == create_unsigned_tx(PlanetID.THOR, public_key, address, 123, action.plain_value, timestamp)
+
+
+def test_append_signature_to_signed_tx():
+    unsigned_tx = bencodex.dumps({b"a": [], b"n": 1})
+    signed_tx = append_signature_to_unsigned_tx(unsigned_tx, b"old")
+
+    # Existing signature is replaced
+    assert bencodex.loads(append_signature_to_unsigned_tx(signed_tx, b"new")) == {b"S": b"new", b"a": [], b"n": 1}
+
+
+def test_get_tx_id_and_timestamp():
+    timestamp = datetime.datetime(2025, 1, 2, 3, 4, 5, 600000, tzinfo=datetime.timezone.utc)
+    tx = append_signature_to_unsigned_tx(
+        create_unsigned_tx(PlanetID.ODIN, "02" * 33, "0x" + "ab" * 20, 1, {"type_id": "test"}, timestamp),
+        b"signature",
+    )
+    assert get_tx_timestamp(tx) == timestamp
+    assert get_tx_id(tx) != get_tx_id(tx[:-1] + b"1")
+    assert len(get_tx_id(tx)) == 64